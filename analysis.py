@@ -1,37 +1,192 @@
-import pulp
-
-def analyze_solution(working_timetable, arrival_vars, departure_vars):
-    print("\nAnalyzing solution...")
-
-    optimized_timetable = []
-    total_delay = 0
-
-    for entry in working_timetable:
-        train, station = entry["train"], entry["station"]
-        original_arrival, original_departure = entry["arrival"], entry["departure"]
-
-        # Retrieve optimized values
-        new_arrival = pulp.value(arrival_vars.get((train, station))) if (train, station) in arrival_vars else original_arrival
-        new_departure = pulp.value(departure_vars.get((train, station))) if (train, station) in departure_vars else original_departure
-
-        # Calculate delays
-        arrival_delay = max(0, (new_arrival or 0) - (original_arrival or 0))
-        departure_delay = max(0, (new_departure or 0) - (original_departure or 0))
-
-        total_delay += arrival_delay + departure_delay
-
-        # Create optimized timetable entry
-        optimized_entry = {
-            "train": train,
-            "station": station,
-            "original_arrival": original_arrival,
-            "original_departure": original_departure,
-            "new_arrival": new_arrival,
-            "new_departure": new_departure,
-            "arrival_delay": arrival_delay,
-            "departure_delay": departure_delay
-        }
-        optimized_timetable.append(optimized_entry)
-
-    print(f"\nTotal delay: {total_delay:.2f} minutes")
-    return optimized_timetable
\ No newline at end of file
+import logging
+
+import numpy as np
+
+from instrumentation import instrumented
+from timetable import Timetable
+
+logger = logging.getLogger(__name__)
+
+@instrumented("analysis")
+def analyze_solution(working_timetable, arrival_vars, departure_vars):
+    logger.debug("Analyzing solution...")
+
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+    new_arrival, new_departure = extract_solution(working_timetable, arrival_vars, departure_vars)
+    arrival_delay, departure_delay = _event_delays(working_timetable, new_arrival, new_departure)
+
+    trains = np.asarray(working_timetable.trains, dtype=object)[working_timetable.train_ids].tolist()
+    stations = np.asarray(working_timetable.stations, dtype=object)[working_timetable.station_ids].tolist()
+    columns = zip(trains, stations, _times(working_timetable.arrival), _times(working_timetable.departure),
+                  _times(new_arrival), _times(new_departure), arrival_delay.tolist(), departure_delay.tolist())
+
+    # Create optimized timetable entries
+    optimized_timetable = [
+        {
+            "train": train,
+            "station": station,
+            "original_arrival": original_arrival,
+            "original_departure": original_departure,
+            "new_arrival": arrival,
+            "new_departure": departure,
+            "arrival_delay": arrival_delay,
+            "departure_delay": departure_delay
+        }
+        for train, station, original_arrival, original_departure, arrival, departure, arrival_delay, departure_delay in columns
+    ]
+
+    logger.info("Total delay: %.2f minutes", float(arrival_delay.sum() + departure_delay.sum()))
+    return optimized_timetable
+
+@instrumented("analysis.extract")
+def extract_solution(working_timetable, arrival_vars, departure_vars):
+    """
+    Pulls the solved times into arrays aligned with the timetable rows in one pass over the variables.
+
+    The variables may also be plain dicts of solved times. Events without a variable keep their
+    planned time, like analyze_solution; missing events are NaN.
+
+    Returns:
+        The new_arrival and new_departure float64 arrays.
+    """
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+
+    row_of = None
+    columns = []
+    for planned, variables in ((working_timetable.arrival, arrival_vars), (working_timetable.departure, departure_vars)):
+        column = np.array(planned, dtype=np.float64)
+        if variables:
+            rows = np.flatnonzero(~np.isnan(planned))
+            if not _in_timetable_order(working_timetable, variables, rows):
+                if row_of is None:
+                    row_of = {key: row for row, key in enumerate(_keys(working_timetable))}
+                rows = np.fromiter((row_of[key] for key in variables), dtype=np.intp, count=len(variables))
+            column[rows] = _values(list(variables.values()))
+        columns.append(column)
+    return columns[0], columns[1]
+
+@instrumented("analysis.delay_statistics")
+def delay_statistics(working_timetable, new_arrival, new_departure):
+    """
+    Summarizes the delays of a solution (see extract_solution) per train and per station.
+
+    Returns:
+        A dict with the "total_delay", the largest single event delay as "max_delay", the number of
+        "delayed_events", and the summed delay "by_train" and "by_station".
+    """
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+
+    arrival_delay, departure_delay = _event_delays(working_timetable, new_arrival, new_departure)
+    stop_delay = arrival_delay + departure_delay
+    by_train = np.bincount(working_timetable.train_ids, weights=stop_delay, minlength=len(working_timetable.trains))
+    by_station = np.bincount(working_timetable.station_ids, weights=stop_delay, minlength=len(working_timetable.stations))
+
+    return {
+        "total_delay": float(stop_delay.sum()),
+        "max_delay": float(max(arrival_delay.max(initial=0), departure_delay.max(initial=0))),
+        "delayed_events": int((arrival_delay > 0).sum() + (departure_delay > 0).sum()),
+        "by_train": dict(zip(working_timetable.trains, by_train.tolist())),
+        "by_station": dict(zip(working_timetable.stations, by_station.tolist())),
+    }
+
+@instrumented("analysis.platform_occupancy")
+def platform_occupancy(working_timetable, new_arrival, new_departure, platform_capacity):
+    """
+    Sweeps the arrivals and departures of every station in time order to measure platform use.
+
+    Only stops with both an arrival and a departure occupy a platform. At equal times arrivals are
+    counted before departures, so a train arriving as another leaves counts as overlapping.
+
+    Returns:
+        station -> dict with the "capacity", the "peak" number of trains present, the "exceeded"
+        (start, end) intervals with more trains than platforms, the summed "occupied_time" and the
+        "utilisation" of the platforms between the first arrival and the last departure.
+    """
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+
+    dwelling = np.flatnonzero(~np.isnan(new_arrival) & ~np.isnan(new_departure))
+    stations = working_timetable.station_ids[dwelling]
+
+    # One +1 event per arrival and -1 event per departure, sorted by station, time and kind
+    station_of_event = np.r_[stations, stations]
+    time = np.r_[new_arrival[dwelling], new_departure[dwelling]]
+    kind = np.r_[np.zeros(len(dwelling), dtype=np.int8), np.ones(len(dwelling), dtype=np.int8)]
+    order = np.lexsort((kind, time, station_of_event))
+    station_of_event, time = station_of_event[order], time[order]
+    change = np.where(kind[order] == 0, 1, -1)
+
+    # Every station's events sum to zero, so the running total restarts at each station
+    occupied = np.cumsum(change)
+    starts = np.flatnonzero(np.r_[True, station_of_event[1:] != station_of_event[:-1]]) if len(order) else np.zeros(0, dtype=np.intp)
+    ends = np.r_[starts[1:], len(order)]
+    next_time = np.r_[time[1:], np.nan]
+
+    occupancy = {}
+    for station, capacity in platform_capacity.items():
+        result = {"capacity": capacity, "peak": 0, "exceeded": [], "occupied_time": 0.0, "utilisation": 0.0}
+        occupancy[station] = result
+        if station not in working_timetable.stations:
+            continue
+        station_id = working_timetable.stations.index(station)
+        block = np.searchsorted(station_of_event[starts], station_id) if len(starts) else 0
+        if block >= len(starts) or station_of_event[starts[block]] != station_id:
+            continue
+
+        first, last = starts[block], ends[block]
+        station_occupied = occupied[first:last]
+        durations = next_time[first:last - 1] - time[first:last - 1]
+        over = np.flatnonzero(station_occupied[:-1] > capacity)
+        span = time[last - 1] - time[first]
+
+        result["peak"] = int(station_occupied.max())
+        result["exceeded"] = _merge_intervals(time[first + over], next_time[first + over])
+        result["occupied_time"] = float((station_occupied[:-1] * durations).sum())
+        result["utilisation"] = result["occupied_time"] / float(capacity * span) if span > 0 else 0.0
+
+    return occupancy
+
+def _merge_intervals(starts, ends):
+    intervals = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if end <= start:
+            continue
+        if intervals and intervals[-1][1] >= start:
+            intervals[-1] = (intervals[-1][0], end)
+        else:
+            intervals.append((start, end))
+    return intervals
+
+def _event_delays(working_timetable, new_arrival, new_departure):
+    # Lateness of each event against its plan, zero for events that are missing or early
+    arrival_delay = np.nan_to_num(np.maximum(0, new_arrival - working_timetable.arrival))
+    departure_delay = np.nan_to_num(np.maximum(0, new_departure - working_timetable.departure))
+    return arrival_delay, departure_delay
+
+def _in_timetable_order(working_timetable, variables, rows):
+    # create_model adds one variable per event in timetable order, so values can usually be assigned by
+    # position; every key is compared, as object arrays, so any other order is mapped by key instead
+    if len(variables) != len(rows):
+        return False
+    keys = np.empty((len(rows), 2), dtype=object)
+    keys[:] = list(variables)
+    trains = np.asarray(working_timetable.trains, dtype=object)[working_timetable.train_ids[rows]]
+    stations = np.asarray(working_timetable.stations, dtype=object)[working_timetable.station_ids[rows]]
+    return bool(np.all(keys[:, 0] == trains) and np.all(keys[:, 1] == stations))
+
+def _keys(working_timetable):
+    trains = np.asarray(working_timetable.trains, dtype=object)[working_timetable.train_ids]
+    stations = np.asarray(working_timetable.stations, dtype=object)[working_timetable.station_ids]
+    return zip(trains.tolist(), stations.tolist())
+
+def _values(variables):
+    # Solved values of PuLP variables or plain numbers; None (unsolved) becomes NaN
+    if variables and hasattr(variables[0], "varValue"):
+        variables = [variable.varValue for variable in variables]
+    return np.array(variables, dtype=np.float64)
+
+def _times(column):
+    return [None if time != time else time for time in column.tolist()]
@@ -0,0 +1,199 @@
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pulp
+
+from constraints import (
+    add_single_track_conflict_constraints,
+    add_blocking_constraints,
+    add_platform_capacity_constraints,
+    add_running_time_constraints,
+    add_dwell_time_constraints,
+    add_headway_constraints,
+    add_delays,
+)
+from generator import generate_scenario
+from instrumentation import configure_logging, metrics, reset_metrics
+from matrix_model import build_matrix_model, solve_matrix_model
+from model import create_model
+from objective import OBJECTIVE_MODES, set_objective
+from timetable import Timetable
+from timetable_index import build_timetable_index
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+logger = logging.getLogger(__name__)
+
+
+def benchmark_size(num_trains, seed=0, num_stations=9, num_lines=4, platform_formulation="interval",
+                   max_early=0, max_delay=180, solve_limit=1000, time_limit=60, builder="pulp",
+                   objective_mode="symmetric"):
+    """
+    Generates one synthetic scenario and measures model size, build time per constraint family,
+    solve time, objective and peak memory.
+
+    max_early and max_delay bound the time variables (see create_model) so the interval platform
+    formulation only pairs stops that can overlap. Instances with more than solve_limit trains are
+    built but not solved. builder "matrix" builds the model with build_matrix_model and solves it
+    with solve_matrix_model instead of going through PuLP. objective_mode is the set_objective mode of
+    the PuLP builder; the matrix builder only has the symmetric objective.
+    """
+    scenario = generate_scenario(num_trains, num_stations=num_stations, num_lines=num_lines, seed=seed)
+    timings = {}
+    reset_metrics()
+
+    with _timed(timings, "load_timetable"):
+        working_timetable = Timetable.from_records(scenario["original_timetable"])
+
+    if builder == "matrix":
+        if objective_mode != "symmetric":
+            raise ValueError("The matrix builder only has the symmetric objective")
+        return _benchmark_matrix(scenario, working_timetable, timings, num_trains, seed, platform_formulation,
+                                 max_early, max_delay, solve_limit, time_limit)
+    with _timed(timings, "create_model"):
+        solver, arrival_vars, departure_vars = create_model(working_timetable, max_early=max_early, max_delay=max_delay)
+    with _timed(timings, "build_timetable_index"):
+        index = build_timetable_index(working_timetable)
+    with _timed(timings, "add_single_track_conflict_constraints"):
+        add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars,
+                                              scenario["valid_segments"], index=index)
+    with _timed(timings, "add_blocking_constraints"):
+        add_blocking_constraints(solver, working_timetable, scenario["blocked_section"], scenario["blockage_start"],
+                                 scenario["blockage_end"], departure_vars, index=index, arrival_vars=arrival_vars)
+    with _timed(timings, "add_platform_capacity_constraints"):
+        add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars,
+                                          scenario["platform_capacity"], index=index, formulation=platform_formulation)
+    with _timed(timings, "add_running_time_constraints"):
+        add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+    with _timed(timings, "add_dwell_time_constraints"):
+        add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
+    with _timed(timings, "add_headway_constraints"):
+        add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+    with _timed(timings, "add_delays"):
+        add_delays(solver, working_timetable, departure_vars, scenario["delays"], index=index)
+    with _timed(timings, "set_objective"):
+        set_objective(solver, working_timetable, arrival_vars, departure_vars, mode=objective_mode)
+
+    status, objective = None, None
+    if num_trains <= solve_limit:
+        with _timed(timings, "solve"):
+            status = pulp.LpStatus[solver.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))]
+        objective = pulp.value(solver.objective)
+
+    return {
+        "trains": num_trains,
+        "stations": len(scenario["platform_capacity"]),
+        "events": len(working_timetable),
+        "seed": seed,
+        "builder": "pulp",
+        "platform_formulation": platform_formulation,
+        "objective_mode": objective_mode,
+        "max_early": max_early,
+        "max_delay": max_delay,
+        "variables": solver.numVariables(),
+        "constraints": solver.numConstraints(),
+        "timings": timings,
+        "constraints_by_family": metrics()["constraints"],
+        "build_time": sum(seconds for phase, seconds in timings.items() if phase != "solve"),
+        "status": status,
+        "objective": objective,
+        "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _benchmark_matrix(scenario, working_timetable, timings, num_trains, seed, platform_formulation, max_early, max_delay,
+                      solve_limit, time_limit):
+    with _timed(timings, "build_matrix_model"):
+        model = build_matrix_model(working_timetable, scenario["blocked_section"], scenario["blockage_start"],
+                                   scenario["blockage_end"], scenario["valid_segments"], scenario["platform_capacity"],
+                                   delays=scenario["delays"], platform_formulation=platform_formulation,
+                                   max_early=max_early, max_delay=max_delay)
+
+    status, objective = None, None
+    if num_trains <= solve_limit:
+        with _timed(timings, "solve"):
+            result = solve_matrix_model(model, time_limit=time_limit)
+        status, objective = result["status"], result["objective"]
+
+    return {
+        "trains": num_trains,
+        "stations": len(scenario["platform_capacity"]),
+        "events": len(working_timetable),
+        "seed": seed,
+        "builder": "matrix",
+        "platform_formulation": platform_formulation,
+        "max_early": max_early,
+        "max_delay": max_delay,
+        "variables": model["A"].shape[1],
+        "constraints": model["A"].shape[0],
+        "timings": timings,
+        "constraints_by_family": model["rows_by_family"],
+        "build_time": sum(seconds for phase, seconds in timings.items() if phase != "solve"),
+        "status": status,
+        "objective": objective,
+        "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, output_path="benchmark_results.jsonl", **options):
+    """
+    Benchmarks every size in a fresh process, so peak memory is per size, and appends one JSON
+    line per size to output_path, tagged with the run so results can be compared across runs.
+    """
+    run = {
+        "run_id": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pulp": pulp.__version__,
+        "machine": platform.machine(),
+    }
+    results = []
+    with open(output_path, "a") as output:
+        for num_trains in sizes:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = dict(run, **executor.submit(benchmark_size, num_trains, **options).result())
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            results.append(result)
+            logger.info("%d trains: %d variables, %d constraints, build %.2fs, status %s, objective %s",
+                        num_trains, result["variables"], result["constraints"], result["build_time"], result["status"], result["objective"])
+    return results
+
+
+@contextlib.contextmanager
+def _timed(timings, phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark model building and solving on synthetic timetables.")
+    parser.add_argument("sizes", nargs="*", type=int, default=list(DEFAULT_SIZES), help="numbers of trains")
+    parser.add_argument("--output", default="benchmark_results.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stations", type=int, default=9, help="stations per line")
+    parser.add_argument("--lines", type=int, default=4)
+    parser.add_argument("--platform-formulation", choices=["big_m", "interval"], default="interval")
+    parser.add_argument("--max-early", type=float, default=0, help="minutes a train may run early")
+    parser.add_argument("--max-delay", type=float, default=180, help="maximum delay of any event in minutes")
+    parser.add_argument("--solve-limit", type=int, default=1000, help="largest instance to solve")
+    parser.add_argument("--time-limit", type=float, default=60, help="solver time limit in seconds")
+    parser.add_argument("--objective", dest="objective_mode", choices=list(OBJECTIVE_MODES), default="symmetric",
+                        help="objective mode of the PuLP builder")
+    parser.add_argument("--builder", choices=["pulp", "matrix"], default="pulp", help="model builder to benchmark")
+    args = parser.parse_args()
+
+    configure_logging()
+    run_benchmark(args.sizes, args.output, seed=args.seed, num_stations=args.stations, num_lines=args.lines,
+                  platform_formulation=args.platform_formulation, max_early=args.max_early, max_delay=args.max_delay,
+                  solve_limit=args.solve_limit, time_limit=args.time_limit, builder=args.builder,
+                  objective_mode=args.objective_mode)
@@ -0,0 +1,21 @@
+import pytest
+
+from generator import generate_scenario
+from timetable import Timetable
+
+
+@pytest.fixture
+def scenario_args():
+    """
+    Factory of generated test scenarios: scenario_args(seed, num_trains=40, num_stations=7, num_lines=2)
+    returns the positional build_scenario_model arguments (working_timetable up to platform_capacity)
+    and the delays.
+    """
+    def make(seed, num_trains=40, num_stations=7, num_lines=2):
+        scenario = generate_scenario(num_trains, num_stations=num_stations, num_lines=num_lines, seed=seed)
+        working_timetable = Timetable.from_records(scenario["original_timetable"])
+        args = (working_timetable, scenario["blocked_section"], scenario["blockage_start"], scenario["blockage_end"],
+                scenario["valid_segments"], scenario["platform_capacity"])
+        return args, scenario["delays"]
+
+    return make
@@ -1,219 +1,446 @@
-
-
-def add_constraints(solver, working_timetable, arrival_vars, departure_vars, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity):
-    """
-    Adds all constraints to the optimization model.
-    """
-    print("\nAdding constraints...")
-
-    # Single-track conflict constraints
-    solver = add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars, valid_segments)
-
-    # Blocking constraints
-    solver = add_blocking_constraints(solver, working_timetable, blocked_section, blockage_start, blockage_end, departure_vars)
-
-    # Platform capacity constraints
-    solver = add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity)
-
-    # Running time constraints
-    solver = add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
-
-    # Dwell time constraints
-    solver = add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
-
-    # Headway constraints
-    solver = add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars)
-
-    print("Finished adding all constraints.")
-    return solver
-
-def add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars, valid_segments):
-    """
-    Adds constraints to prevent conflicts on single-track segments.
-    """
-    print("\nAdding single-track conflict constraints...")
-
-    for i in range(len(working_timetable)):
-        for j in range(i + 1, len(working_timetable)):
-            current, next_entry = working_timetable[i], working_timetable[j]
-
-            if current["train"] != next_entry["train"]:
-                current_train, next_train = current["train"], next_entry["train"]
-                current_station, next_station = current["station"], next_entry["station"]
-
-                if (current_station, next_station) in valid_segments:
-                    if (next_train, current_station) in departure_vars and (current_train, next_station) in arrival_vars:
-                        solver += (
-                            departure_vars[(next_train, current_station)] >= arrival_vars[(current_train, next_station)],
-                            f"Single_Track_Conflict_{current_train}_{next_train}_{current_station}_To_{next_station}"
-                        )
-
-    print("Finished adding single-track conflict constraints.")
-    return solver
-
-def add_blocking_constraints(solver, working_timetable, blocked_section, blockage_start, blockage_end, departure_vars):
-    """
-    Adds blocking constraints for a specific blocked section during a given time window.
-    """
-    print("\nAdding blocking constraints...")
-
-    for entry in working_timetable:
-        train = entry["train"]
-        station = entry["station"]
-        departure = entry["departure"]
-
-        if station == blocked_section[0] and departure is not None and blockage_start <= departure <= blockage_end:
-            solver += (
-                departure_vars[(train, station)] >= blockage_end,
-                f"Block_Departure_{train}_{station}"
-            )
-
-    print("Finished adding blocking constraints.")
-    return solver
-
-import pulp
-
-
-def add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity):
-    """
-    Adds platform capacity constraints dynamically, enforcing strict capacity limits and train presence rules.
-    """
-    print("\n=== Adding Improved Platform Capacity Constraints ===")
-
-    for station, capacity in platform_capacity.items():
-        print(f"\n--- Station: {station} --- (Capacity: {capacity} platforms)")
-
-        # Skip start and terminal stations
-        if station in ["A", "E"]:
-            print(f"  Skipping constraints for start/terminal station: {station}")
-            continue
-
-        # Collect train schedules at the station
-        station_stops = [entry for entry in working_timetable if entry['station'] == station]
-        train_names = [entry['train'] for entry in station_stops]
-        print(f"  Trains stopping at {station}: {train_names}")
-
-        # Create binary occupancy variables for each train
-        occupancy_vars = {}
-        for train in station_stops:
-            train_name = train["train"]
-            arrival = arrival_vars.get((train_name, station))
-            departure = departure_vars.get((train_name, station))
-
-            if arrival is None or departure is None:
-                print(f"    [WARNING] Missing arrival or departure variable for Train {train_name} at station {station}")
-                continue
-
-            var_name = f"Train_{train_name}_Occupying_{station}"
-            occupancy_vars[train_name] = pulp.LpVariable(var_name, cat="Binary")
-
-            # Big-M constraints to link occupancy with arrival and departure times
-            M = 1000  # A sufficiently large number
-            solver += (
-                arrival - M * (1 - occupancy_vars[train_name]) <= departure,
-                f"OccupancyActive_Start_{train_name}_{station}"
-            )
-            solver += (
-                departure <= arrival + M * occupancy_vars[train_name],
-                f"OccupancyActive_End_{train_name}_{station}"
-            )
-            print(f"    Linked Train {train_name} occupancy at {station}.")
-
-        # Add platform capacity constraint
-        solver += (
-            pulp.lpSum(occupancy_vars.values()) <= capacity,
-            f"TotalCapacity_{station}"
-        )
-        print(f"  Added total capacity constraint for {station} (Max Capacity: {capacity}).")
-
-        # Add pairwise non-overlapping constraints to ensure no simultaneous occupancy
-        for i, train1 in enumerate(station_stops):
-            for train2 in station_stops[i + 1:]:
-                train1_name, train2_name = train1['train'], train2['train']
-                arrival1, departure1 = arrival_vars.get((train1_name, station)), departure_vars.get((train1_name, station))
-                arrival2, departure2 = arrival_vars.get((train2_name, station)), departure_vars.get((train2_name, station))
-
-                if arrival1 and departure1 and arrival2 and departure2:
-                    solver += (
-                        departure1 <= arrival2 + M * (1 - occupancy_vars[train2_name]),
-                        f"NoOverlap_{train1_name}_{train2_name}_{station}_1"
-                    )
-                    solver += (
-                        departure2 <= arrival1 + M * (1 - occupancy_vars[train1_name]),
-                        f"NoOverlap_{train1_name}_{train2_name}_{station}_2"
-                    )
-                    print(f"    Added non-overlapping constraint between {train1_name} and {train2_name} at {station}")
-
-    print("\n=== Finished Adding Improved Platform Capacity Constraints ===")
-    return solver
-
-
-
-
-def add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars):
-    """
-    Adds constraints to enforce minimum running times between stations.
-    """
-    print("\nAdding running time constraints...")
-
-    for i in range(len(working_timetable) - 1):
-        current, next_entry = working_timetable[i], working_timetable[i + 1]
-        if current["train"] == next_entry["train"] and current["departure"] is not None and next_entry["arrival"] is not None:
-            solver += (
-                arrival_vars[(next_entry["train"], next_entry["station"])] -
-                departure_vars[(current["train"], current["station"])] >= 10,
-                f"Running_{current['train']}_{current['station']}_To_{next_entry['station']}"
-            )
-
-    print("Finished adding running time constraints.")
-    return solver
-
-def add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars):
-    """
-    Adds constraints to enforce minimum and maximum dwell times at stations.
-    """
-    print("\nAdding dwell time constraints...")
-
-    for entry in working_timetable:
-        if entry["departure"] is not None and entry["arrival"] is not None:
-            train, station = entry["train"], entry["station"]
-            solver += (
-                departure_vars[(train, station)] - arrival_vars[(train, station)] >= 2,
-                f"Min_Dwell_Time_{train}_{station}"
-            )
-            solver += (
-                departure_vars[(train, station)] - arrival_vars[(train, station)] <= 100,
-                f"Max_Dwell_Time_{train}_{station}"
-            )
-
-    print("Finished adding dwell time constraints.")
-    return solver
-
-def add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars, headway_time=5):
-    """
-    Adds headway constraints to ensure safe time gaps between trains at the same station.
-    """
-    print("\nAdding headway constraints...")
-
-    for i in range(len(working_timetable)):
-        for j in range(i + 1, len(working_timetable)):
-            current, next_entry = working_timetable[i], working_timetable[j]
-
-            if current["station"] == next_entry["station"] and current["train"] != next_entry["train"]:
-                train, next_train = current["train"], next_entry["train"]
-                station = current["station"]
-
-                if current["departure"] is not None and next_entry["departure"] is not None:
-                    solver += (
-                        departure_vars[(next_train, station)] - departure_vars[(train, station)] >= headway_time,
-                        f"Headway_Departure_{train}_{next_train}_{station}"
-                    )
-
-                if current["arrival"] is not None and next_entry["arrival"] is not None:
-                    solver += (
-                        arrival_vars[(next_train, station)] - arrival_vars[(train, station)] >= headway_time,
-                        f"Headway_Arrival_{train}_{next_train}_{station}"
-                    )
-
-    print("Finished adding headway constraints.")
-    return solver
+import logging
+
+import pulp
+
+from instrumentation import instrumented
+from timetable_index import (
+    blockage_windows,
+    build_blockage_index,
+    build_timetable_index,
+    neighbour_pairs,
+    planned_time,
+    segment_entry_time,
+)
+
+logger = logging.getLogger(__name__)
+
+# Operating rules, in minutes
+RUNNING_TIME = 10
+MIN_DWELL_TIME = 2
+MAX_DWELL_TIME = 100
+HEADWAY_TIME = 5
+
+
+@instrumented("constraints")
+def add_constraints(solver, working_timetable, arrival_vars, departure_vars, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity, pair_window=None, index=None, platform_formulation="big_m", blockages=()):
+    """
+    Adds all constraints to the optimization model.
+
+    The timetable index is built once and shared by every constraint family. pair_window widens
+    pairwise constraints from immediate neighbours in time to all events within that many minutes.
+    platform_formulation is passed on to add_platform_capacity_constraints and blockages (further
+    (section, start, end) windows) to add_blocking_constraints.
+    """
+    logger.debug("Adding constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    # Single-track conflict constraints
+    solver = add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars, valid_segments, window=pair_window, index=index)
+
+    # Blocking constraints
+    solver = add_blocking_constraints(solver, working_timetable, blocked_section, blockage_start, blockage_end, departure_vars, index=index,
+                                      blockages=blockages, arrival_vars=arrival_vars)
+
+    # Platform capacity constraints
+    solver = add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity, window=pair_window, index=index, formulation=platform_formulation)
+
+    # Running time constraints
+    solver = add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+
+    # Dwell time constraints
+    solver = add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
+
+    # Headway constraints
+    solver = add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars, window=pair_window, index=index)
+
+    return solver
+
+@instrumented("constraints.single_track")
+def add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars, valid_segments, window=None, index=None):
+    """
+    Adds constraints to prevent conflicts on single-track segments.
+
+    A train may only enter a segment once the previous train on it has cleared the far end. Only the
+    most recent clearing train (plus any within window minutes) is linked; earlier ones follow by
+    transitivity through the running time and headway constraints.
+    """
+    logger.debug("Adding single-track conflict constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    for current_train, next_train, current_station, next_station in single_track_pairs(index, valid_segments, arrival_vars, departure_vars, window):
+        solver += (
+            departure_vars[(next_train, current_station)] >= arrival_vars[(current_train, next_station)],
+            f"Single_Track_Conflict_{current_train}_{next_train}_{current_station}_To_{next_station}"
+        )
+
+    return solver
+
+def single_track_pairs(index, valid_segments, arrival_vars, departure_vars, window=None):
+    """
+    Yields (current_train, next_train, current_station, next_station) for every train entering a
+    single-track segment and each earlier train it must wait for to clear the far end.
+    """
+    for current_station, next_station in valid_segments:
+        cleared = []
+        for entering, leaving in index["by_segment"].get((current_station, next_station), []):
+            next_train = entering["train"]
+            entry_time = segment_entry_time((entering, leaving))
+
+            if (next_train, current_station) in departure_vars:
+                for k in range(len(cleared) - 1, -1, -1):
+                    cleared_time, current_train = cleared[k]
+                    if k < len(cleared) - 1 and (window is None or entry_time - cleared_time > window):
+                        break
+                    if current_train == next_train:
+                        continue
+                    yield current_train, next_train, current_station, next_station
+
+            if (leaving["train"], next_station) in arrival_vars:
+                cleared.append((entry_time, leaving["train"]))
+
+@instrumented("constraints.blocking")
+def add_blocking_constraints(solver, working_timetable, blocked_section, blockage_start, blockage_end, departure_vars, index=None,
+                             blockages=(), arrival_vars=None, big_m=1000, name="Block"):
+    """
+    Adds blocking constraints for the blocked section and any further blockages.
+
+    blockages lists further (section, start, end) possession windows; blocked_section may be None
+    when there are only those. A train entering a blocked segment either clears it (arrives at its
+    far end, or departs RUNNING_TIME minutes before the window when arrival_vars are not given) before
+    the window starts, or departs after it ends, chosen by a binary variable. Trains are not run
+    early to get ahead of a window: a departure whose plan does not clear the segment before the
+    window starts is simply held until it ends. A departure is only checked against the windows of
+    build_blockage_index on its own segment that overlap the range between its bounds, so the cost
+    stays linear in the departures however many windows are active. big_m is the M used for
+    variables without finite bounds, which are taken to stay within big_m minutes of their plan.
+    Constraint and variable names start with name.
+    """
+    logger.debug("Adding blocking constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+    if blocked_section is not None:
+        blockages = [(blocked_section, blockage_start, blockage_end)] + list(blockages)
+    blockage_index = build_blockage_index(blockages)
+
+    for section in blockage_index:
+        for entering, leaving in index["by_segment"].get(section, []):
+            key = (entering["train"], entering["station"])
+            if key not in departure_vars:
+                continue
+            departure = departure_vars[key]
+            if arrival_vars is not None and (leaving["train"], leaving["station"]) in arrival_vars:
+                cleared = arrival_vars[(leaving["train"], leaving["station"])]
+                planned_clear, latest_clear = leaving["arrival"], _upper_bound(cleared)
+            else:
+                cleared = departure + RUNNING_TIME
+                planned_clear, latest_clear = entering["departure"] + RUNNING_TIME, _upper_bound(departure) + RUNNING_TIME
+
+            # Unbounded departures may move big_m minutes either way, into any window in that range
+            earliest, latest = _lower_bound(departure), _upper_bound(departure)
+            if latest_clear == float("inf"):
+                latest_clear = planned_clear + big_m
+            windows = blockage_windows(blockage_index, section,
+                                       earliest if earliest != float("-inf") else entering["departure"] - big_m,
+                                       latest if latest != float("inf") else entering["departure"] + big_m)
+            for k, (start, end) in enumerate(windows):
+                suffix = f"_{k}" if k else ""
+                if earliest >= end or latest_clear <= start:
+                    continue
+                if planned_clear > start:
+                    solver += departure >= end, f"{name}_Departure_{key[0]}_{key[1]}{suffix}"
+                    continue
+                after = pulp.LpVariable(f"{name}_After_{key[0]}_{key[1]}{suffix}", cat="Binary")
+                depart_span = end - earliest if earliest != float("-inf") else big_m
+                solver += cleared <= start + (latest_clear - start) * after, f"{name}_Clear_{key[0]}_{key[1]}{suffix}"
+                solver += departure >= end - depart_span * (1 - after), f"{name}_Departure_{key[0]}_{key[1]}{suffix}"
+
+    return solver
+
+def blocked_departures(index, blocked_section, blockage_start, blockage_end):
+    """
+    Yields the (train, station) departures into the blocked section that add_blocking_constraints
+    holds until the blockage ends: planned before it ends, without clearing the section before it starts.
+    """
+    for entering, leaving in index["by_segment"].get(tuple(blocked_section), []):
+        departure = entering["departure"]
+        if departure is None or departure >= blockage_end:
+            continue
+        cleared = leaving["arrival"] if leaving["arrival"] is not None else departure + RUNNING_TIME
+        if cleared > blockage_start:
+            yield entering["train"], entering["station"]
+
+def add_delay(solver, working_timetable, departure_vars, train, station, delay):
+    """
+    Fixes one departure at its planned time plus delay, see add_delays.
+    """
+    return add_delays(solver, working_timetable, departure_vars, [(train, station, delay)])
+
+@instrumented("constraints.delay")
+def add_delays(solver, working_timetable, departure_vars, delays, index=None):
+    """
+    Fixes every (train, station, delay) departure at its planned time plus delay.
+
+    The planned departures are looked up through the timetable index, so many delays cost one pass
+    over the timetable instead of one each.
+    """
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    for train, station, delay in delays:
+        original_departure = next(entry["departure"] for entry in index["by_train"][train] if entry["station"] == station)
+        solver += departure_vars[(train, station)] == original_departure + delay, f"Delay_{train}_{station}"
+    return solver
+@instrumented("constraints.platform_capacity")
+def add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity, window=None, index=None, formulation="big_m", big_m=1000):
+    """
+    Adds platform capacity constraints dynamically, enforcing strict capacity limits and train presence rules.
+
+    formulation selects the original big-M occupancy model ("big_m") or the interval-ordering
+    model of add_interval_platform_capacity_constraints ("interval"). big_m is the M used for
+    variables without finite bounds.
+    """
+    if formulation == "interval":
+        return add_interval_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity, index=index, big_m=big_m)
+    if formulation != "big_m":
+        raise ValueError(f"Unknown platform capacity formulation: {formulation}")
+
+    logger.debug("Adding big-M platform capacity constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    for station, capacity in platform_capacity.items():
+        logger.debug("Station %s (capacity: %s platforms)", station, capacity)
+
+        # Skip start and terminal stations
+        if station in ["A", "E"]:
+            logger.debug("Skipping constraints for start/terminal station: %s", station)
+            continue
+
+        # Collect train schedules at the station
+        station_stops = index["by_station"].get(station, [])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Trains stopping at %s: %s", station, [entry['train'] for entry in station_stops])
+
+        # Create binary occupancy variables for each train
+        occupancy_vars = {}
+        for train in station_stops:
+            train_name = train["train"]
+            arrival = arrival_vars.get((train_name, station))
+            departure = departure_vars.get((train_name, station))
+
+            if arrival is None or departure is None:
+                logger.debug("Missing arrival or departure variable for train %s at station %s", train_name, station)
+                continue
+
+            var_name = f"Train_{train_name}_Occupying_{station}"
+            occupancy_vars[train_name] = pulp.LpVariable(var_name, cat="Binary")
+
+            # Big-M constraints to link occupancy with arrival and departure times, with M taken
+            # from the variable bounds when they are finite (for example after presolve)
+            solver += (
+                arrival - _span(arrival, departure, big_m) * (1 - occupancy_vars[train_name]) <= departure,
+                f"OccupancyActive_Start_{train_name}_{station}"
+            )
+            solver += (
+                departure <= arrival + _span(departure, arrival, big_m) * occupancy_vars[train_name],
+                f"OccupancyActive_End_{train_name}_{station}"
+            )
+            logger.debug("Linked train %s occupancy at %s", train_name, station)
+
+        # Add platform capacity constraint
+        solver += (
+            pulp.lpSum(occupancy_vars.values()) <= capacity,
+            f"TotalCapacity_{station}"
+        )
+        logger.debug("Added total capacity constraint for %s (max capacity: %s)", station, capacity)
+
+        # Add pairwise non-overlapping constraints between trains that are neighbours in time
+        M = big_m
+        for train1, train2 in neighbour_pairs(station_stops, planned_time, window):
+            train1_name, train2_name = train1['train'], train2['train']
+            arrival1, departure1 = arrival_vars.get((train1_name, station)), departure_vars.get((train1_name, station))
+            arrival2, departure2 = arrival_vars.get((train2_name, station)), departure_vars.get((train2_name, station))
+
+            if arrival1 and departure1 and arrival2 and departure2:
+                solver += (
+                    departure1 <= arrival2 + M * (1 - occupancy_vars[train2_name]),
+                    f"NoOverlap_{train1_name}_{train2_name}_{station}_1"
+                )
+                solver += (
+                    departure2 <= arrival1 + M * (1 - occupancy_vars[train1_name]),
+                    f"NoOverlap_{train1_name}_{train2_name}_{station}_2"
+                )
+                logger.debug("Added non-overlapping constraint between %s and %s at %s", train1_name, train2_name, station)
+
+    return solver
+
+def add_interval_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity, index=None, big_m=1000):
+    """
+    Adds platform capacity constraints as an interval-ordering model.
+
+    Trains keep their planned arrival order at a station (the headway constraints enforce it), so the
+    trains present when a train arrives are the earlier arrivals that have not yet departed. A
+    precedence binary records "train i has departed before train j arrives" and is only created
+    when the time windows of the two stops can overlap. Its M is taken from the variable bounds
+    (falling back to big_m for unbounded variables), and at every arrival at most capacity - 1
+    earlier trains may still be dwelling.
+    """
+    logger.debug("Adding interval platform capacity constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    for station, capacity, train_j, earlier in interval_platform_pairs(index, arrival_vars, departure_vars, platform_capacity, big_m):
+        still_present = []
+        for train_i, M in earlier:
+            departed = pulp.LpVariable(f"Departed_{train_i}_Before_{train_j}_{station}", cat="Binary")
+            solver += (
+                departure_vars[(train_i, station)] <= arrival_vars[(train_j, station)] + M * (1 - departed),
+                f"Precedence_{train_i}_{train_j}_{station}"
+            )
+            still_present.append(1 - departed)
+
+        if len(still_present) >= capacity:
+            solver += (
+                pulp.lpSum(still_present) <= capacity - 1,
+                f"Capacity_{train_j}_{station}"
+            )
+
+    return solver
+
+def interval_platform_pairs(index, arrival_vars, departure_vars, platform_capacity, big_m=1000):
+    """
+    Yields (station, capacity, train_j, [(train_i, M), ...]) for every arrival at a station with more
+    stops than platforms, listing the earlier trains whose stop can overlap it and the M of each pair.
+    """
+    for station, capacity in platform_capacity.items():
+        stops = []
+        for entry in index["by_station"].get(station, []):
+            key = (entry["train"], station)
+            if key in arrival_vars and key in departure_vars:
+                stops.append((entry["train"], arrival_vars[key], departure_vars[key]))
+
+        if len(stops) <= capacity:
+            continue
+
+        # Earliest possible arrival of any later stop, to stop scanning once no overlap is possible
+        earliest_later_arrival = [0.0] * (len(stops) + 1)
+        earliest_later_arrival[-1] = float("inf")
+        for j in range(len(stops) - 1, -1, -1):
+            earliest_later_arrival[j] = min(earliest_later_arrival[j + 1], _lower_bound(stops[j][1]))
+
+        earlier = [[] for _ in stops]
+        for i, (train_i, _, departure_i) in enumerate(stops):
+            latest_departure = _upper_bound(departure_i)
+            for j in range(i + 1, len(stops)):
+                if earliest_later_arrival[j] >= latest_departure:
+                    break
+                earliest_arrival = _lower_bound(stops[j][1])
+                if earliest_arrival >= latest_departure:
+                    continue
+                M = latest_departure - earliest_arrival if latest_departure != float("inf") else big_m
+                earlier[j].append((train_i, M))
+
+        for j, (train_j, _, _) in enumerate(stops):
+            if earlier[j]:
+                yield station, capacity, train_j, earlier[j]
+
+def _lower_bound(variable):
+    return variable.lowBound if variable.lowBound is not None else float("-inf")
+
+def _upper_bound(variable):
+    return variable.upBound if variable.upBound is not None else float("inf")
+
+def _span(later, earlier, big_m):
+    # Largest possible value of later - earlier, or big_m when the bounds leave it open
+    span = _upper_bound(later) - _lower_bound(earlier)
+    return max(span, 0) if span != float("inf") else big_m
+
+
+
+
+@instrumented("constraints.running_time")
+def add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars, index=None):
+    """
+    Adds constraints to enforce minimum running times between stations.
+    """
+    logger.debug("Adding running time constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    for train_stops in index["by_train"].values():
+        for current, next_entry in zip(train_stops, train_stops[1:]):
+            if current["departure"] is not None and next_entry["arrival"] is not None:
+                solver += (
+                    arrival_vars[(next_entry["train"], next_entry["station"])] -
+                    departure_vars[(current["train"], current["station"])] >= RUNNING_TIME,
+                    f"Running_{current['train']}_{current['station']}_To_{next_entry['station']}"
+                )
+
+    return solver
+
+@instrumented("constraints.dwell_time")
+def add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars):
+    """
+    Adds constraints to enforce minimum and maximum dwell times at stations.
+    """
+    logger.debug("Adding dwell time constraints...")
+
+    for entry in working_timetable:
+        if entry["departure"] is not None and entry["arrival"] is not None:
+            train, station = entry["train"], entry["station"]
+            solver += (
+                departure_vars[(train, station)] - arrival_vars[(train, station)] >= MIN_DWELL_TIME,
+                f"Min_Dwell_Time_{train}_{station}"
+            )
+            solver += (
+                departure_vars[(train, station)] - arrival_vars[(train, station)] <= MAX_DWELL_TIME,
+                f"Max_Dwell_Time_{train}_{station}"
+            )
+
+    return solver
+
+@instrumented("constraints.headway")
+def add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars, headway_time=HEADWAY_TIME, window=None, index=None):
+    """
+    Adds headway constraints to ensure safe time gaps between trains at the same station.
+
+    Trains keep their planned order, so chaining each event to its successor in time enforces the
+    headway between every pair; window adds direct links between events that close together.
+    """
+    logger.debug("Adding headway constraints...")
+
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    for kind, station, train, next_train in headway_pairs(index, window):
+        event_vars = departure_vars if kind == "Departure" else arrival_vars
+        solver += (
+            event_vars[(next_train, station)] - event_vars[(train, station)] >= headway_time,
+            f"Headway_{kind}_{train}_{next_train}_{station}"
+        )
+
+    return solver
+
+def headway_pairs(index, window=None):
+    """
+    Yields ("Departure" | "Arrival", station, train, next_train) for every pair of events at a
+    station that must be at least the headway apart, in planned order.
+    """
+    for station, station_stops in index["by_station"].items():
+        departures = [entry for entry in station_stops if entry["departure"] is not None]
+        for current, next_entry in neighbour_pairs(departures, lambda entry: entry["departure"], window):
+            if current["train"] != next_entry["train"]:
+                yield "Departure", station, current["train"], next_entry["train"]
+
+        arrivals = [entry for entry in station_stops if entry["arrival"] is not None]
+        for current, next_entry in neighbour_pairs(arrivals, lambda entry: entry["arrival"], window):
+            if current["train"] != next_entry["train"]:
+                yield "Arrival", station, current["train"], next_entry["train"]
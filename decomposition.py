@@ -0,0 +1,302 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from constraints import HEADWAY_TIME, RUNNING_TIME, headway_pairs, single_track_pairs
+from instrumentation import instrumented
+from scenario import build_scenario_model, total_deviation
+from solver_config import SolverConfig, solve_with_stats
+from timetable import Timetable
+from timetable_index import build_timetable_index
+
+logger = logging.getLogger(__name__)
+
+
+def find_junctions(working_timetable):
+    """
+    Returns the stations where lines meet: those adjacent to more than two other stations along the
+    train routes.
+    """
+    neighbours = {}
+    for train_stops in build_timetable_index(working_timetable)["by_train"].values():
+        for current, next_entry in zip(train_stops, train_stops[1:]):
+            neighbours.setdefault(current["station"], set()).add(next_entry["station"])
+            neighbours.setdefault(next_entry["station"], set()).add(current["station"])
+    return sorted(station for station, adjacent in neighbours.items() if len(adjacent) > 2)
+
+
+def partition_network(working_timetable, junctions=None):
+    """
+    Splits the network into sub-networks that only meet at junction stations.
+
+    The stations left after removing the junctions fall apart into connected components along the
+    train routes, one sub-network each. Every timetable row belongs to the sub-network of its
+    station; a row at a junction belongs to the sub-network the train comes from (or goes to, at
+    its origin).
+
+    Returns:
+        A dict with the "junctions", the "stations" of every sub-network and the sub-network
+        "owner" of every timetable row.
+    """
+    if junctions is None:
+        junctions = find_junctions(working_timetable)
+    junctions = set(junctions)
+    entries = list(working_timetable)
+    index = build_timetable_index(entries)
+
+    parent = {}
+
+    def find(station):
+        parent.setdefault(station, station)
+        while parent[station] != station:
+            parent[station] = parent[parent[station]]
+            station = parent[station]
+        return station
+
+    for entry in entries:
+        if entry["station"] not in junctions:
+            find(entry["station"])
+    for train_stops in index["by_train"].values():
+        for current, next_entry in zip(train_stops, train_stops[1:]):
+            if current["station"] not in junctions and next_entry["station"] not in junctions:
+                parent[find(current["station"])] = find(next_entry["station"])
+
+    components = {}
+    for station in parent:
+        components.setdefault(find(station), []).append(station)
+    stations = sorted((sorted(members) for members in components.values()), key=lambda members: members[0])
+    subnetwork_of = {station: k for k, members in enumerate(stations) for station in members}
+
+    row_of = {id(entry): row for row, entry in enumerate(entries)}
+    owner = [subnetwork_of.get(entry["station"]) for entry in entries]
+    for train_stops in index["by_train"].values():
+        for k, entry in enumerate(train_stops):
+            if entry["station"] not in junctions:
+                continue
+            nearby = train_stops[k - 1::-1] if k else []
+            nearby = list(nearby) + train_stops[k + 1:]
+            home = next((subnetwork_of[other["station"]] for other in nearby if other["station"] in subnetwork_of), 0)
+            owner[row_of[id(entry)]] = home
+
+    return {"junctions": sorted(junctions), "stations": stations, "owner": owner}
+
+
+@instrumented("decomposition")
+def solve_decomposed(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity, delays=(),
+                     junctions=None, platform_formulation="big_m", objective_mode="symmetric", weights=None, solver_config=None,
+                     max_workers=None):
+    """
+    Reschedules a network sub-network by sub-network, solving the sub-networks in parallel processes.
+
+    Sub-networks (see partition_network) only interact at the junctions, through the headway,
+    platform capacity and single-track rules between their trains and through trains that cross
+    from one to the other. Coordination is by iterative fixing: all sub-networks are first solved
+    independently, then the merged times are checked for conflicts between sub-networks. The
+    sub-networks without conflicts are settled, together with the conflicting one with the largest
+    deviation. The others are re-solved in parallel with the junction events of every settled
+    sub-network included at their fixed times. A sub-network that cannot meet those fixed times is
+    merged with the settled sub-networks that fixed them and the group is solved as one. Every
+    round settles or merges sub-networks, so the times agree after at most a few rounds, each
+    taking as long as its largest (group of) sub-networks; in the worst case the groups grow into
+    the whole network.
+
+    Returns:
+        A dict with the overall "status", the merged "arrival_times" and "departure_times" (usable with
+        analyze_solution), the total deviation "objective", the number of "rounds", the "partition"
+        and per-round solver statistics in "solver_stats".
+    """
+    solver_config = solver_config or SolverConfig()
+    entries = list(working_timetable)
+    partition = partition_network(entries, junctions)
+    owner = partition["owner"]
+    num_subnetworks = len(partition["stations"])
+    logger.info("Decomposed %d stations into %d sub-networks around junctions %s", sum(map(len, partition["stations"])),
+                num_subnetworks, partition["junctions"])
+
+    junctions = set(partition["junctions"])
+    arrival_times, departure_times = {}, {}
+    settled = []
+    unsettled = [frozenset([k]) for k in range(num_subnetworks)]
+    rounds = []
+    status = "Optimal"
+
+    with ProcessPoolExecutor(max_workers=max_workers or min(num_subnetworks, 8) or 1) as executor:
+        while unsettled:
+            settled_ids = set().union(*settled)
+            tasks = [
+                _subnetwork_task(entries, owner, group, settled_ids, junctions, arrival_times, departure_times, blocked_section,
+                                 blockage_start, blockage_end, valid_segments, platform_capacity, delays, platform_formulation,
+                                 objective_mode, weights, solver_config)
+                for group in unsettled
+            ]
+            results = list(executor.map(_solve_subnetwork, tasks))
+            rounds.append({tuple(sorted(group)): result["solver_stats"] for group, result in zip(unsettled, results)})
+
+            # A group that cannot meet the fixed junction times takes in the settled groups that fixed them
+            merged = []
+            for group, task, result in zip(unsettled, tasks, results):
+                if result["status"] == "Optimal":
+                    arrival_times.update(result["arrival_times"])
+                    departure_times.update(result["departure_times"])
+                    continue
+                if not task["fixed_from"]:
+                    status = result["status"]
+                    break
+                absorbed = [other for other in settled if other & task["fixed_from"]]
+                settled = [other for other in settled if other not in absorbed]
+                merged.append(group.union(*absorbed))
+            if status != "Optimal":
+                logger.warning("Sub-networks %s ended %s in round %d", sorted(group), status, len(rounds))
+                break
+            if merged:
+                logger.info("Round %d: merging sub-networks %s", len(rounds), [sorted(group) for group in merged])
+                unsettled = _coalesce(merged + [group for group in unsettled if not any(group & other for other in merged)])
+                continue
+
+            conflicts = _conflicts(entries, owner, junctions, valid_segments, platform_capacity, arrival_times, departure_times)
+            conflicting = [group for group in unsettled if any(group & set(pair) for pair in conflicts)]
+            logger.info("Round %d: solved %d sub-networks, %d conflicts between sub-networks", len(rounds), len(unsettled), len(conflicts))
+
+            settled += [group for group in unsettled if group not in conflicting]
+            if conflicting:
+                deviation = {group: result["solver_stats"]["objective"] or 0 for group, result in zip(unsettled, results)}
+                settled.append(max(conflicting, key=lambda group: (deviation[group], -min(group))))
+            unsettled = [group for group in unsettled if group not in settled]
+
+    objective = None
+    if status == "Optimal":
+        objective = total_deviation(entries, arrival_times, departure_times)
+    return {
+        "status": status,
+        "arrival_times": arrival_times,
+        "departure_times": departure_times,
+        "objective": objective,
+        "rounds": len(rounds),
+        "partition": partition,
+        "solver_stats": rounds,
+    }
+
+
+def _subnetwork_task(entries, owner, group, settled, junctions, arrival_times, departure_times, blocked_section, blockage_start, blockage_end,
+                     valid_segments, platform_capacity, delays, platform_formulation, objective_mode, weights, solver_config):
+    """
+    Collects the rows a group of sub-networks is solved over: its own rows, plus the rows of settled
+    sub-networks at the junctions its trains pass or next to its own stops, fixed at their settled times.
+    """
+    trains = {entry["train"] for row, entry in enumerate(entries) if owner[row] in group}
+    stations = {entry["station"] for row, entry in enumerate(entries)
+                if owner[row] in group or (entry["train"] in trains and entry["station"] in junctions)}
+    # The stops next to an own stop of the same train are linked to it by the running time rule
+    adjacent = set()
+    row_of = {(entry["train"], entry["station"]): row for row, entry in enumerate(entries)}
+    for train_stops in build_timetable_index(entries)["by_train"].values():
+        train_rows = [row_of[(entry["train"], entry["station"])] for entry in train_stops]
+        for current, next_row in zip(train_rows, train_rows[1:]):
+            if owner[current] in group or owner[next_row] in group:
+                adjacent.update((current, next_row))
+    rows, arrival_bounds, departure_bounds = [], {}, {}
+    fixed_from = set()
+    for row, entry in enumerate(entries):
+        if owner[row] in group:
+            rows.append(row)
+        elif owner[row] in settled and (row in adjacent or (entry["station"] in junctions and entry["station"] in stations)):
+            rows.append(row)
+            fixed_from.add(owner[row])
+            key = (entry["train"], entry["station"])
+            if key in arrival_times:
+                arrival_bounds[key] = (arrival_times[key], arrival_times[key])
+            if key in departure_times:
+                departure_bounds[key] = (departure_times[key], departure_times[key])
+
+    own = {(entries[row]["train"], entries[row]["station"]) for row in rows if owner[row] in group}
+    return {
+        "fixed_from": fixed_from,
+        "timetable": Timetable.from_records([entries[row] for row in rows]),
+        "own": own,
+        "bounds": (arrival_bounds, departure_bounds),
+        "blockage": (blocked_section, blockage_start, blockage_end),
+        "valid_segments": valid_segments,
+        "platform_capacity": {station: capacity for station, capacity in platform_capacity.items() if station in stations},
+        "delays": [delay for delay in delays if (delay[0], delay[1]) in own],
+        "platform_formulation": platform_formulation,
+        "objective_mode": objective_mode,
+        "weights": weights,
+        "solver_config": solver_config,
+    }
+
+
+def _coalesce(groups):
+    # Unions overlapping groups until they are disjoint
+    groups = list(groups)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(groups)):
+            for j in range(i + 1, len(groups)):
+                if groups[i] & groups[j]:
+                    groups[i] = groups[i] | groups.pop(j)
+                    merged = True
+                    break
+            if merged:
+                break
+    return groups
+
+
+def _solve_subnetwork(task):
+    blocked_section, blockage_start, blockage_end = task["blockage"]
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        task["timetable"], blocked_section, blockage_start, blockage_end, task["valid_segments"], task["platform_capacity"],
+        delays=task["delays"], platform_formulation=task["platform_formulation"], bounds=task["bounds"],
+        objective_mode=task["objective_mode"], weights=task["weights"])
+    solver_stats = solve_with_stats(solver, task["solver_config"])
+
+    own = task["own"]
+    return {
+        "status": solver_stats["status"],
+        "solver_stats": solver_stats,
+        "arrival_times": {key: variable.varValue for key, variable in arrival_vars.items() if key in own},
+        "departure_times": {key: variable.varValue for key, variable in departure_vars.items() if key in own},
+    }
+
+
+def _conflicts(entries, owner, junctions, valid_segments, platform_capacity, arrival_times, departure_times, tolerance=1e-6):
+    """
+    Checks the rules that link two sub-networks on the merged times.
+
+    Returns:
+        The set of (sub-network, sub-network) pairs with a violated running time, headway,
+        single-track or platform capacity rule between their events.
+    """
+    owner_of = {(entry["train"], entry["station"]): owner[row] for row, entry in enumerate(entries)}
+    index = build_timetable_index(entries)
+    conflicts = set()
+
+    def check(earlier_key, later_key, later_time, earlier_time, gap):
+        if owner_of[earlier_key] != owner_of[later_key] and later_time - earlier_time < gap - tolerance:
+            conflicts.add(tuple(sorted((owner_of[earlier_key], owner_of[later_key]))))
+
+    for train_stops in index["by_train"].values():
+        for current, next_entry in zip(train_stops, train_stops[1:]):
+            current_key, next_key = (current["train"], current["station"]), (next_entry["train"], next_entry["station"])
+            if current_key in departure_times and next_key in arrival_times:
+                check(current_key, next_key, arrival_times[next_key], departure_times[current_key], RUNNING_TIME)
+
+    for kind, station, train, next_train in headway_pairs(index):
+        if station in junctions:
+            times = departure_times if kind == "Departure" else arrival_times
+            check((train, station), (next_train, station), times[(next_train, station)], times[(train, station)], HEADWAY_TIME)
+
+    for current_train, next_train, current_station, next_station in single_track_pairs(index, valid_segments, arrival_times, departure_times):
+        check((current_train, next_station), (next_train, current_station), departure_times[(next_train, current_station)],
+              arrival_times[(current_train, next_station)], 0)
+
+    for station in junctions & set(platform_capacity):
+        stops = [(entry["train"], station) for entry in index["by_station"].get(station, [])
+                 if (entry["train"], station) in arrival_times and (entry["train"], station) in departure_times]
+        for j, key_j in enumerate(stops):
+            present = [key_i for key_i in stops[:j] if departure_times[key_i] > arrival_times[key_j] + tolerance]
+            if len(present) >= platform_capacity[station]:
+                for key_i in present:
+                    if owner_of[key_i] != owner_of[key_j]:
+                        conflicts.add(tuple(sorted((owner_of[key_i], owner_of[key_j]))))
+
+    return conflicts
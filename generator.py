@@ -0,0 +1,87 @@
+import random
+
+
+def generate_scenario(num_trains, num_stations=5, num_lines=1, seed=0, interval=20, running_time=15, dwell_time=4,
+                      skip_probability=0.1, single_track_probability=0.5, num_delays=1, max_delay=60):
+    """
+    Generates a seeded synthetic network, timetable and disruption in the layout of data.py.
+
+    With one line this is a corridor S0 -> S{n-1}. With several lines, each line has its own
+    stations and all lines pass through a shared junction station "J" halfway along. Trains take
+    turns between the lines and one departs from an origin every interval minutes, so the
+    junction also sees one train per interval. Intermediate stops are skipped with
+    skip_probability (like T4 and T6 at C in data.py).
+
+    Returns:
+        A dict with station_order (per line), valid_segments, platform_capacity,
+        original_timetable, blocked_section, blockage_start, blockage_end and delays.
+    """
+    rng = random.Random(seed)
+
+    lines = []
+    for line in range(num_lines):
+        stations = []
+        for k in range(num_stations):
+            if num_lines > 1 and k == num_stations // 2:
+                stations.append("J")
+            elif num_lines > 1:
+                stations.append(f"L{line}S{k}")
+            else:
+                stations.append(f"S{k}")
+        lines.append(stations)
+
+    segments = sorted({(a, b) for stations in lines for a, b in zip(stations, stations[1:])})
+    valid_segments = [segment for segment in segments if rng.random() < single_track_probability]
+
+    platform_capacity = {}
+    for stations in lines:
+        for k, station in enumerate(stations):
+            if k in (0, len(stations) - 1):
+                platform_capacity[station] = 30
+            elif station == "J":
+                platform_capacity[station] = 2 * num_lines
+            else:
+                platform_capacity[station] = rng.randint(1, 4)
+
+    original_timetable = []
+    for t in range(num_trains):
+        line = t % num_lines
+        stations = lines[line]
+        start = t * interval + rng.randint(0, interval // 4)
+
+        train = f"T{t + 1}"
+        time = start
+        for k, station in enumerate(stations):
+            if k == 0:
+                original_timetable.append({"train": train, "station": station, "arrival": None, "departure": time})
+            elif k == len(stations) - 1:
+                time += running_time
+                original_timetable.append({"train": train, "station": station, "arrival": time, "departure": None})
+            elif station != "J" and rng.random() < skip_probability:
+                time += running_time + dwell_time
+                original_timetable.append({"train": train, "station": station, "arrival": None, "departure": None})
+            else:
+                time += running_time
+                original_timetable.append({"train": train, "station": station, "arrival": time, "departure": time + dwell_time})
+                time += dwell_time
+
+    blocked_line = lines[rng.randrange(num_lines)]
+    k = rng.randrange(len(blocked_line) - 1)
+    departures = [entry["departure"] for entry in original_timetable if entry["departure"] is not None]
+    blockage_start = rng.randint(0, max(departures) // 2) if departures else 0
+    blockage_end = blockage_start + rng.randint(15, 60)
+
+    candidates = [entry for entry in original_timetable if entry["departure"] is not None and entry["arrival"] is not None]
+    delays = [(entry["train"], entry["station"], rng.randint(1, max_delay))
+              for entry in rng.sample(candidates, min(num_delays, len(candidates)))]
+
+    return {
+        "station_order": lines,
+        "valid_segments": valid_segments,
+        "platform_capacity": platform_capacity,
+        "original_timetable": original_timetable,
+        "blocked_section": (blocked_line[k], blocked_line[k + 1]),
+        "blockage_start": blockage_start,
+        "blockage_end": blockage_end,
+        "delays": delays,
+    }
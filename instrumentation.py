@@ -0,0 +1,83 @@
+import contextlib
+import functools
+import json
+import logging
+import time
+from collections import defaultdict
+
+import pulp
+
+# Per-process metrics: seconds and calls per phase, constraints added per constraint family
+_timings = defaultdict(float)
+_calls = defaultdict(int)
+_constraints = defaultdict(int)
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """
+    Adds the wall time of the enclosed block to the given phase.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings[phase] += time.perf_counter() - started
+        _calls[phase] += 1
+
+
+def instrumented(phase):
+    """
+    Decorator that times a pipeline function under phase. When the first argument is the
+    LpProblem being built, the number of constraints the call added is also counted for phase.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            solver = args[0] if args and isinstance(args[0], pulp.LpProblem) else None
+            before = solver.numConstraints() if solver is not None else 0
+            with timed(phase):
+                result = function(*args, **kwargs)
+            if solver is not None:
+                _constraints[phase] += solver.numConstraints() - before
+            return result
+        return wrapper
+    return decorator
+
+
+def metrics():
+    """
+    Returns a snapshot of the collected phase timings, call counts and constraint counts.
+    """
+    return {
+        "timings": dict(_timings),
+        "calls": dict(_calls),
+        "constraints": dict(_constraints),
+    }
+
+
+def reset_metrics():
+    _timings.clear()
+    _calls.clear()
+    _constraints.clear()
+
+
+def export_metrics(path):
+    """
+    Writes the collected metrics to path as JSON.
+    """
+    with open(path, "w") as output:
+        json.dump(metrics(), output, indent=2)
+
+
+def log_metrics(logger):
+    for phase, seconds in sorted(_timings.items(), key=lambda item: -item[1]):
+        added = f", {_constraints[phase]} constraints" if phase in _constraints else ""
+        logger.info("%-40s %8.3fs (%d calls%s)", phase, seconds, _calls[phase], added)
+
+
+def configure_logging(verbose=False):
+    """
+    Sets up console logging for the command-line entry points. verbose enables the per-pair debug output.
+    """
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
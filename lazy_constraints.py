@@ -0,0 +1,202 @@
+import logging
+
+import numpy as np
+import pulp
+
+from constraints import (
+    add_blocking_constraints,
+    add_running_time_constraints,
+    add_dwell_time_constraints,
+    add_platform_capacity_constraints,
+    add_delays,
+    headway_pairs,
+    single_track_pairs,
+    interval_platform_pairs,
+    HEADWAY_TIME,
+)
+from instrumentation import instrumented, timed
+from model import create_model
+from objective import set_objective
+from solver_config import SolverConfig, solve_with_stats
+from timetable_index import build_timetable_index
+
+logger = logging.getLogger(__name__)
+
+# Slack allowed before a rule counts as violated, to absorb solver round-off
+TOLERANCE = 1e-6
+
+
+def solve_lazy(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity, delays=(),
+               platform_formulation="big_m", pair_window=None, max_early=None, max_delay=None, max_rounds=50, solver_config=None,
+               objective_mode="symmetric", weights=None, blockages=()):
+    """
+    Solves a scenario with lazily added headway, single-track and platform constraints.
+
+    The first model only has the running time, dwell time, blocking and delay constraints (plus the
+    big-M platform constraints, which do not depend on the times). After each solve, check_violations
+    tests the solution against every headway, single-track and interval platform rule that
+    build_scenario_model would add, only the violated ones are added, and the model is re-solved
+    until nothing is violated. The optimum is the same as for the full model. objective_mode,
+    weights and blockages are passed on as in build_scenario_model.
+
+    Returns:
+        A dict with the final "status", the "solver", "arrival_vars" and "departure_vars", the number
+        of solve "rounds", the constraints "added" per family, the final "constraints" count and the
+        per-round "solver_stats".
+    """
+    solver_config = solver_config or SolverConfig()
+    index = build_timetable_index(working_timetable)
+
+    solver, arrival_vars, departure_vars = create_model(working_timetable, max_early=max_early, max_delay=max_delay)
+    solver = add_blocking_constraints(solver, working_timetable, blocked_section, blockage_start, blockage_end, departure_vars, index=index,
+                                      blockages=blockages, arrival_vars=arrival_vars)
+    solver = add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+    solver = add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
+    if platform_formulation == "big_m":
+        solver = add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity,
+                                                   window=pair_window, index=index)
+    elif platform_formulation != "interval":
+        raise ValueError(f"Unknown platform capacity formulation: {platform_formulation}")
+    solver = add_delays(solver, working_timetable, departure_vars, delays, index=index)
+    solver = set_objective(solver, working_timetable, arrival_vars, departure_vars, mode=objective_mode, **(weights or {}))
+
+    rules = build_lazy_rules(index, arrival_vars, departure_vars, valid_segments,
+                             platform_capacity if platform_formulation == "interval" else {}, window=pair_window)
+
+    added = {"headway": 0, "single_track": 0, "platform_capacity": 0}
+    rounds = []
+    status = None
+    for _ in range(max_rounds):
+        with timed("solve"):
+            solver_stats = solve_with_stats(solver, solver_config)
+        rounds.append(solver_stats)
+        status = solver_stats["status"]
+        if status != "Optimal":
+            break
+
+        violations = check_violations(rules)
+        logger.info("Lazy round %d: %d headway, %d single-track and %d platform violations", len(rounds),
+                    len(violations["headway"]), len(violations["single_track"]), len(violations["platform_capacity"]))
+        if not any(len(violated) for violated in violations.values()):
+            break
+        for family, count in add_violated_constraints(solver, rules, violations).items():
+            added[family] += count
+    else:
+        status = "Not Solved"
+        logger.warning("Lazy constraint loop stopped after %d rounds with violations left", max_rounds)
+
+    return {
+        "status": status,
+        "solver": solver,
+        "arrival_vars": arrival_vars,
+        "departure_vars": departure_vars,
+        "rounds": len(rounds),
+        "added": added,
+        "constraints": solver.numConstraints(),
+        "solver_stats": rounds,
+    }
+
+
+@instrumented("lazy.rules")
+def build_lazy_rules(index, arrival_vars, departure_vars, valid_segments, platform_capacity, headway_time=HEADWAY_TIME, window=None):
+    """
+    Collects every headway, single-track and interval platform rule as arrays the checker can test at once.
+
+    A pairwise rule reads "later - earlier >= gap" with later and earlier as positions in "variables".
+    A platform rule lists, for one arrival, the earlier stops that may still be present.
+    """
+    variables = list(arrival_vars.values()) + list(departure_vars.values())
+    position = {id(variable): k for k, variable in enumerate(variables)}
+
+    def pairwise(specs):
+        later = np.array([position[id(spec[0])] for spec in specs], dtype=np.intp)
+        earlier = np.array([position[id(spec[1])] for spec in specs], dtype=np.intp)
+        gap = np.array([spec[2] for spec in specs], dtype=np.float64)
+        return {"later": later, "earlier": earlier, "gap": gap, "names": [spec[3] for spec in specs]}
+
+    headway = []
+    for kind, station, train, next_train in headway_pairs(index, window):
+        event_vars = departure_vars if kind == "Departure" else arrival_vars
+        headway.append((event_vars[(next_train, station)], event_vars[(train, station)], headway_time,
+                        f"Headway_{kind}_{train}_{next_train}_{station}"))
+
+    single_track = []
+    for current_train, next_train, current_station, next_station in single_track_pairs(index, valid_segments, arrival_vars, departure_vars, window):
+        single_track.append((departure_vars[(next_train, current_station)], arrival_vars[(current_train, next_station)], 0,
+                             f"Single_Track_Conflict_{current_train}_{next_train}_{current_station}_To_{next_station}"))
+
+    platform = []
+    for station, capacity, train_j, earlier in interval_platform_pairs(index, arrival_vars, departure_vars, platform_capacity):
+        if len(earlier) >= capacity:
+            platform.append((station, capacity, train_j, earlier))
+    group = np.repeat(np.arange(len(platform)), [len(earlier) for _, _, _, earlier in platform]).astype(np.intp)
+    arrivals = np.array([position[id(arrival_vars[(train_j, station)])] for station, _, train_j, earlier in platform for _ in earlier], dtype=np.intp)
+    departures = np.array([position[id(departure_vars[(train_i, station)])] for station, _, _, earlier in platform for train_i, _ in earlier], dtype=np.intp)
+
+    return {
+        "variables": variables,
+        "headway": pairwise(headway),
+        "single_track": pairwise(single_track),
+        "platform_capacity": {
+            "groups": platform,
+            "group": group,
+            "arrival": arrivals,
+            "departure": departures,
+            "capacity": np.array([capacity for _, capacity, _, _ in platform], dtype=np.int64),
+        },
+        "arrival_vars": arrival_vars,
+        "departure_vars": departure_vars,
+    }
+
+
+@instrumented("lazy.check")
+def check_violations(rules, values=None):
+    """
+    Tests the current solution (or the given values, aligned with rules["variables"]) against every rule.
+
+    Returns:
+        A dict with the positions of the violated rules per family.
+    """
+    if values is None:
+        values = np.array([variable.varValue for variable in rules["variables"]], dtype=np.float64)
+
+    violations = {}
+    for family in ("headway", "single_track"):
+        rule = rules[family]
+        violations[family] = np.flatnonzero(values[rule["later"]] - values[rule["earlier"]] < rule["gap"] - TOLERANCE)
+
+    platform = rules["platform_capacity"]
+    present = values[platform["departure"]] > values[platform["arrival"]] + TOLERANCE
+    counts = np.bincount(platform["group"][present], minlength=len(platform["groups"]))
+    violations["platform_capacity"] = np.flatnonzero(counts >= platform["capacity"])
+    return violations
+
+
+def add_violated_constraints(solver, rules, violations):
+    """
+    Adds the constraints of the violated rules to the model, named as build_scenario_model names them.
+    Returns the number of constraints added per family.
+    """
+    added = {}
+    for family in ("headway", "single_track"):
+        rule = rules[family]
+        for k in violations[family].tolist():
+            later, earlier = rules["variables"][rule["later"][k]], rules["variables"][rule["earlier"][k]]
+            solver += later - earlier >= rule["gap"][k], rule["names"][k]
+        added[family] = len(violations[family])
+
+    arrival_vars, departure_vars = rules["arrival_vars"], rules["departure_vars"]
+    added["platform_capacity"] = 0
+    for k in violations["platform_capacity"].tolist():
+        station, capacity, train_j, earlier = rules["platform_capacity"]["groups"][k]
+        still_present = []
+        for train_i, M in earlier:
+            departed = pulp.LpVariable(f"Departed_{train_i}_Before_{train_j}_{station}", cat="Binary")
+            solver += (
+                departure_vars[(train_i, station)] <= arrival_vars[(train_j, station)] + M * (1 - departed),
+                f"Precedence_{train_i}_{train_j}_{station}"
+            )
+            still_present.append(1 - departed)
+        solver += pulp.lpSum(still_present) <= capacity - 1, f"Capacity_{train_j}_{station}"
+        added["platform_capacity"] += len(earlier) + 1
+    return added
@@ -1,114 +1,253 @@
-from model import create_model
-from analysis import analyze_solution
-from data import original_timetable, working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity
-from constraints import add_constraints  # Updated to include all constraints
-from objective import set_objective
-from visualization import plot_timetable
-import pulp
-
-def add_delay(solver, working_timetable, departure_vars, train, station, delay):
-    original_departure = next(entry["departure"] for entry in working_timetable if entry["train"] == train and entry["station"] == station)
-    solver += departure_vars[(train, station)] == original_departure + delay, f"Delay_{train}_{station}"
-    return solver
-def analyze_platform_occupancy(working_timetable, arrival_vars, departure_vars, platform_capacity):
-    """
-    Analyzes and prints platform occupancy timelines, including when platforms are occupied and released.
-    """
-    print("\n=== Platform Occupancy Analysis ===")
-    for station, capacity in platform_capacity.items():
-        if station in ["A", "E"]:  # Skip start and terminal stations
-            continue
-        print(f"\n--- Station: {station} --- (Capacity: {capacity} platforms)")
-
-        # Collect all events (arrival and departure)
-        events = []
-        station_stops = [entry for entry in working_timetable if entry['station'] == station]
-        print(f"DEBUG: Station stops at {station}: {station_stops}")
-        for entry in station_stops:
-            train = entry['train']
-            arrival_key = (train, station)
-            departure_key = (train, station)
-            
-            # Debug: Print the keys and their presence in the dictionaries
-            print(f"DEBUG: Checking arrival_key: {arrival_key}, Present: {arrival_key in arrival_vars}")
-            print(f"DEBUG: Checking departure_key: {departure_key}, Present: {departure_key in departure_vars}")
-            
-            arrival_var = arrival_vars.get(arrival_key)
-            departure_var = departure_vars.get(departure_key)
-            
-            if arrival_var is not None and departure_var is not None:
-                arrival_time = pulp.value(arrival_var)
-                departure_time = pulp.value(departure_var)
-                print(f"DEBUG: Train {train} - Arrival: {arrival_time}, Departure: {departure_time}")
-                if arrival_time is not None and departure_time is not None:
-                    events.append((arrival_time, 'arrival', train))
-                    events.append((departure_time, 'departure', train))
-            else:
-                print(f"WARNING: Missing arrival or departure variable for Train {train} at Station {station}")
-
-        # Sort events by time
-        events.sort()
-        print(f"DEBUG: Sorted events at {station}: {events}")
-
-        # Track platform occupancy
-        occupied = 0
-        for time, event_type, train in events:
-            if event_type == 'arrival':
-                occupied += 1
-                print(f"  Time {time:.2f}: Train {train} occupies a platform (Occupied: {occupied}, Free: {capacity - occupied})")
-            elif event_type == 'departure':
-                print(f"  Time {time:.2f}: Train {train} releases a platform (Occupied: {occupied - 1}, Free: {capacity - (occupied - 1)})")
-                occupied -= 1
-def main():
-    # Create the optimization model
-    solver, arrival_vars, departure_vars = create_model(working_timetable)
-
-    print("\nDEBUG: Adding constraints...")
-    # Add constraints to the solver, including the blocking constraints and single-track conflicts
-    solver = add_constraints(solver, working_timetable, arrival_vars, departure_vars,
-                             blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity)
-    print("DEBUG: Constraints added.")
-
-    # Debug: Print all constraints added to the solver
-    print("\n=== Constraints Added to Solver ===")
-    for name, constraint in solver.constraints.items():
-        print(f"{name}: {constraint}")
-    # Add a delay for Train TX at station D
-    delay = 50
-    solver = add_delay(solver, working_timetable, departure_vars, "T3", "C", delay)
-    # Set the objective function
-    solver = set_objective(solver, working_timetable, arrival_vars, departure_vars)
-
-    # Solve the problem
-    print("\nSolving the optimization problem...")
-    status = solver.solve()
-
-    # Check if the solution is optimal
-    if pulp.LpStatus[status] == "Optimal":
-        print("\nFound an optimal solution!")
-        optimized_timetable = analyze_solution(working_timetable, arrival_vars, departure_vars)
-
-        print("\nOptimized Timetable:")
-        for entry in optimized_timetable:
-            print(entry)
-
-        # Analyze platform occupancy
-        analyze_platform_occupancy(working_timetable, arrival_vars, departure_vars, platform_capacity)
-
-        # Visualize the timetables
-        station_order = ["A", "B", "C", "D", "E"]
-        plot_timetable(
-            original_timetable,
-            "Original Timetable",
-            station_order,
-            "original_timetable.png",
-            blocked_section=blocked_section,
-            blockage_start=blockage_start,
-            blockage_end=blockage_end
-        )
-        plot_timetable(optimized_timetable, "Optimized Timetable", station_order, "optimized_timetable.png")
-    else:
-        print("\nCould not find an optimal solution.")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+from model import create_model
+from analysis import analyze_solution, extract_solution, platform_occupancy
+from data import original_timetable, working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity
+from constraints import add_constraints, add_delays  # Updated to include all constraints
+from objective import OBJECTIVE_MODES, set_objective
+from visualization import plot_comparison
+from rolling_horizon import solve_rolling_horizon
+from presolve import build_presolved_model
+from lazy_constraints import solve_lazy
+from decomposition import solve_decomposed
+from dispatcher import dispatch_timetable, solve_with_fallback
+from snapshot import open_snapshot, solve_snapshot
+from verifier import verify_timetable
+from robustness import ROBUSTNESS_METRICS, compare_robustness
+from scenario_cache import ScenarioCache, solve_cached
+from solver_config import SolverConfig, available_backends, has_solution, solve_with_stats
+from instrumentation import configure_logging, export_metrics, log_metrics, timed
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+def analyze_platform_occupancy(working_timetable, arrival_vars, departure_vars, platform_capacity):
+    """
+    Logs the peak occupancy and utilisation of each station's platforms and any intervals where
+    the capacity is exceeded, and returns the platform_occupancy result.
+    """
+    new_arrival, new_departure = extract_solution(working_timetable, arrival_vars, departure_vars)
+    occupancy = platform_occupancy(working_timetable, new_arrival, new_departure, platform_capacity)
+    for station, result in occupancy.items():
+        if station in ["A", "E"]:  # Skip start and terminal stations
+            continue
+        logger.info("Station %s: peak occupancy %d of %d platforms, utilisation %.0f%%",
+                    station, result["peak"], result["capacity"], 100 * result["utilisation"])
+        for start, end in result["exceeded"]:
+            logger.warning("Station %s is over capacity from %.2f to %.2f", station, start, end)
+    return occupancy
+
+def main(rolling_horizon=False, metrics_path=None, solver_config=None, presolve=False, cache=None, lazy=False, dispatch=False,
+         snapshot_dir=None, objective_mode="symmetric", decompose=False, weights=None):
+    """
+    Reschedules the example timetable and returns the status, the optimized timetable from
+    analyze_solution (None without a solution) and the solver statistics. presolve restricts the
+    model to the trains the disruption can reach, see build_presolved_model. With a ScenarioCache,
+    a previously solved scenario is returned from the cache instead. lazy adds the headway and
+    single-track constraints only once a solution violates them, see solve_lazy. dispatch returns the
+    greedy dispatch_timetable plan without solving; otherwise that plan warm-starts the exact solve
+    and stands in for it when the solver ends without a solution. With a snapshot_dir, the base model
+    is loaded from a compile_snapshot snapshot there (compiled on first use) instead of being rebuilt.
+    objective_mode and weights (set_objective weight arguments) select the objective of every solve
+    path. decompose solves the sub-networks between junctions in parallel, see solve_decomposed.
+    """
+    if solver_config is None:
+        solver_config = SolverConfig(msg=logger.isEnabledFor(logging.DEBUG))
+
+    # Add a delay for Train T3 at station C
+    delays = [("T3", "C", 50)]
+
+    if rolling_horizon:
+        # Solve in overlapping time windows around the disruption instead of one monolithic model
+        result = solve_rolling_horizon(working_timetable, blocked_section, blockage_start, blockage_end,
+                                       valid_segments, platform_capacity, delays=delays,
+                                       solver_config=solver_config, objective_mode=objective_mode, weights=weights)
+        optimized_timetable = report_solution(result["status"], result["arrival_times"], result["departure_times"], result)
+        report_metrics(metrics_path)
+        return {"status": result["status"], "optimized_timetable": optimized_timetable, "solver_stats": result["windows"]}
+
+    if cache is not None:
+        result = solve_cached(cache, working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                              platform_capacity, delays=delays, solver_config=solver_config,
+                              objective_mode=objective_mode, weights=weights)
+        if result["optimized_timetable"] is not None:
+            total_delay = sum(entry["arrival_delay"] + entry["departure_delay"] for entry in result["optimized_timetable"])
+            logger.info("Total delay: %.2f minutes%s", total_delay, " (cached)" if result["cached"] else "")
+        report_metrics(metrics_path)
+        return {"status": result["status"], "optimized_timetable": result["optimized_timetable"], "solver_stats": result["solver_stats"]}
+
+    if lazy:
+        result = solve_lazy(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                            platform_capacity, delays=delays, solver_config=solver_config,
+                            objective_mode=objective_mode, weights=weights)
+        logger.info("Lazy constraints: %d rounds, added %s", result["rounds"], result["added"])
+        optimized_timetable = report_solution(result["status"], result["arrival_vars"], result["departure_vars"])
+        report_metrics(metrics_path)
+        return {"status": result["status"], "optimized_timetable": optimized_timetable, "solver_stats": result["solver_stats"]}
+
+    if decompose:
+        result = solve_decomposed(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                                  platform_capacity, delays=delays, objective_mode=objective_mode,
+                                  weights=weights, solver_config=solver_config)
+        logger.info("Decomposition: %d sub-networks, %d rounds", len(result["partition"]["stations"]), result["rounds"])
+        optimized_timetable = report_solution(result["status"], result["arrival_times"], result["departure_times"])
+        report_metrics(metrics_path)
+        return {"status": result["status"], "optimized_timetable": optimized_timetable, "solver_stats": result["solver_stats"]}
+
+    if snapshot_dir is not None:
+        snapshot = open_snapshot(snapshot_dir, working_timetable, valid_segments, platform_capacity,
+                                 objective_mode=objective_mode, weights=weights)
+        result = solve_snapshot(snapshot, blocked_section, blockage_start, blockage_end, delays=delays,
+                                solver_config=solver_config)
+        optimized_timetable = report_solution(result["status"], result["arrival_times"], result["departure_times"], result)
+        report_metrics(metrics_path)
+        return {"status": result["status"], "optimized_timetable": optimized_timetable, "solver_stats": result}
+
+    if presolve:
+        solver, arrival_vars, departure_vars, _ = build_presolved_model(
+            working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+            delays=delays, objective_mode=objective_mode, weights=weights)
+        with timed("solve"):
+            solver_stats = solve_with_stats(solver, solver_config)
+        optimized_timetable = report_solution(solver_stats["status"], arrival_vars, departure_vars, solver_stats)
+        report_metrics(metrics_path)
+        return {"status": solver_stats["status"], "optimized_timetable": optimized_timetable, "solver_stats": solver_stats}
+
+    # A greedy plan in milliseconds, as the answer itself or as the solver's starting point
+    plan = dispatch_timetable(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                              platform_capacity, delays=delays)
+    if dispatch:
+        status = "Dispatched" if plan["feasible"] else "Infeasible"
+        optimized_timetable = report_solution(status, plan["arrival_times"], plan["departure_times"])
+        report_metrics(metrics_path)
+        return {"status": status, "optimized_timetable": optimized_timetable, "solver_stats": None}
+
+    # Create the optimization model
+    solver, arrival_vars, departure_vars = create_model(working_timetable)
+
+    # Add constraints to the solver, including the blocking constraints and single-track conflicts
+    solver = add_constraints(solver, working_timetable, arrival_vars, departure_vars,
+                             blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity)
+
+    # Debug: Log all constraints added to the solver
+    if logger.isEnabledFor(logging.DEBUG):
+        for name, constraint in solver.constraints.items():
+            logger.debug("%s: %s", name, constraint)
+    solver = add_delays(solver, working_timetable, departure_vars, delays)
+    # Set the objective function
+    solver = set_objective(solver, working_timetable, arrival_vars, departure_vars, mode=objective_mode, **(weights or {}))
+
+    # Solve the problem
+    logger.info("Solving the optimization problem...")
+    status, arrival_vars, departure_vars, solver_stats = solve_with_fallback(solver, arrival_vars, departure_vars, plan, solver_config)
+
+    optimized_timetable = report_solution(status, arrival_vars, departure_vars, solver_stats)
+    report_metrics(metrics_path)
+    return {"status": status, "optimized_timetable": optimized_timetable, "solver_stats": solver_stats}
+
+def report_metrics(metrics_path=None):
+    """
+    Logs the per-phase timings and constraint counts, and writes them as JSON when a path is given.
+    """
+    log_metrics(logger)
+    if metrics_path:
+        export_metrics(metrics_path)
+
+def report_solution(status, arrival_vars, departure_vars, solver_stats=None):
+    """
+    Logs, analyzes and plots a solved scenario and returns its optimized timetable.
+    The variables may also be plain dicts of solved times. A solve stopped on a limit is reported
+    with its best solution when solver_stats show one, see has_solution.
+    """
+    # Check if there is a solution: optimal, the best found before a limit, or a feasible dispatched plan
+    if status in ("Optimal", "Dispatched") or (solver_stats is not None and has_solution(solver_stats)):
+        if status == "Optimal":
+            logger.info("Found an optimal solution!")
+        elif status == "Dispatched":
+            logger.info("Using the dispatched plan.")
+        else:
+            logger.info("Solver ended %s, using the best solution found.", status)
+        optimized_timetable = analyze_solution(working_timetable, arrival_vars, departure_vars)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for entry in optimized_timetable:
+                logger.debug("Optimized: %s", entry)
+
+        # Analyze platform occupancy
+        analyze_platform_occupancy(working_timetable, arrival_vars, departure_vars, platform_capacity)
+
+        # Check the solution against every operating rule
+        verify_solution(arrival_vars, departure_vars)
+
+        # Visualize the original and optimized timetables in one figure
+        station_order = ["A", "B", "C", "D", "E"]
+        plot_comparison(
+            original_timetable,
+            optimized_timetable,
+            station_order,
+            "timetable_comparison.png",
+            blocked_section=blocked_section,
+            blockage_start=blockage_start,
+            blockage_end=blockage_end,
+            annotate=True
+        )
+        return optimized_timetable
+    else:
+        logger.warning("Could not find an optimal solution.")
+        return None
+
+def verify_solution(arrival_vars, departure_vars):
+    """
+    Logs every operating rule the solved times break, see verify_timetable, and returns the violations.
+    """
+    new_arrival, new_departure = extract_solution(working_timetable, arrival_vars, departure_vars)
+    violations = verify_timetable(working_timetable, new_arrival, new_departure, valid_segments, platform_capacity,
+                                  blocked_section, blockage_start, blockage_end)
+    for family, violation in violations.items():
+        for train, station, shortfall in zip(violation["trains"], violation["stations"], violation["shortfall"]):
+            logger.warning("Rule %s is broken by %s at %s (short by %.2f)", family, train, station, shortfall)
+    return violations
+
+def report_robustness(optimized_timetable, num_samples=10000, max_workers=None):
+    """
+    Logs how the original and the optimized timetable hold up under random small delays, see
+    compare_robustness, and returns both results.
+    """
+    results = compare_robustness(optimized_timetable, valid_segments=valid_segments, platform_capacity=platform_capacity,
+                                 punctuality_station="E", num_samples=num_samples, max_workers=max_workers)
+    for metric in ROBUSTNESS_METRICS:
+        original, optimized = results["original"]["summary"][metric], results["optimized"]["summary"][metric]
+        logger.info("%s: mean %.3f (p90 %.3f) original, mean %.3f (p90 %.3f) optimized", metric,
+                    original["mean"], original["p90"], optimized["mean"], optimized["p90"])
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reschedule the example timetable around its disruption.")
+    parser.add_argument("--rolling-horizon", action="store_true", help="solve in overlapping time windows")
+    parser.add_argument("--presolve", action="store_true", help="only model the trains the disruption can reach")
+    parser.add_argument("--dispatch", action="store_true", help="only run the greedy dispatcher, without the solver")
+    parser.add_argument("--lazy", action="store_true", help="add headway and single-track constraints only when violated")
+    parser.add_argument("--decompose", action="store_true", help="solve the sub-networks between junctions in parallel")
+    parser.add_argument("--snapshot-dir", help="load the base model from a snapshot in this directory, compiling it on first use")
+    parser.add_argument("--objective", choices=list(OBJECTIVE_MODES), default="symmetric",
+                        help="penalise early and late running alike, or lateness only")
+    parser.add_argument("--cache-dir", help="cache solved scenarios in this directory")
+    parser.add_argument("--metrics", help="write phase timings and constraint counts to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="log per-constraint and per-event debug output")
+    parser.add_argument("--solver", choices=available_backends(), default="cbc", help="solver backend")
+    parser.add_argument("--threads", type=int, help="solver threads")
+    parser.add_argument("--time-limit", type=float, help="solver time limit in seconds")
+    parser.add_argument("--mip-gap", type=float, help="relative MIP gap to stop at")
+    parser.add_argument("--warm-start", action="store_true", help="warm-start the solver where supported")
+    parser.add_argument("--robustness", type=int, metavar="SAMPLES",
+                        help="compare the original and optimized timetable under this many random delay samples")
+    parser.add_argument("--workers", type=int, help="processes for the robustness samples")
+    args = parser.parse_args()
+
+    configure_logging(args.verbose)
+    result = main(rolling_horizon=args.rolling_horizon, metrics_path=args.metrics, presolve=args.presolve, lazy=args.lazy,
+                  dispatch=args.dispatch, snapshot_dir=args.snapshot_dir, objective_mode=args.objective,
+                  decompose=args.decompose, cache=ScenarioCache(directory=args.cache_dir) if args.cache_dir else None,
+                  solver_config=SolverConfig(backend=args.solver, threads=args.threads, time_limit=args.time_limit,
+                                             mip_gap=args.mip_gap, warm_start=args.warm_start, msg=args.verbose))
+    if args.robustness and result["optimized_timetable"] is not None:
+        report_robustness(result["optimized_timetable"], num_samples=args.robustness, max_workers=args.workers)
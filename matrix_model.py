@@ -0,0 +1,374 @@
+import logging
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from instrumentation import instrumented, timed
+from timetable import Timetable
+from timetable_index import build_blockage_index
+
+logger = logging.getLogger(__name__)
+
+# scipy.optimize.milp status code -> PuLP status name, so callers can keep checking for "Optimal"
+_STATUS = {
+    0: "Optimal",
+    1: "Not Solved",
+    2: "Infeasible",
+    3: "Unbounded",
+    4: "Undefined",
+}
+
+
+@instrumented("matrix_model.build")
+def build_matrix_model(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                       delays=(), platform_formulation="big_m", max_early=None, max_delay=None, running_time=10,
+                       min_dwell=2, max_dwell=100, headway_time=5, big_m=1000, blockages=()):
+    """
+    Builds the rescheduling MILP of build_scenario_model directly as sparse arrays, without PuLP expressions.
+
+    Every constraint family is generated with vectorized NumPy operations over the timetable columns and
+    matches its counterpart in constraints.py and objective.py (with pair_window=None). Columns are the
+    arrival times, the departure times, their absolute deviations and then the platform and blocking
+    binaries. blockages lists further (section, start, end) windows as in build_scenario_model.
+
+    Returns:
+        A dict with the objective vector "c", the CSR constraint matrix "A", row bounds "row_lower" and
+        "row_upper", variable bounds "lower" and "upper", "integrality", the column of every
+        (train, station) in "arrival_columns" and "departure_columns", and "rows_by_family".
+    """
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+
+    tt = working_timetable
+    n = len(tt)
+    arrival, departure = tt.arrival, tt.departure
+    has_arrival, has_departure = ~np.isnan(arrival), ~np.isnan(departure)
+    num_arrivals, num_departures = int(has_arrival.sum()), int(has_departure.sum())
+
+    # Column layout: arrivals, departures, arrival deviations, departure deviations, binaries
+    arrival_col = np.full(n, -1, dtype=np.int64)
+    departure_col = np.full(n, -1, dtype=np.int64)
+    arrival_col[has_arrival] = np.arange(num_arrivals)
+    departure_col[has_departure] = num_arrivals + np.arange(num_departures)
+    num_times = num_arrivals + num_departures
+
+    lower = np.zeros(2 * num_times)
+    upper = np.full(2 * num_times, np.inf)
+    lower[arrival_col[has_arrival]] = _low_bounds(arrival[has_arrival], max_early)
+    lower[departure_col[has_departure]] = _low_bounds(departure[has_departure], max_early)
+    upper[arrival_col[has_arrival]] = _up_bounds(arrival[has_arrival], max_delay)
+    upper[departure_col[has_departure]] = _up_bounds(departure[has_departure], max_delay)
+
+    rows = {"parts": [], "count": 0, "by_family": {}, "num_columns": 2 * num_times}
+    positions = np.arange(n)
+
+    # Consecutive stops of each train, in route order
+    by_train = np.argsort(tt.train_ids, kind="stable")
+    current, following = by_train[:-1], by_train[1:]
+    same_train = tt.train_ids[current] == tt.train_ids[following]
+    current, following = current[same_train], following[same_train]
+
+    # Stops at each station, sorted by planned time like build_timetable_index
+    planned = np.where(has_arrival, arrival, np.where(has_departure, departure, np.inf))
+    by_station = np.lexsort((positions, planned, tt.station_ids))
+
+    # Single-track conflicts: link each entering train to the most recent train that cleared the segment
+    valid_codes = _segment_codes(tt, valid_segments)
+    if len(valid_codes) and len(current):
+        codes = tt.station_ids[current].astype(np.int64) * len(tt.stations) + tt.station_ids[following]
+        entry_time = np.where(has_departure[current], departure[current],
+                              np.where(has_arrival[following], arrival[following], np.inf))
+        on_valid = np.isin(codes, valid_codes)
+        movements = np.flatnonzero(on_valid)
+        movements = movements[np.lexsort((current[movements], entry_time[movements], codes[movements]))]
+        entering, leaving = current[movements], following[movements]
+        movement_codes = codes[movements]
+
+        group_start = np.maximum.accumulate(np.where(np.r_[True, movement_codes[1:] != movement_codes[:-1]],
+                                                     np.arange(len(movements)), 0))
+        latest_cleared = np.maximum.accumulate(np.where(has_arrival[leaving], np.arange(len(movements)), -1))
+        previous = np.r_[-1, latest_cleared[:-1]]
+
+        linked = has_departure[entering] & (previous >= group_start)
+        cleared = leaving[previous[linked]]
+        entering = entering[linked]
+        other_train = tt.train_ids[cleared] != tt.train_ids[entering]
+        _add_rows(rows, "single_track", [departure_col[entering[other_train]], arrival_col[cleared[other_train]]],
+                  [1, -1], 0, np.inf)
+
+    # Blocking: clear the blocked segment before each window or depart after it, see add_blocking_constraints
+    if blocked_section is not None:
+        blockages = [(blocked_section, blockage_start, blockage_end)] + list(blockages)
+    if blockages and len(current):
+        _add_blocking_rows(rows, tt, current, following, arrival_col, departure_col, lower, upper, build_blockage_index(blockages),
+                           running_time, big_m)
+
+    # Platform capacity
+    if platform_formulation == "interval":
+        _add_interval_platform_rows(rows, tt, by_station, arrival_col, departure_col, lower, upper, platform_capacity, big_m)
+    elif platform_formulation == "big_m":
+        _add_big_m_platform_rows(rows, tt, by_station, arrival_col, departure_col, platform_capacity, big_m)
+    else:
+        raise ValueError(f"Unknown platform capacity formulation: {platform_formulation}")
+
+    # Running times
+    running = has_departure[current] & has_arrival[following]
+    _add_rows(rows, "running_time", [arrival_col[following[running]], departure_col[current[running]]],
+              [1, -1], running_time, np.inf)
+
+    # Dwell times
+    dwelling = np.flatnonzero(has_arrival & has_departure)
+    _add_rows(rows, "dwell_time", [departure_col[dwelling], arrival_col[dwelling]], [1, -1], min_dwell, max_dwell)
+
+    # Headways between consecutive departures and consecutive arrivals at each station
+    for has_event, event_col in ((has_departure, departure_col), (has_arrival, arrival_col)):
+        events = by_station[has_event[by_station]]
+        earlier, later = events[:-1], events[1:]
+        chained = (tt.station_ids[earlier] == tt.station_ids[later]) & (tt.train_ids[earlier] != tt.train_ids[later])
+        _add_rows(rows, "headway", [event_col[later[chained]], event_col[earlier[chained]]], [1, -1], headway_time, np.inf)
+
+    # Injected delays fix a departure to its planned time plus the delay
+    if delays:
+        delayed = np.array([_row_of(tt, train, station) for train, station, _ in delays], dtype=np.int64)
+        fixed_times = departure[delayed] + np.array([delay for _, _, delay in delays], dtype=np.float64)
+        _add_rows(rows, "delay", [departure_col[delayed]], [1], fixed_times, fixed_times)
+
+    # Absolute deviations from the plan, deviation >= |time - planned|
+    planned_times = np.r_[arrival[has_arrival], departure[has_departure]]
+    time_cols = np.arange(num_times)
+    _add_rows(rows, "objective", [time_cols + num_times, time_cols], [1, -1], -planned_times, np.inf)
+    _add_rows(rows, "objective", [time_cols + num_times, time_cols], [1, 1], planned_times, np.inf)
+
+    num_columns = rows["num_columns"]
+    lower = np.r_[lower, np.zeros(num_columns - 2 * num_times)]
+    upper = np.r_[upper, np.ones(num_columns - 2 * num_times)]
+    integrality = np.r_[np.zeros(2 * num_times, dtype=np.uint8), np.ones(num_columns - 2 * num_times, dtype=np.uint8)]
+
+    c = np.zeros(num_columns)
+    c[num_times:2 * num_times] = 1
+
+    row_ids = np.concatenate([part[0] for part in rows["parts"]]) if rows["parts"] else np.zeros(0, dtype=np.int64)
+    col_ids = np.concatenate([part[1] for part in rows["parts"]]) if rows["parts"] else np.zeros(0, dtype=np.int64)
+    values = np.concatenate([part[2] for part in rows["parts"]]) if rows["parts"] else np.zeros(0)
+    A = sparse.coo_matrix((values, (row_ids, col_ids)), shape=(rows["count"], num_columns)).tocsr()
+
+    keys = list(zip(np.asarray(tt.trains, dtype=object)[tt.train_ids], np.asarray(tt.stations, dtype=object)[tt.station_ids]))
+    logger.debug("Built matrix model with %d columns, %d rows and %d nonzeros", num_columns, A.shape[0], A.nnz)
+
+    return {
+        "c": c,
+        "A": A,
+        "row_lower": np.concatenate([part[3] for part in rows["parts"]]) if rows["parts"] else np.zeros(0),
+        "row_upper": np.concatenate([part[4] for part in rows["parts"]]) if rows["parts"] else np.zeros(0),
+        "lower": lower,
+        "upper": upper,
+        "integrality": integrality,
+        "arrival_columns": {keys[row]: int(arrival_col[row]) for row in np.flatnonzero(has_arrival)},
+        "departure_columns": {keys[row]: int(departure_col[row]) for row in np.flatnonzero(has_departure)},
+        "rows_by_family": rows["by_family"],
+    }
+
+
+def solve_matrix_model(model, time_limit=None, mip_gap=None, msg=False):
+    """
+    Solves a matrix model with scipy.optimize.milp (HiGHS).
+
+    Returns:
+        A dict with the PuLP-style "status", the "objective", the solver "message", "wall_time" and the
+        solved times in "arrival_times" and "departure_times", keyed like arrival_vars and departure_vars
+        so they can be passed straight to analyze_solution. The times are None when no solution was found.
+    """
+    options = {"disp": msg}
+    if time_limit is not None:
+        options["time_limit"] = time_limit
+    if mip_gap is not None:
+        options["mip_rel_gap"] = mip_gap
+
+    constraints = [LinearConstraint(model["A"], model["row_lower"], model["row_upper"])] if model["A"].shape[0] else []
+
+    with timed("solve"):
+        started = time.perf_counter()
+        result = milp(model["c"], constraints=constraints, integrality=model["integrality"],
+                      bounds=Bounds(model["lower"], model["upper"]), options=options)
+        wall_time = time.perf_counter() - started
+
+    status = _STATUS.get(result.status, "Undefined")
+    arrival_times = departure_times = None
+    if result.x is not None:
+        arrival_times = {key: float(result.x[column]) for key, column in model["arrival_columns"].items()}
+        departure_times = {key: float(result.x[column]) for key, column in model["departure_columns"].items()}
+
+    logger.info("Solved matrix model in %.3fs: %s (objective %s)", wall_time, status, result.fun)
+    return {
+        "status": status,
+        "objective": result.fun if result.x is not None else None,
+        "message": result.message,
+        "wall_time": wall_time,
+        "arrival_times": arrival_times,
+        "departure_times": departure_times,
+    }
+
+
+def _add_rows(rows, family, columns, coefficients, lower, upper):
+    """
+    Appends rows lower <= sum(coefficient * x[column]) <= upper, one per element of the column arrays.
+    """
+    num_rows = len(columns[0])
+    row_ids = rows["count"] + np.arange(num_rows)
+    rows["parts"].append((
+        np.tile(row_ids, len(columns)),
+        np.concatenate(columns).astype(np.int64),
+        np.concatenate([np.broadcast_to(np.asarray(coefficient, dtype=np.float64), num_rows) for coefficient in coefficients]),
+        np.broadcast_to(np.asarray(lower, dtype=np.float64), num_rows).copy(),
+        np.broadcast_to(np.asarray(upper, dtype=np.float64), num_rows).copy(),
+    ))
+    rows["count"] += num_rows
+    rows["by_family"][family] = rows["by_family"].get(family, 0) + num_rows
+
+
+def _add_grouped_rows(rows, family, groups, columns, coefficients, lower, upper):
+    """
+    Appends one row per distinct group id; each (group, column, coefficient) triple adds one term to its group's row.
+    """
+    group_ids, row_of_term = np.unique(groups, return_inverse=True)
+    rows["parts"].append((
+        rows["count"] + row_of_term,
+        np.asarray(columns, dtype=np.int64),
+        np.broadcast_to(np.asarray(coefficients, dtype=np.float64), len(columns)).copy(),
+        np.broadcast_to(np.asarray(lower, dtype=np.float64), len(group_ids)).copy(),
+        np.broadcast_to(np.asarray(upper, dtype=np.float64), len(group_ids)).copy(),
+    ))
+    rows["count"] += len(group_ids)
+    rows["by_family"][family] = rows["by_family"].get(family, 0) + len(group_ids)
+    return group_ids
+
+
+def _new_binaries(rows, count):
+    first = rows["num_columns"]
+    rows["num_columns"] += count
+    return first + np.arange(count)
+
+
+def _add_big_m_platform_rows(rows, tt, by_station, arrival_col, departure_col, platform_capacity, big_m):
+    # Mirrors the big-M formulation of add_platform_capacity_constraints
+    dwelling = by_station[(arrival_col[by_station] >= 0) & (departure_col[by_station] >= 0)]
+    for station, capacity in platform_capacity.items():
+        if station in ["A", "E"] or station not in tt.stations:
+            continue
+        stops = dwelling[tt.station_ids[dwelling] == tt.stations.index(station)]
+        if not len(stops):
+            continue
+
+        occupying = _new_binaries(rows, len(stops))
+        arrivals, departures = arrival_col[stops], departure_col[stops]
+        _add_rows(rows, "platform_capacity", [arrivals, departures, occupying], [1, -1, big_m], -np.inf, big_m)
+        _add_rows(rows, "platform_capacity", [departures, arrivals, occupying], [1, -1, -big_m], -np.inf, 0)
+        _add_grouped_rows(rows, "platform_capacity", np.zeros(len(stops)), occupying, 1, -np.inf, capacity)
+
+
+def _add_interval_platform_rows(rows, tt, by_station, arrival_col, departure_col, lower, upper, platform_capacity, big_m):
+    # Mirrors add_interval_platform_capacity_constraints, with the pair scan done by searchsorted
+    dwelling = by_station[(arrival_col[by_station] >= 0) & (departure_col[by_station] >= 0)]
+    for station, capacity in platform_capacity.items():
+        if station not in tt.stations:
+            continue
+        stops = dwelling[tt.station_ids[dwelling] == tt.stations.index(station)]
+        if len(stops) <= capacity:
+            continue
+
+        arrivals, departures = arrival_col[stops], departure_col[stops]
+        earliest_arrival, latest_departure = lower[arrivals], upper[departures]
+
+        # earliest_later_arrival[j] is non-decreasing, so the scan for stop i ends at a searchsorted position
+        earliest_later_arrival = np.minimum.accumulate(earliest_arrival[::-1])[::-1]
+        first = np.arange(1, len(stops) + 1)
+        end = np.maximum(np.searchsorted(earliest_later_arrival, latest_departure, side="left"), first)
+        counts = end - first
+
+        i = np.repeat(np.arange(len(stops)), counts)
+        j = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        overlapping = earliest_arrival[j] < latest_departure[i]
+        i, j = i[overlapping], j[overlapping]
+        if not len(i):
+            continue
+
+        departed = _new_binaries(rows, len(i))
+        M = np.where(np.isfinite(latest_departure[i]), latest_departure[i] - earliest_arrival[j], big_m)
+        _add_rows(rows, "platform_capacity", [departures[i], arrivals[j], departed], [1, -1, M], -np.inf, M)
+
+        # At each arrival at most capacity - 1 earlier trains may still be present: sum(1 - departed) <= capacity - 1
+        present = np.bincount(j, minlength=len(stops))
+        crowded = present[j] >= capacity
+        _add_grouped_rows(rows, "platform_capacity", j[crowded], departed[crowded], -1, -np.inf,
+                          capacity - 1 - present[np.unique(j[crowded])])
+
+
+def _add_blocking_rows(rows, tt, current, following, arrival_col, departure_col, lower, upper, blockage_index, running_time, big_m):
+    # Mirrors add_blocking_constraints, with the window lookup done by searchsorted
+    lookup = {station: k for k, station in enumerate(tt.stations)}
+    has_departure = departure_col[current] >= 0
+    for (from_station, to_station), (starts, ends) in blockage_index.items():
+        if from_station not in lookup or to_station not in lookup:
+            continue
+        on_segment = has_departure & (tt.station_ids[current] == lookup[from_station]) & (tt.station_ids[following] == lookup[to_station])
+        entering, leaving = current[on_segment], following[on_segment]
+        if not len(entering):
+            continue
+
+        departures = departure_col[entering]
+        planned = tt.departure[entering]
+        earliest_departure = np.where(np.isfinite(lower[departures]), lower[departures], planned - big_m)
+        latest = np.where(np.isfinite(upper[departures]), upper[departures], planned + big_m)
+        first = np.searchsorted(ends, earliest_departure, side="left")
+        counts = np.maximum(np.searchsorted(starts, latest, side="right") - first, 0)
+        m = np.repeat(np.arange(len(entering)), counts)
+        k = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        start, end = np.asarray(starts, dtype=np.float64)[k], np.asarray(ends, dtype=np.float64)[k]
+
+        # The segment is cleared by the arrival at its far end, or RUNNING_TIME after a departure without one
+        clears = arrival_col[leaving[m]]
+        arrives = clears >= 0
+        planned_clear = np.where(arrives, tt.arrival[leaving[m]], planned[m] + running_time)
+        latest_clear = np.where(arrives, upper[np.maximum(clears, 0)], upper[departures[m]] + running_time)
+        latest_clear = np.where(np.isfinite(latest_clear), latest_clear, planned_clear + big_m)
+        earliest = lower[departures[m]]
+
+        needed = (earliest < end) & (latest_clear > start)
+        held = needed & (planned_clear > start)
+        _add_rows(rows, "blocking", [departures[m[held]]], [1], end[held], np.inf)
+
+        ordered = needed & ~held
+        if not ordered.any():
+            continue
+        after = _new_binaries(rows, int(ordered.sum()))
+        clear_span = latest_clear[ordered] - start[ordered]
+        depart_span = np.where(np.isfinite(earliest[ordered]), end[ordered] - earliest[ordered], big_m)
+        offset = np.where(arrives[ordered], 0, running_time)
+        clear_columns = np.where(arrives[ordered], clears[ordered], departures[m[ordered]])
+        _add_rows(rows, "blocking", [clear_columns, after], [1, -clear_span], -np.inf, start[ordered] - offset)
+        _add_rows(rows, "blocking", [departures[m[ordered]], after], [1, -depart_span], end[ordered] - depart_span, np.inf)
+
+
+def _segment_codes(tt, valid_segments):
+    lookup = {station: k for k, station in enumerate(tt.stations)}
+    return np.array([lookup[a] * len(tt.stations) + lookup[b] for a, b in valid_segments if a in lookup and b in lookup],
+                    dtype=np.int64)
+
+
+def _row_of(tt, train, station):
+    rows = np.flatnonzero((tt.train_ids == tt.trains.index(train)) & (tt.station_ids == tt.stations.index(station)))
+    return rows[0]
+
+
+def _low_bounds(planned, max_early):
+    if max_early is None:
+        return np.zeros_like(planned)
+    return np.maximum(0, planned - max_early)
+
+
+def _up_bounds(planned, max_delay):
+    if max_delay is None:
+        return np.full_like(planned, np.inf)
+    return planned + max_delay
@@ -1,27 +1,58 @@
-import pulp
-
-def create_model(working_timetable):
-    print("\nCreating optimization model...")
-
-    solver = pulp.LpProblem("Train_Timetable_Optimization", pulp.LpMinimize)
-
-    # Create arrival and departure variables
-    arrival_vars = {
-        (entry["train"], entry["station"]): pulp.LpVariable(
-            f"arrival_{entry['train']}_{entry['station']}", lowBound=0, cat="Continuous"
-        )
-        for entry in working_timetable if entry["arrival"] is not None
-    }
-
-    departure_vars = {
-        (entry["train"], entry["station"]): pulp.LpVariable(
-            f"departure_{entry['train']}_{entry['station']}", lowBound=0, cat="Continuous"
-        )
-        for entry in working_timetable if entry["departure"] is not None
-    }
-
-    print("\nCreated Variables:")
-    print(f"Arrival Variables: {len(arrival_vars)}")
-    print(f"Departure Variables: {len(departure_vars)}")
-
-    return solver, arrival_vars, departure_vars
+import logging
+
+import pulp
+
+from instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+@instrumented("model.variables")
+def create_model(working_timetable, max_early=None, max_delay=None, bounds=None):
+    """
+    Creates the arrival and departure time variables.
+
+    When given, max_early and max_delay bound every variable to [planned - max_early, planned + max_delay],
+    which gives the interval platform formulation finite time windows to work with. bounds is an optional
+    (arrival_bounds, departure_bounds) pair of (train, station) -> (lower, upper) dicts, such as the
+    presolve_disruption result, that overrides them for the events it covers.
+    """
+    logger.debug("Creating optimization model...")
+
+    solver = pulp.LpProblem("Train_Timetable_Optimization", pulp.LpMinimize)
+
+    # Create arrival and departure variables
+    arrival_vars = {
+        (entry["train"], entry["station"]): pulp.LpVariable(
+            f"arrival_{entry['train']}_{entry['station']}", cat="Continuous",
+            lowBound=_low_bound(entry["arrival"], max_early), upBound=_up_bound(entry["arrival"], max_delay)
+        )
+        for entry in working_timetable if entry["arrival"] is not None
+    }
+
+    departure_vars = {
+        (entry["train"], entry["station"]): pulp.LpVariable(
+            f"departure_{entry['train']}_{entry['station']}", cat="Continuous",
+            lowBound=_low_bound(entry["departure"], max_early), upBound=_up_bound(entry["departure"], max_delay)
+        )
+        for entry in working_timetable if entry["departure"] is not None
+    }
+
+    if bounds is not None:
+        for variables, event_bounds in zip((arrival_vars, departure_vars), bounds):
+            for key, (lower, upper) in event_bounds.items():
+                if key in variables:
+                    variables[key].lowBound, variables[key].upBound = lower, upper
+
+    logger.debug("Created %d arrival and %d departure variables", len(arrival_vars), len(departure_vars))
+
+    return solver, arrival_vars, departure_vars
+
+def _low_bound(planned, max_early):
+    if max_early is None:
+        return 0
+    return max(0, planned - max_early)
+
+def _up_bound(planned, max_delay):
+    if max_delay is None:
+        return None
+    return planned + max_delay
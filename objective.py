@@ -1,39 +1,82 @@
-import pulp
-
-def set_objective(solver, working_timetable, arrival_vars, departure_vars):
-    print("\nSetting objective function...")
-
-    # Create variables for absolute deviations
-    arrival_dev_vars = pulp.LpVariable.dicts("ArrivalDeviation", 
-        ((entry["train"], entry["station"]) for entry in working_timetable if entry["arrival"] is not None),
-        lowBound=0)
-    departure_dev_vars = pulp.LpVariable.dicts("DepartureDeviation", 
-        ((entry["train"], entry["station"]) for entry in working_timetable if entry["departure"] is not None),
-        lowBound=0)
-
-    # Add constraints to define absolute deviations
-    for entry in working_timetable:
-        if entry["arrival"] is not None:
-            train, station = entry["train"], entry["station"]
-            solver += arrival_dev_vars[(train, station)] >= arrival_vars[(train, station)] - entry["arrival"]
-            solver += arrival_dev_vars[(train, station)] >= entry["arrival"] - arrival_vars[(train, station)]
-        
-        if entry["departure"] is not None:
-            train, station = entry["train"], entry["station"]
-            solver += departure_dev_vars[(train, station)] >= departure_vars[(train, station)] - entry["departure"]
-            solver += departure_dev_vars[(train, station)] >= entry["departure"] - departure_vars[(train, station)]
-
-    # Calculate total deviations
-    total_arrival_deviation = pulp.lpSum(arrival_dev_vars.values())
-    total_departure_deviation = pulp.lpSum(departure_dev_vars.values())
-
-    # Set weightage for arrival and departure deviations
-    arrival_weight = 1
-    departure_weight = 1
-
-    # Combine the two objectives
-    total_weighted_deviation = (arrival_weight * total_arrival_deviation + departure_weight * total_departure_deviation)
-
-    solver += total_weighted_deviation, "Minimize total weighted deviation from schedule"
-
-    return solver
\ No newline at end of file
+import logging
+
+import pulp
+
+from instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+# Objective modes: absolute deviation from the plan in both directions, or lateness only
+OBJECTIVE_MODES = ("symmetric", "lateness")
+
+@instrumented("objective")
+def set_objective(solver, working_timetable, arrival_vars, departure_vars, mode="symmetric", train_weights=None, station_weights=None,
+                  arrival_weight=1, departure_weight=1):
+    """
+    Sets the objective: the weighted deviation of every event from its planned time.
+
+    An event's weight is its arrival_weight or departure_weight times the weight of its train in
+    train_weights and of its station in station_weights (1 when not listed), so priority trains or
+    terminal arrivals can count more than the rest.
+
+    mode "symmetric" penalises running early and late alike, through a deviation variable and two
+    absolute-value rows per event. mode "lateness" is for operations where trains may not run
+    early: it raises every event's lower bound to its planned time and minimizes the weighted
+    lateness directly, without any extra variables or rows.
+    """
+    logger.debug("Setting %s objective function...", mode)
+
+    if mode not in OBJECTIVE_MODES:
+        raise ValueError(f"Unknown objective mode: {mode}")
+    train_weights = train_weights or {}
+    station_weights = station_weights or {}
+
+    def weight(entry, event_weight):
+        return event_weight * train_weights.get(entry["train"], 1) * station_weights.get(entry["station"], 1)
+
+    if mode == "lateness":
+        terms = []
+        constant = 0
+        for entry in working_timetable:
+            key = (entry["train"], entry["station"])
+            for planned, event_vars, event_weight in ((entry["arrival"], arrival_vars, arrival_weight),
+                                                      (entry["departure"], departure_vars, departure_weight)):
+                if planned is None or key not in event_vars:
+                    continue
+                variable = event_vars[key]
+                variable.lowBound = planned if variable.lowBound is None else max(variable.lowBound, planned)
+                terms.append((variable, weight(entry, event_weight)))
+                constant -= weight(entry, event_weight) * planned
+
+        solver += pulp.LpAffineExpression(terms, constant=constant), "Minimize total weighted lateness"
+        return solver
+
+    # Create variables for absolute deviations
+    arrival_dev_vars = pulp.LpVariable.dicts("ArrivalDeviation",
+        ((entry["train"], entry["station"]) for entry in working_timetable if entry["arrival"] is not None),
+        lowBound=0)
+    departure_dev_vars = pulp.LpVariable.dicts("DepartureDeviation",
+        ((entry["train"], entry["station"]) for entry in working_timetable if entry["departure"] is not None),
+        lowBound=0)
+
+    # Add constraints to define absolute deviations
+    weighted_deviations = []
+    for entry in working_timetable:
+        if entry["arrival"] is not None:
+            train, station = entry["train"], entry["station"]
+            solver += arrival_dev_vars[(train, station)] >= arrival_vars[(train, station)] - entry["arrival"]
+            solver += arrival_dev_vars[(train, station)] >= entry["arrival"] - arrival_vars[(train, station)]
+            weighted_deviations.append((arrival_dev_vars[(train, station)], weight(entry, arrival_weight)))
+
+        if entry["departure"] is not None:
+            train, station = entry["train"], entry["station"]
+            solver += departure_dev_vars[(train, station)] >= departure_vars[(train, station)] - entry["departure"]
+            solver += departure_dev_vars[(train, station)] >= entry["departure"] - departure_vars[(train, station)]
+            weighted_deviations.append((departure_dev_vars[(train, station)], weight(entry, departure_weight)))
+
+    # Combine the weighted arrival and departure deviations
+    total_weighted_deviation = pulp.LpAffineExpression(weighted_deviations)
+
+    solver += total_weighted_deviation, "Minimize total weighted deviation from schedule"
+
+    return solver
@@ -0,0 +1,253 @@
+import logging
+from collections import deque
+
+from constraints import blocked_departures
+from instrumentation import instrumented
+from scenario import build_scenario_model
+from timetable import Timetable
+from timetable_index import build_blockage_index, build_timetable_index
+
+logger = logging.getLogger(__name__)
+
+
+def build_event_graph(working_timetable, valid_segments, index=None, running_time=10, min_dwell=2, max_dwell=100, headway_time=5):
+    """
+    Builds the event-activity graph of the timetable.
+
+    Events are ("arrival" | "departure", train, station) tuples. An activity (event, successor, minimum
+    duration) says the successor cannot happen earlier than duration minutes after event, for the
+    running time, dwell time, headway and single-track rules of constraints.py (with pair_window=None).
+    The maximum dwell time is the activity from a departure back to its arrival with duration -max_dwell.
+
+    Returns:
+        A dict with "planned" (event -> planned time) and "successors" (event -> [(successor, duration)]).
+    """
+    if index is None:
+        index = build_timetable_index(working_timetable)
+
+    planned = {}
+    successors = {}
+
+    def link(event, successor, duration):
+        successors.setdefault(event, []).append((successor, duration))
+
+    for entry in working_timetable:
+        train, station = entry["train"], entry["station"]
+        if entry["arrival"] is not None:
+            planned[("arrival", train, station)] = entry["arrival"]
+        if entry["departure"] is not None:
+            planned[("departure", train, station)] = entry["departure"]
+        if entry["arrival"] is not None and entry["departure"] is not None:
+            link(("arrival", train, station), ("departure", train, station), min_dwell)
+            link(("departure", train, station), ("arrival", train, station), -max_dwell)
+
+    for train_stops in index["by_train"].values():
+        for current, next_entry in zip(train_stops, train_stops[1:]):
+            if current["departure"] is not None and next_entry["arrival"] is not None:
+                link(("departure", current["train"], current["station"]),
+                     ("arrival", next_entry["train"], next_entry["station"]), running_time)
+
+    for station, station_stops in index["by_station"].items():
+        for kind in ("departure", "arrival"):
+            events = [entry["train"] for entry in station_stops if entry[kind] is not None]
+            for train, next_train in zip(events, events[1:]):
+                if train != next_train:
+                    link((kind, train, station), (kind, next_train, station), headway_time)
+
+    for current_station, next_station in valid_segments:
+        last_cleared = None
+        for entering, leaving in index["by_segment"].get((current_station, next_station), []):
+            if entering["departure"] is not None and last_cleared is not None and last_cleared != entering["train"]:
+                link(("arrival", last_cleared, next_station), ("departure", entering["train"], current_station), 0)
+            if leaving["arrival"] is not None:
+                last_cleared = leaving["train"]
+
+    return {"planned": planned, "successors": successors}
+
+
+@instrumented("presolve")
+def presolve_disruption(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                        delays=(), max_delay=120, index=None, graph=None, blockages=()):
+    """
+    Propagates a disruption through the event-activity graph and derives tight variable bounds.
+
+    Starting from the blocked departures and injected delays, a longest-path pass gives every event
+    its earliest feasible time. Events it pushes past their plan are affected and may be moved by up
+    to max_delay further minutes to resolve conflicts; a second pass propagates those latest times
+    along the activities and to the later stops at a platform the affected trains may still occupy.
+    Every other event is fixed at its planned time. blockages lists further (section, start, end)
+    windows; every departure planned into one is held until it ends.
+
+    This assumes the planned timetable is itself conflict-free, so that running early never helps
+    against the symmetric deviation objective and unreached trains are optimal at their plan.
+
+    Returns:
+        A dict with "arrival_bounds" and "departure_bounds" ((train, station) -> (lower, upper)),
+        the "affected_trains", the "neighbourhood" of trains a reduced model must contain (the affected
+        trains plus unaffected trains sharing a platform with them) and the number of "free_events".
+    """
+    if index is None:
+        index = build_timetable_index(working_timetable)
+    if graph is None:
+        graph = build_event_graph(working_timetable, valid_segments, index=index)
+
+    planned, successors = graph["planned"], graph["successors"]
+    lower = dict(planned)
+    pinned = {}
+
+    if blocked_section is not None:
+        blockages = [(blocked_section, blockage_start, blockage_end)] + list(blockages)
+    blockage_index = build_blockage_index(blockages)
+    for section, (starts, ends) in blockage_index.items():
+        for start, end in zip(starts, ends):
+            for train, station in blocked_departures(index, section, start, end):
+                event = ("departure", train, station)
+                lower[event] = max(lower[event], end)
+    for train, station, delay in delays:
+        event = ("departure", train, station)
+        pinned[event] = planned[event] + delay
+        lower[event] = max(lower[event], pinned[event])
+
+    # Earliest times: longest paths from the disrupted events
+    seeds = [event for event in lower if lower[event] > planned[event]]
+    _propagate(lower, successors, seeds)
+
+    # Latest times: affected events get max_delay of slack, pushed on to whatever they can delay
+    free = {event for event in lower if lower[event] > planned[event]} | set(pinned)
+    upper = dict(planned)
+    for event in free:
+        upper[event] = pinned.get(event, lower[event] + max_delay)
+    platform_successors = _platform_successors(index, platform_capacity, lower)
+    free |= _propagate(upper, successors, list(free), pinned=pinned, extra_successors=platform_successors)
+
+    affected_trains = {train for _, train, _ in free}
+    neighbourhood = affected_trains | _platform_neighbours(index, platform_capacity, lower, upper, affected_trains)
+
+    arrival_bounds, departure_bounds = {}, {}
+    for (kind, train, station), time in planned.items():
+        bounds = arrival_bounds if kind == "arrival" else departure_bounds
+        bounds[(train, station)] = (lower[(kind, train, station)], upper[(kind, train, station)])
+
+    logger.info("Presolve: %d of %d events free, %d affected trains, %d trains in the neighbourhood",
+                len(free), len(planned), len(affected_trains), len(neighbourhood))
+
+    return {
+        "arrival_bounds": arrival_bounds,
+        "departure_bounds": departure_bounds,
+        "affected_trains": sorted(affected_trains),
+        "neighbourhood": sorted(neighbourhood),
+        "free_events": len(free),
+    }
+
+
+def build_presolved_model(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                          delays=(), max_delay=120, pair_window=None, platform_formulation="big_m", blockages=(),
+                          objective_mode="symmetric", weights=None):
+    """
+    Builds the scenario model over the disruption's neighbourhood only, with presolved variable bounds.
+
+    Trains outside the neighbourhood stay at their planned times and get no variables, so
+    analyze_solution reports them unchanged.
+
+    Returns:
+        The solver, arrival variables, departure variables and the presolve result.
+    """
+    index = build_timetable_index(working_timetable)
+    presolved = presolve_disruption(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                                    platform_capacity, delays=delays, max_delay=max_delay, index=index, blockages=blockages)
+
+    neighbourhood = set(presolved["neighbourhood"])
+    rows = [row for row, entry in enumerate(working_timetable) if entry["train"] in neighbourhood]
+    if isinstance(working_timetable, Timetable):
+        sub_timetable = working_timetable.take(rows)
+    else:
+        sub_timetable = [working_timetable[row] for row in rows]
+
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        sub_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+        delays=[delay for delay in delays if delay[0] in neighbourhood], pair_window=pair_window,
+        platform_formulation=platform_formulation, blockages=blockages, objective_mode=objective_mode, weights=weights,
+        bounds=(presolved["arrival_bounds"], presolved["departure_bounds"]))
+
+    return solver, arrival_vars, departure_vars, presolved
+
+
+def _propagate(times, successors, seeds, pinned=None, extra_successors=None):
+    """
+    Raises times along the activities until every successor is at least its predecessor plus the
+    duration. Pinned events are never moved. Returns the events that were raised.
+    """
+    pinned = pinned or {}
+    raised = set()
+    queue = deque(seeds)
+    queued = set(seeds)
+    while queue:
+        event = queue.popleft()
+        queued.discard(event)
+        time = times[event]
+        links = successors.get(event, [])
+        if extra_successors is not None:
+            links = links + [(successor, 0) for successor in extra_successors(event, time)]
+        for successor, duration in links:
+            if successor in pinned or times[successor] >= time + duration:
+                continue
+            times[successor] = time + duration
+            raised.add(successor)
+            if successor not in queued:
+                queue.append(successor)
+                queued.add(successor)
+    return raised
+
+
+def _platform_successors(index, platform_capacity, lower):
+    """
+    Returns a function giving, for a departure at a busy station and its latest time, the arrivals of
+    later trains that may have to wait for that platform.
+    """
+    stops_by_station = {}
+    for station, capacity in platform_capacity.items():
+        stops = [entry for entry in index["by_station"].get(station, [])
+                 if entry["arrival"] is not None and entry["departure"] is not None]
+        if len(stops) > capacity:
+            stops_by_station[station] = stops
+
+    position = {
+        (entry["train"], station): k
+        for station, stops in stops_by_station.items() for k, entry in enumerate(stops)
+    }
+
+    def platform_successors(event, time):
+        kind, train, station = event
+        if kind != "departure" or (train, station) not in position:
+            return []
+        stops = stops_by_station[station]
+        waiting = []
+        for entry in stops[position[(train, station)] + 1:]:
+            if entry["arrival"] >= time:
+                break
+            arrival = ("arrival", entry["train"], station)
+            if lower[arrival] < time:
+                waiting.append(arrival)
+        return waiting
+
+    return platform_successors
+
+
+def _platform_neighbours(index, platform_capacity, lower, upper, affected_trains):
+    # Unaffected trains whose planned dwell overlaps the window of an affected train at a busy station
+    neighbours = set()
+    for station, capacity in platform_capacity.items():
+        stops = [entry for entry in index["by_station"].get(station, [])
+                 if entry["arrival"] is not None and entry["departure"] is not None]
+        if len(stops) <= capacity:
+            continue
+        windows = [
+            (lower[("arrival", entry["train"], station)], upper[("departure", entry["train"], station)])
+            for entry in stops if entry["train"] in affected_trains
+        ]
+        for entry in stops:
+            if entry["train"] in affected_trains:
+                continue
+            if any(entry["arrival"] < end and start < entry["departure"] for start, end in windows):
+                neighbours.add(entry["train"])
+    return neighbours
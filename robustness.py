@@ -0,0 +1,283 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from constraints import HEADWAY_TIME, MAX_DWELL_TIME, MIN_DWELL_TIME, RUNNING_TIME
+from instrumentation import instrumented
+from presolve import build_event_graph
+from timetable import Timetable
+
+logger = logging.getLogger(__name__)
+
+# Distribution kinds DelayDistribution can sample
+DISTRIBUTION_KINDS = ("exponential", "uniform", "lognormal")
+
+# Metrics evaluate_robustness reports per sample
+ROBUSTNESS_METRICS = ("primary_delay", "total_delay", "knock_on_delay", "punctuality", "platform_breaches")
+
+
+@dataclass(frozen=True)
+class DelayDistribution:
+    """
+    Small random delay of one event.
+
+    Parameters:
+        probability: Chance that the event is delayed at all.
+        mean: Mean delay in minutes when it is.
+        kind: One of DISTRIBUTION_KINDS. "uniform" draws from [0, 2 * mean].
+        sigma: Shape of the "lognormal" kind (the standard deviation of the log).
+    """
+    probability: float = 0.2
+    mean: float = 2.0
+    kind: str = "exponential"
+    sigma: float = 0.5
+
+    def sample(self, rng, shape):
+        if self.kind == "exponential":
+            delays = rng.exponential(self.mean, shape)
+        elif self.kind == "uniform":
+            delays = rng.uniform(0, 2 * self.mean, shape)
+        elif self.kind == "lognormal":
+            delays = rng.lognormal(np.log(self.mean) - self.sigma ** 2 / 2, self.sigma, shape)
+        else:
+            raise ValueError(f"Unknown delay distribution: {self.kind}")
+        return np.where(rng.random(shape) < self.probability, delays, 0.0)
+
+
+@instrumented("robustness")
+def evaluate_robustness(working_timetable, new_arrival=None, new_departure=None, valid_segments=(), platform_capacity=None,
+                        num_samples=10000, distribution=None, train_distributions=None, station_distributions=None,
+                        punctuality_station=None, punctuality_threshold=5, seed=0, batch_size=1000, max_workers=None,
+                        running_time=RUNNING_TIME, min_dwell=MIN_DWELL_TIME, max_dwell=MAX_DWELL_TIME, headway_time=HEADWAY_TIME):
+    """
+    Estimates how a timetable holds up under small random delays, by Monte Carlo simulation.
+
+    The timetable evaluated is new_arrival and new_departure when given, else the optimized columns
+    of a Timetable (or analyze_solution rows) that carries them, else the planned times. Every event
+    gets a random primary delay from the DelayDistribution of its train in train_distributions, else
+    of its station in station_distributions, else distribution. A primary delay lengthens the run or
+    dwell that ends at the event (or delays the first event of a train), and is propagated along the
+    running time, dwell, headway and single-track activities of build_event_graph, with no event
+    earlier than its timetabled time. The propagation is a max-plus pass over the events in
+    topological levels, vectorized over all samples of a batch at once.
+
+    Batches of batch_size samples are drawn from independent random streams of seed, so the result
+    does not depend on max_workers; with max_workers above one the batches run in parallel processes.
+
+    Per sample, the result has the summed "primary_delay", the "total_delay" of all events against
+    the timetable, the "knock_on_delay" that trains cause each other (the total delay minus the delay
+    each train would have alone), the "punctuality" (share of arrivals at punctuality_station, or of
+    the trains' final arrivals when None, at most punctuality_threshold minutes late) and the number
+    of "platform_breaches" (arrivals at a station of platform_capacity with every platform taken).
+
+    Returns:
+        A dict with the "num_samples", the per-sample arrays of ROBUSTNESS_METRICS and their "summary"
+        (mean and percentiles).
+    """
+    if not isinstance(working_timetable, Timetable):
+        records = list(working_timetable)
+        if records and "new_arrival" in records[0]:
+            working_timetable = Timetable.from_optimized_records(records)
+        else:
+            working_timetable = Timetable.from_records(records)
+    if new_arrival is None:
+        new_arrival = working_timetable.arrival if working_timetable.new_arrival is None else working_timetable.new_arrival
+        new_departure = working_timetable.departure if working_timetable.new_departure is None else working_timetable.new_departure
+    evaluated = Timetable(working_timetable.trains, working_timetable.stations, working_timetable.train_ids,
+                          working_timetable.station_ids, new_arrival, new_departure)
+
+    network = build_delay_network(evaluated, valid_segments, platform_capacity or {}, distribution or DelayDistribution(),
+                                  train_distributions or {}, station_distributions or {}, punctuality_station,
+                                  running_time=running_time, min_dwell=min_dwell, max_dwell=max_dwell, headway_time=headway_time)
+
+    sizes = [min(batch_size, num_samples - start) for start in range(0, num_samples, batch_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(network, stream, size, punctuality_threshold) for stream, size in zip(streams, sizes)]
+    if max_workers is not None and max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            batches = list(executor.map(_simulate_batch, tasks))
+    else:
+        batches = [_simulate_batch(task) for task in tasks]
+
+    result = {"num_samples": num_samples}
+    for metric in ROBUSTNESS_METRICS:
+        result[metric] = np.concatenate([batch[metric] for batch in batches]) if batches else np.zeros(0)
+    result["summary"] = {metric: _summary(result[metric]) for metric in ROBUSTNESS_METRICS}
+    logger.info("Robustness over %d samples: mean knock-on delay %.2f, punctuality %.1f%%, %.2f platform breaches",
+                num_samples, result["summary"]["knock_on_delay"]["mean"], 100 * result["summary"]["punctuality"]["mean"],
+                result["summary"]["platform_breaches"]["mean"])
+    return result
+
+
+def compare_robustness(working_timetable, new_arrival=None, new_departure=None, **options):
+    """
+    Evaluates the planned and the optimized times of a timetable with evaluate_robustness, on the
+    same random samples so the difference is not sampling noise.
+
+    Returns:
+        A dict with the evaluate_robustness result of the "original" and the "optimized" timetable.
+    """
+    if not isinstance(working_timetable, Timetable):
+        records = list(working_timetable)
+        if records and "new_arrival" in records[0]:
+            working_timetable = Timetable.from_optimized_records(records)
+        else:
+            working_timetable = Timetable.from_records(records)
+    if new_arrival is None:
+        new_arrival, new_departure = working_timetable.new_arrival, working_timetable.new_departure
+
+    return {
+        "original": evaluate_robustness(working_timetable, working_timetable.arrival, working_timetable.departure, **options),
+        "optimized": evaluate_robustness(working_timetable, new_arrival, new_departure, **options),
+    }
+
+
+def build_delay_network(working_timetable, valid_segments, platform_capacity, distribution, train_distributions,
+                        station_distributions, punctuality_station=None, running_time=RUNNING_TIME, min_dwell=MIN_DWELL_TIME,
+                        max_dwell=MAX_DWELL_TIME, headway_time=HEADWAY_TIME):
+    """
+    Lays out the event-activity graph of a timetable as arrays for the batch propagation.
+
+    Events are ordered by their timetabled time, arrivals first at equal times, which is a
+    topological order of the activities whenever the timetable obeys its own rules. Each event's
+    level is one more than the highest level of its predecessors, so all events of a level can be
+    propagated together.
+
+    Returns:
+        A dict of arrays: the "times" of the events, "levels" (per level, the event columns and their
+        incoming activities for the full and the train-only propagation), the events whose primary
+        delay "delays_start" of their train, the "sampling" (distribution, columns) groups, the
+        "punctual" arrival columns and the "platforms" (capacity, arrival columns, departure columns).
+    """
+    graph = build_event_graph(working_timetable, valid_segments, running_time=running_time, min_dwell=min_dwell,
+                              max_dwell=max_dwell, headway_time=headway_time)
+    planned, successors = graph["planned"], graph["successors"]
+    events = sorted(planned, key=lambda event: (planned[event], event[0] == "departure"))
+    column = {event: k for k, event in enumerate(events)}
+    times = np.array([planned[event] for event in events], dtype=np.float64)
+
+    # Activities (source, target, duration, same train), without the maximum dwell, which only bounds
+    # how long a train may wait and never delays it
+    activities = []
+    for event, links in successors.items():
+        for successor, duration in links:
+            if duration >= 0:
+                activities.append((column[event], column[successor], duration, event[1] == successor[1]))
+    backwards = [(events[source], events[target]) for source, target, _, _ in activities if source >= target]
+    if backwards:
+        raise ValueError(f"The timetable breaks its own rules between {backwards[0][0]} and {backwards[0][1]}, see verify_timetable")
+    activities.sort(key=lambda activity: activity[1])
+
+    level = np.zeros(len(events), dtype=np.int64)
+    for source, target, _, _ in activities:
+        level[target] = max(level[target], level[source] + 1)
+    delays_start = np.ones(len(events), dtype=bool)
+    for _, target, _, own in activities:
+        if own:
+            delays_start[target] = False
+
+    by_level = {}
+    for activity in activities:
+        by_level.setdefault(int(level[activity[1]]), []).append(activity)
+    levels = [(_level_activities(by_level[depth]), _level_activities([activity for activity in by_level[depth] if activity[3]]))
+              for depth in sorted(by_level)]
+
+    trains = [event[1] for event in events]
+    stations = [event[2] for event in events]
+    groups = {}
+    for k, (train, station) in enumerate(zip(trains, stations)):
+        event_distribution = train_distributions.get(train, station_distributions.get(station, distribution))
+        groups.setdefault(event_distribution, []).append(k)
+    sampling = [(event_distribution, np.array(columns, dtype=np.intp)) for event_distribution, columns in groups.items()]
+
+    if punctuality_station is None:
+        punctual = [column[event] for event in events if event[0] == "arrival" and ("departure", event[1], event[2]) not in column]
+    else:
+        punctual = [column[event] for event in events if event[0] == "arrival" and event[2] == punctuality_station]
+
+    platforms = []
+    for station, capacity in platform_capacity.items():
+        stops = [(column[event], column[("departure", event[1], station)]) for event in events
+                 if event[0] == "arrival" and event[2] == station and ("departure", event[1], station) in column]
+        if len(stops) > capacity:
+            platforms.append((capacity, np.array([a for a, _ in stops], dtype=np.intp), np.array([d for _, d in stops], dtype=np.intp)))
+
+    return {
+        "times": times,
+        "levels": levels,
+        "delays_start": delays_start,
+        "sampling": sampling,
+        "punctual": np.array(punctual, dtype=np.intp),
+        "platforms": platforms,
+    }
+
+
+def _level_activities(activities):
+    # Activities into one level, grouped by target for np.maximum.reduceat
+    sources = np.array([source for source, _, _, _ in activities], dtype=np.intp)
+    targets = np.array([target for _, target, _, _ in activities], dtype=np.intp)
+    durations = np.array([duration for _, _, duration, _ in activities], dtype=np.float64)
+    own = np.array([same_train for _, _, _, same_train in activities], dtype=bool)
+    starts = np.flatnonzero(np.r_[True, targets[1:] != targets[:-1]]) if len(targets) else np.zeros(0, dtype=np.intp)
+    return {"sources": sources, "durations": durations, "own": own, "activity_targets": targets, "starts": starts,
+            "targets": targets[starts]}
+
+
+def _propagate(network, primary, own_only):
+    # Max-plus pass: each event happens at its timetabled time, or as soon as its activities allow
+    times = network["times"]
+    realized = times + primary * network["delays_start"]
+    for full, own in network["levels"]:
+        activities = own if own_only else full
+        if not len(activities["targets"]):
+            continue
+        candidates = (realized[:, activities["sources"]] + activities["durations"]
+                      + primary[:, activities["activity_targets"]] * activities["own"])
+        earliest = np.maximum.reduceat(candidates, activities["starts"], axis=1)
+        realized[:, activities["targets"]] = np.maximum(realized[:, activities["targets"]], earliest)
+    return realized
+
+
+def _simulate_batch(task):
+    network, stream, size, punctuality_threshold = task
+    rng = np.random.default_rng(stream)
+    times = network["times"]
+
+    primary = np.zeros((size, len(times)))
+    for event_distribution, columns in network["sampling"]:
+        primary[:, columns] = event_distribution.sample(rng, (size, len(columns)))
+
+    realized = _propagate(network, primary, own_only=False)
+    alone = _propagate(network, primary, own_only=True)
+    total_delay = (realized - times).sum(axis=1)
+
+    punctual = network["punctual"]
+    punctuality = np.ones(size)
+    if len(punctual):
+        punctuality = (realized[:, punctual] - times[punctual] <= punctuality_threshold).mean(axis=1)
+
+    # Sweep each station's arrivals (+1) and departures (-1) in time order, departures first at equal times
+    breaches = np.zeros(size, dtype=np.int64)
+    for capacity, arrivals, departures in network["platforms"]:
+        sweep = np.concatenate([realized[:, departures], realized[:, arrivals]], axis=1)
+        change = np.r_[np.full(len(departures), -1), np.full(len(arrivals), 1)]
+        order = np.argsort(sweep, axis=1, kind="stable")
+        present = np.cumsum(change[order], axis=1)
+        breaches += ((present > capacity) & (change[order] == 1)).sum(axis=1)
+
+    return {
+        "primary_delay": primary.sum(axis=1),
+        "total_delay": total_delay,
+        "knock_on_delay": total_delay - (alone - times).sum(axis=1),
+        "punctuality": punctuality,
+        "platform_breaches": breaches,
+    }
+
+
+def _summary(values):
+    if not len(values):
+        return {"mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+    return {"mean": float(np.mean(values)), "p50": p50, "p90": p90, "p99": p99, "max": float(np.max(values))}
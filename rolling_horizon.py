@@ -0,0 +1,178 @@
+import bisect
+import logging
+import math
+import time
+
+import pulp
+
+from instrumentation import timed
+from scenario import build_scenario_model, total_deviation
+from solver_config import SolverConfig, has_solution, solve_with_stats
+
+logger = logging.getLogger(__name__)
+
+
+def release_time(entry):
+    """
+    Returns the planned time an event releases its train: the departure, or the arrival at a terminal.
+    """
+    if entry["departure"] is not None:
+        return entry["departure"]
+    if entry["arrival"] is not None:
+        return entry["arrival"]
+    return math.inf
+
+
+def solve_rolling_horizon(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                          delays=(), window_length=60, overlap=15, solver_config=None, objective_mode="symmetric", weights=None):
+    """
+    Reschedules the timetable as a sequence of overlapping time windows instead of one monolithic MILP.
+
+    Windows start at the earliest disruption (the blockage start or the first delayed departure).
+    Events released before that are kept at their planned times. Each window re-optimizes the
+    events released inside it, with the events of the preceding window_length minutes fixed at
+    their current (planned or already-optimized) times and the next stop of each free event left
+    free so the segments they depart onto stay constrained. Only events before the last overlap
+    minutes are committed; the rest carry into the next window as its warm start. objective_mode
+    and weights are passed on to build_scenario_model.
+
+    A window stopped on its time limit commits its best solution and the plan carries on, reported
+    with that window's status; a window without a solution ends the plan.
+
+    Returns:
+        A dict with the overall status and solution_status (see has_solution), arrival_times and
+        departure_times keyed like the model variables (so analyze_solution accepts them), the total
+        deviation objective and per-window stats.
+    """
+    if overlap >= window_length:
+        raise ValueError("overlap must be shorter than the window length")
+
+    entries = list(working_timetable)
+    delays = list(delays)
+    arrival_times = {(entry["train"], entry["station"]): entry["arrival"] for entry in entries if entry["arrival"] is not None}
+    departure_times = {(entry["train"], entry["station"]): entry["departure"] for entry in entries if entry["departure"] is not None}
+
+    skipped = [i for i, entry in enumerate(entries) if not math.isfinite(release_time(entry))]
+    train_rows = {}
+    for i, entry in enumerate(entries):
+        train_rows.setdefault(entry["train"], []).append(i)
+    next_stop = {i: rows[k + 1] for rows in train_rows.values() for k, i in enumerate(rows[:-1])}
+    timed_events = sorted((release_time(entry), i) for i, entry in enumerate(entries) if math.isfinite(release_time(entry)))
+    release_times = [release for release, _ in timed_events]
+
+    delayed_departures = [departure_times[(train, station)] for train, station, _ in delays]
+    window_start = min([blockage_start] + delayed_departures)
+    horizon_end = release_times[-1] if release_times else window_start
+
+    if solver_config is None:
+        solver_config = SolverConfig(warm_start=True)
+
+    windows = []
+    status, solution_status = "Optimal", pulp.LpSolution[pulp.LpSolutionOptimal]
+    while window_start <= horizon_end:
+        window_end = window_start + window_length
+        lo = bisect.bisect_left(release_times, window_start - window_length)
+        mid = bisect.bisect_left(release_times, window_start)
+        hi = bisect.bisect_left(release_times, window_end)
+        fixed = [entries[i] for _, i in timed_events[lo:mid]]
+        # The next stop of each free event stays in the model uncommitted, so a departure at the end
+        # of the window still sees the segment it runs into
+        lookahead = {next_stop[i] for _, i in timed_events[mid:hi] if i in next_stop} - {i for _, i in timed_events[lo:hi]}
+        positions = sorted(set([i for _, i in timed_events[lo:hi]] + skipped) | lookahead)
+        window_timetable = [entries[i] for i in positions]
+        window_keys = {(entries[i]["train"], entries[i]["station"]) for _, i in timed_events[mid:hi]}
+
+        build_started = time.perf_counter()
+        window_delays = [delay for delay in delays if (delay[0], delay[1]) in window_keys]
+        solver, arrival_vars, departure_vars = build_scenario_model(
+            window_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+            delays=window_delays, objective_mode=objective_mode, weights=weights)
+
+        for entry in fixed:
+            key = (entry["train"], entry["station"])
+            for variables, times in ((arrival_vars, arrival_times), (departure_vars, departure_times)):
+                if key in variables:
+                    variables[key].lowBound = variables[key].upBound = times[key]
+        for key in window_keys:
+            for variables, times in ((arrival_vars, arrival_times), (departure_vars, departure_times)):
+                if key in variables:
+                    variables[key].setInitialValue(times[key])
+        build_time = time.perf_counter() - build_started
+
+        with timed("solve"):
+            solver_stats = solve_with_stats(solver, solver_config)
+        window_status = solver_stats["status"]
+        solve_time = solver_stats["wall_time"]
+
+        windows.append({
+            "start": window_start,
+            "end": window_end,
+            "free_events": len(window_keys),
+            "fixed_events": len(fixed),
+            "status": window_status,
+            "objective": pulp.value(solver.objective),
+            "build_time": build_time,
+            "solve_time": solve_time,
+            "solver_stats": solver_stats,
+        })
+        logger.info("Window [%s, %s): %s, %d free events, build %.3fs, solve %.3fs",
+                    window_start, window_end, window_status, len(window_keys), build_time, solve_time)
+
+        if not has_solution(solver_stats):
+            status, solution_status = window_status, solver_stats["solution_status"]
+            break
+        if window_status != "Optimal":
+            # The window's best solution is still committed, but the plan is no longer proven optimal per window
+            status, solution_status = window_status, solver_stats["solution_status"]
+
+        for key in window_keys:
+            if key in arrival_vars:
+                arrival_times[key] = arrival_vars[key].varValue
+            if key in departure_vars:
+                departure_times[key] = departure_vars[key].varValue
+
+        window_start = window_end - overlap
+
+    return {
+        "status": status,
+        "solution_status": solution_status,
+        "arrival_times": arrival_times,
+        "departure_times": departure_times,
+        "objective": total_deviation(entries, arrival_times, departure_times),
+        "windows": windows,
+    }
+
+
+def compare_with_monolithic(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                            delays=(), window_length=60, overlap=15, time_limit=None):
+    """
+    Solves a scenario both monolithically and with rolling horizons and reports the objective gap.
+
+    The gap is only reported when the monolithic solve proves optimality within time_limit seconds.
+    """
+    started = time.perf_counter()
+    solver, _, _ = build_scenario_model(working_timetable, blocked_section, blockage_start, blockage_end,
+                                        valid_segments, platform_capacity, delays=delays)
+    monolithic_status = solve_with_stats(solver, SolverConfig(time_limit=time_limit))["status"]
+    monolithic_time = time.perf_counter() - started
+    monolithic_objective = pulp.value(solver.objective)
+
+    started = time.perf_counter()
+    rolling = solve_rolling_horizon(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                                    platform_capacity, delays=delays, window_length=window_length, overlap=overlap)
+    rolling_time = time.perf_counter() - started
+
+    gap = None
+    if monolithic_status == "Optimal" and rolling["status"] == "Optimal":
+        gap = (rolling["objective"] - monolithic_objective) / max(abs(monolithic_objective), 1e-9)
+
+    return {
+        "monolithic_status": monolithic_status,
+        "monolithic_objective": monolithic_objective,
+        "monolithic_time": monolithic_time,
+        "rolling_status": rolling["status"],
+        "rolling_objective": rolling["objective"],
+        "rolling_time": rolling_time,
+        "gap": gap,
+        "windows": rolling["windows"],
+    }
@@ -0,0 +1,54 @@
+from model import create_model
+from constraints import add_constraints, add_delays
+from objective import set_objective
+
+
+def build_scenario_model(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity, delays=(), pair_window=None,
+                         platform_formulation="big_m", max_early=None, max_delay=None, bounds=None, objective_mode="symmetric", weights=None,
+                         blockages=()):
+    """
+    Builds the complete optimization model for one disruption scenario.
+
+    Parameters:
+        working_timetable: Timetable (or list of stop dicts) to reschedule.
+        blocked_section, blockage_start, blockage_end: Blockage of the scenario (blocked_section may be None).
+        valid_segments: Single-track segments as (from_station, to_station) tuples.
+        platform_capacity: Platforms per station.
+        delays: Iterable of (train, station, delay) departure delays to inject.
+        pair_window: Optional time window for pairwise constraints, see add_constraints.
+        platform_formulation: "big_m" or "interval", see add_platform_capacity_constraints.
+        max_early, max_delay: Optional variable bounds around the plan, see create_model.
+        bounds: Optional per-event (arrival_bounds, departure_bounds), see create_model.
+        objective_mode: "symmetric" or "lateness", see set_objective.
+        weights: Optional dict of set_objective weight arguments (train_weights, station_weights,
+            arrival_weight, departure_weight).
+        blockages: Optional further (section, start, end) blockages, see add_blocking_constraints.
+
+    Returns:
+        The solver, arrival variables and departure variables.
+    """
+    solver, arrival_vars, departure_vars = create_model(working_timetable, max_early=max_early, max_delay=max_delay, bounds=bounds)
+
+    solver = add_constraints(solver, working_timetable, arrival_vars, departure_vars,
+                             blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                             pair_window=pair_window, platform_formulation=platform_formulation, blockages=blockages)
+
+    solver = add_delays(solver, working_timetable, departure_vars, delays)
+
+    solver = set_objective(solver, working_timetable, arrival_vars, departure_vars, mode=objective_mode, **(weights or {}))
+
+    return solver, arrival_vars, departure_vars
+
+
+def total_deviation(working_timetable, arrival_times, departure_times):
+    """
+    Returns the objective of set_objective evaluated on fixed times: the summed absolute deviation from the plan.
+    """
+    total = 0
+    for entry in working_timetable:
+        key = (entry["train"], entry["station"])
+        if entry["arrival"] is not None:
+            total += abs(arrival_times[key] - entry["arrival"])
+        if entry["departure"] is not None:
+            total += abs(departure_times[key] - entry["departure"])
+    return total
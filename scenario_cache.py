@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+from collections import OrderedDict
+
+from constraints import HEADWAY_TIME, MAX_DWELL_TIME, MIN_DWELL_TIME, RUNNING_TIME
+from session import ReschedulingSession
+from solver_config import SolverConfig, has_solution
+from timetable import Timetable
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth caching: rerunning the same scenario cannot change them
+_FINAL_STATUSES = ("Optimal", "Infeasible")
+
+
+class ScenarioCache:
+    """
+    Two-tier cache of solved scenarios keyed by scenario_fingerprint.
+
+    Results are kept in an in-memory LRU of max_entries and, when directory is given, pickled to disk.
+    The disk tier evicts its least recently used files once it grows past max_disk_bytes. The cache
+    also keeps the base ReschedulingSession of each network, so a miss only rebuilds the
+    scenario-specific constraints.
+    """
+
+    def __init__(self, max_entries=128, directory=None, max_disk_bytes=100 * 1024 * 1024, max_sessions=4):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_sessions = max_sessions
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._sessions = OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, fingerprint):
+        """
+        Returns the cached result for fingerprint, or None.
+        """
+        if fingerprint in self._memory:
+            self._memory.move_to_end(fingerprint)
+            self.hits += 1
+            return self._memory[fingerprint]
+
+        path = self._path(fingerprint)
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "rb") as cache_file:
+                    result = pickle.load(cache_file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                logger.warning("Dropping unreadable cache file %s", path)
+                _remove(path)
+            else:
+                os.utime(path)
+                self._remember(fingerprint, result)
+                self.hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, fingerprint, result):
+        self._remember(fingerprint, result)
+
+        path = self._path(fingerprint)
+        if path is not None:
+            temporary_path = path + ".tmp"
+            with open(temporary_path, "wb") as cache_file:
+                pickle.dump(result, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+            self._evict_disk()
+
+    def session(self, working_timetable, valid_segments, platform_capacity, solver_config=None, pair_window=None,
+                platform_formulation="big_m", objective_mode="symmetric", weights=None):
+        """
+        Returns the cached base ReschedulingSession for a network and objective, building it on first
+        use, with any disruptions from an earlier scenario removed.
+        """
+        key = scenario_fingerprint(working_timetable, valid_segments=valid_segments, platform_capacity=platform_capacity,
+                                   solver_config=solver_config, pair_window=pair_window,
+                                   platform_formulation=platform_formulation, objective_mode=objective_mode, weights=weights)
+        session = self._sessions.get(key)
+        if session is None:
+            session = ReschedulingSession(working_timetable, valid_segments, platform_capacity, solver_config=solver_config,
+                                          pair_window=pair_window, platform_formulation=platform_formulation,
+                                          objective_mode=objective_mode, weights=weights)
+            self._sessions[key] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+            for name in session.disruptions():
+                session.remove(name)
+        return session
+
+    def clear(self):
+        self._memory.clear()
+        self._sessions.clear()
+        if self.directory is not None:
+            for path, _, _ in self._disk_files():
+                _remove(path)
+
+    def _remember(self, fingerprint, result):
+        self._memory[fingerprint] = result
+        self._memory.move_to_end(fingerprint)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, fingerprint):
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, f"{fingerprint}.pkl")
+
+    def _disk_files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((path, stat.st_mtime, stat.st_size))
+        return files
+
+    def _evict_disk(self):
+        files = sorted(self._disk_files(), key=lambda file: file[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.max_disk_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def scenario_fingerprint(working_timetable, **parameters):
+    """
+    Returns a hex digest of the timetable contents, the operating rules of constraints.py and the
+    given scenario parameters (blockage, delays, solver settings, ...).
+
+    A Timetable and the equivalent list of stop dicts have the same fingerprint. The solver's msg
+    setting does not affect results and is left out.
+    """
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([working_timetable.trains, working_timetable.stations]).encode())
+    for column in (working_timetable.train_ids, working_timetable.station_ids, working_timetable.arrival, working_timetable.departure):
+        digest.update(column.tobytes())
+
+    solver_config = parameters.pop("solver_config", None) or SolverConfig()
+    parameters["solver"] = {name: value for name, value in solver_config.to_dict().items() if name != "msg"}
+    parameters["rules"] = {
+        "running_time": RUNNING_TIME,
+        "min_dwell_time": MIN_DWELL_TIME,
+        "max_dwell_time": MAX_DWELL_TIME,
+        "headway_time": HEADWAY_TIME,
+    }
+    digest.update(json.dumps(parameters, sort_keys=True, default=_jsonable).encode())
+    return digest.hexdigest()
+
+
+def solve_cached(cache, working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+                 delays=(), solver_config=None, pair_window=None, platform_formulation="big_m", objective_mode="symmetric",
+                 weights=None):
+    """
+    Solves a scenario through the cache.
+
+    On a hit the stored result is returned without building anything. On a miss the cached base
+    session of the network gets the scenario's blockage and delays, is solved, and the result is
+    stored when its status is final. The platform_formulation, objective_mode and weights are part
+    of the scenario, so solves under another objective never share a cache entry.
+
+    Returns:
+        A dict with the status, the optimized timetable from analyze_solution (None without a
+        solution), the solver statistics and whether it came from the cache.
+    """
+    delays = [tuple(delay) for delay in delays]
+    fingerprint = scenario_fingerprint(
+        working_timetable, blocked_section=blocked_section, blockage_start=blockage_start, blockage_end=blockage_end,
+        valid_segments=valid_segments, platform_capacity=platform_capacity, delays=delays,
+        solver_config=solver_config, pair_window=pair_window, platform_formulation=platform_formulation,
+        objective_mode=objective_mode, weights=weights)
+
+    result = cache.get(fingerprint)
+    if result is not None:
+        logger.info("Scenario cache hit %s", fingerprint[:12])
+        return dict(result, cached=True)
+
+    session = cache.session(working_timetable, valid_segments, platform_capacity, solver_config=solver_config, pair_window=pair_window,
+                            platform_formulation=platform_formulation, objective_mode=objective_mode, weights=weights)
+    session.set_blockage("Blockage", blocked_section, blockage_start, blockage_end)
+    for train, station, delay in delays:
+        session.set_delay(train, station, delay)
+    status = session.solve()
+
+    result = {
+        "status": status,
+        "optimized_timetable": session.solution() if has_solution(session.solver_stats) else None,
+        "solver_stats": session.solver_stats,
+    }
+    if status in _FINAL_STATUSES:
+        cache.put(fingerprint, result)
+    return dict(result, cached=False)
+
+
+def _jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Cannot fingerprint {type(value).__name__}")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analysis import analyze_solution
+from instrumentation import configure_logging
+from session import ReschedulingSession
+from snapshot import open_snapshot, solve_snapshot
+from solver_config import SolverConfig, has_solution
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per request type for the percentiles
+LATENCY_WINDOW = 10000
+
+# The worker process's session (or snapshot), set up once by _start_worker
+_worker_session = None
+_worker_snapshot = None
+_worker_solver_config = None
+
+
+class ReschedulingService:
+    """
+    Long-running rescheduling service that keeps the base model of one network in memory.
+
+    Delay and blockage events update the current disruption state and wait for the next solve that
+    includes them. Solves run one at a time in a worker process holding a ReschedulingSession, so the
+    event loop stays responsive; events that arrive while a solve is running are all answered by the
+    following solve instead of being solved one by one.
+
+    With a snapshot_directory, the worker loads the base model from a compile_snapshot snapshot
+    (compiling it on first use) instead of building a session, and solves every scenario from it.
+    """
+
+    def __init__(self, working_timetable, valid_segments, platform_capacity, solver_config=None, snapshot_directory=None):
+        self.working_timetable = working_timetable
+        self.valid_segments = valid_segments
+        self.platform_capacity = platform_capacity
+        self.solver_config = solver_config or SolverConfig(warm_start=True)
+        self.snapshot_directory = snapshot_directory
+        self.solves = 0
+
+        self._departures = {(entry["train"], entry["station"]) for entry in working_timetable if entry["departure"] is not None}
+        self._delays = {}
+        self._blockages = {}
+        self._waiting = []
+        self._solving = None
+        self._latencies = {}
+        self._executor = None
+
+    async def start(self):
+        """
+        Starts the worker process and builds the base model in it.
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=1, initializer=_start_worker,
+            initargs=(self.working_timetable, self.valid_segments, self.platform_capacity, self.solver_config, self.snapshot_directory))
+        await asyncio.get_running_loop().run_in_executor(self._executor, _ping)
+
+    async def stop(self):
+        if self._solving is not None:
+            await asyncio.gather(self._solving, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def handle(self, request):
+        """
+        Handles one JSON request and returns the JSON response.
+
+        Requests:
+            {"type": "delay", "train": ..., "station": ..., "delay": minutes}
+            {"type": "blockage", "name": ..., "section": [from, to], "start": ..., "end": ...}
+            {"type": "remove", "name": ...}  (a blockage name, or "Delay_<train>_<station>")
+            {"type": "stats"}
+        """
+        started = time.perf_counter()
+        request_type = request.get("type") if isinstance(request, dict) else None
+        try:
+            if request_type == "stats":
+                return {"ok": True, "solves": self.solves, "latency": self.latency_percentiles()}
+            self._apply(request_type, request)
+            response = dict(await self._next_solve(), ok=True)
+        except (KeyError, TypeError, ValueError) as error:
+            response = {"ok": False, "error": str(error)}
+        latency = time.perf_counter() - started
+        self._latencies.setdefault(request_type, deque(maxlen=LATENCY_WINDOW)).append(latency)
+        response["latency"] = latency
+        return response
+
+    def latency_percentiles(self):
+        """
+        Returns request type -> count and 50th/90th/99th percentile and maximum latency in seconds.
+        """
+        percentiles = {}
+        for request_type, latencies in self._latencies.items():
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+            percentiles[request_type] = {"count": len(latencies), "p50": p50, "p90": p90, "p99": p99, "max": max(latencies)}
+        return percentiles
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Serves newline-delimited JSON requests over TCP until cancelled.
+        """
+        server = await asyncio.start_server(self._client, host, port)
+        logger.info("Rescheduling service listening on %s:%d", host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as error:
+                    response = {"ok": False, "error": f"Invalid JSON: {error}"}
+                else:
+                    response = await self.handle(request)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _apply(self, request_type, request):
+        if request_type == "delay":
+            key = (request["train"], request["station"])
+            if key not in self._departures:
+                raise ValueError(f"No departure of {key[0]} at {key[1]}")
+            self._delays[f"Delay_{key[0]}_{key[1]}"] = (key[0], key[1], float(request["delay"]))
+        elif request_type == "blockage":
+            start, end = float(request["start"]), float(request["end"])
+            if end < start:
+                raise ValueError(f"Blockage ends at {end} before it starts at {start}")
+            self._blockages[request.get("name", "Blockage")] = (tuple(request["section"]), start, end)
+        elif request_type == "remove":
+            if self._delays.pop(request["name"], None) is None and self._blockages.pop(request["name"], None) is None:
+                raise ValueError(f"Unknown disruption {request['name']}")
+        else:
+            raise ValueError(f"Unknown request type {request_type!r}")
+
+    async def _next_solve(self):
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        if self._solving is None or self._solving.done():
+            self._solving = asyncio.create_task(self._solve_loop())
+        return await future
+
+    async def _solve_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._waiting:
+            batch, self._waiting = self._waiting, []
+            delays, blockages = list(self._delays.values()), dict(self._blockages)
+            try:
+                result = await loop.run_in_executor(self._executor, _solve_in_worker, delays, blockages)
+            except Exception as error:
+                logger.exception("Solve failed")
+                for future in batch:
+                    future.set_exception(ValueError(f"Solve failed: {error}"))
+                continue
+            self.solves += 1
+            result["coalesced"] = len(batch)
+            logger.info("Solve %d answered %d requests: %s", self.solves, len(batch), result["status"])
+            for future in batch:
+                if not future.done():
+                    future.set_result(result)
+
+
+def _start_worker(working_timetable, valid_segments, platform_capacity, solver_config, snapshot_directory=None):
+    global _worker_session, _worker_snapshot, _worker_solver_config
+    _worker_solver_config = solver_config
+    if snapshot_directory is not None:
+        _worker_snapshot = open_snapshot(snapshot_directory, working_timetable, valid_segments, platform_capacity)
+    else:
+        _worker_session = ReschedulingSession(working_timetable, valid_segments, platform_capacity, solver_config=solver_config)
+
+
+def _ping():
+    return _worker_session is not None or _worker_snapshot is not None
+
+
+def _solve_in_worker(delays, blockages):
+    """
+    Replaces the worker session's disruptions with the given state, solves it and returns the status,
+    the objective and the events that moved.
+    """
+    if _worker_snapshot is not None:
+        return _solve_snapshot_in_worker(delays, blockages)
+
+    session = _worker_session
+    for name in session.disruptions():
+        session.remove(name)
+    for name, (blocked_section, blockage_start, blockage_end) in blockages.items():
+        session.set_blockage(name, blocked_section, blockage_start, blockage_end)
+    for train, station, delay in delays:
+        session.set_delay(train, station, delay)
+
+    status = session.solve()
+    result = {"status": status, "objective": session.solver_stats["objective"], "solve_time": session.solver_stats["wall_time"]}
+    return _with_changes(result, session.solution() if has_solution(session.solver_stats) else None)
+
+
+def _solve_snapshot_in_worker(delays, blockages):
+    solved = solve_snapshot(_worker_snapshot, None, None, None, delays=delays, solver_config=_worker_solver_config,
+                            blockages=list(blockages.values()))
+    result = {"status": solved["status"], "objective": solved["objective"], "solve_time": solved["wall_time"]}
+    optimized_timetable = None
+    if has_solution(solved):
+        optimized_timetable = analyze_solution(_worker_snapshot["timetable"], solved["arrival_times"], solved["departure_times"])
+    return _with_changes(result, optimized_timetable)
+
+
+def _with_changes(result, optimized_timetable):
+    # Adds the total delay and the events that moved, when there is a solution
+    result["total_delay"], result["changes"] = None, []
+    if optimized_timetable is not None:
+        result["total_delay"] = sum(entry["arrival_delay"] + entry["departure_delay"] for entry in optimized_timetable)
+        result["changes"] = [
+            {key: entry[key] for key in ("train", "station", "new_arrival", "new_departure", "arrival_delay", "departure_delay")}
+            for entry in optimized_timetable
+            if entry["new_arrival"] != entry["original_arrival"] or entry["new_departure"] != entry["original_departure"]
+        ]
+    return result
+
+
+async def _run(host, port, timetable_path=None, snapshot_directory=None):
+    from data import working_timetable, valid_segments, platform_capacity
+
+    if timetable_path is not None:
+        from timetable_io import read_timetable
+
+        working_timetable = read_timetable(timetable_path)
+    service = ReschedulingService(working_timetable, valid_segments, platform_capacity, snapshot_directory=snapshot_directory)
+    await service.start()
+    try:
+        await service.serve(host, port)
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve rescheduling requests for the example network as JSON lines over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timetable", help="timetable file to serve instead of the example timetable")
+    parser.add_argument("--snapshot-dir", help="start the worker from a base-model snapshot in this directory")
+    parser.add_argument("--verbose", action="store_true", help="log debug output")
+    args = parser.parse_args()
+
+    configure_logging(args.verbose)
+    asyncio.run(_run(args.host, args.port, args.timetable, args.snapshot_dir))
@@ -0,0 +1,99 @@
+from model import create_model
+from constraints import (
+    add_single_track_conflict_constraints,
+    add_platform_capacity_constraints,
+    add_running_time_constraints,
+    add_dwell_time_constraints,
+    add_headway_constraints,
+    add_blocking_constraints,
+)
+from objective import set_objective
+from instrumentation import timed
+from solver_config import SolverConfig, solve_with_stats
+from analysis import analyze_solution
+from timetable_index import build_timetable_index
+
+
+class ReschedulingSession:
+    """
+    Keeps a built rescheduling model alive across a stream of delay and blockage reports.
+
+    The scenario-independent constraints and the objective (objective_mode and weights, see
+    set_objective) are built once. Delays and blockages are
+    added, changed and removed by name, touching only their own constraints, and every re-solve
+    starts from the previous solution for solvers that accept a warm start.
+    """
+
+    def __init__(self, working_timetable, valid_segments, platform_capacity, solver_config=None, pair_window=None,
+                 platform_formulation="big_m", objective_mode="symmetric", weights=None):
+        self.working_timetable = working_timetable
+        self.index = build_timetable_index(working_timetable)
+        self.solver_config = solver_config or SolverConfig(warm_start=True)
+        self.status = None
+        self.solver_stats = None
+
+        self.solver, self.arrival_vars, self.departure_vars = create_model(working_timetable)
+        self.solver = add_single_track_conflict_constraints(self.solver, working_timetable, self.arrival_vars, self.departure_vars,
+                                                            valid_segments, window=pair_window, index=self.index)
+        self.solver = add_platform_capacity_constraints(self.solver, working_timetable, self.arrival_vars, self.departure_vars,
+                                                        platform_capacity, window=pair_window, index=self.index,
+                                                        formulation=platform_formulation)
+        self.solver = add_running_time_constraints(self.solver, working_timetable, self.arrival_vars, self.departure_vars, index=self.index)
+        self.solver = add_dwell_time_constraints(self.solver, working_timetable, self.arrival_vars, self.departure_vars)
+        self.solver = add_headway_constraints(self.solver, working_timetable, self.arrival_vars, self.departure_vars,
+                                              window=pair_window, index=self.index)
+        self.solver = set_objective(self.solver, working_timetable, self.arrival_vars, self.departure_vars, mode=objective_mode,
+                                    **(weights or {}))
+
+        self._planned_departures = {
+            (entry["train"], entry["station"]): entry["departure"]
+            for entry in working_timetable if entry["departure"] is not None
+        }
+        self._disruptions = {}
+
+    def set_delay(self, train, station, delay, name=None):
+        """
+        Fixes a departure at its planned time plus delay. Reusing a name replaces that disruption.
+        """
+        name = name or f"Delay_{train}_{station}"
+        self.remove(name)
+        self.solver += (
+            self.departure_vars[(train, station)] == self._planned_departures[(train, station)] + delay,
+            name
+        )
+        self._disruptions[name] = [name]
+        return name
+
+    def set_blockage(self, name, blocked_section, blockage_start, blockage_end):
+        """
+        Adds the blocking constraints of add_blocking_constraints for the blocked section, so the
+        session solves the same model as a cold build. Reusing a name replaces that blockage.
+        """
+        self.remove(name)
+        existing = len(self.solver.constraints)
+        self.solver = add_blocking_constraints(self.solver, self.working_timetable, blocked_section, blockage_start, blockage_end,
+                                               self.departure_vars, index=self.index, arrival_vars=self.arrival_vars, name=name)
+        self._disruptions[name] = list(self.solver.constraints)[existing:]
+        return name
+
+    def remove(self, name):
+        """
+        Drops a delay or blockage and its constraints. Unknown names are ignored.
+        """
+        for constraint_name in self._disruptions.pop(name, []):
+            self.solver.constraints.pop(constraint_name, None)
+
+    def disruptions(self):
+        return list(self._disruptions)
+
+    def solve(self):
+        """
+        Re-solves the model, warm-started from the previous solution, and returns the status name.
+        """
+        with timed("solve"):
+            self.solver_stats = solve_with_stats(self.solver, self.solver_config)
+        self.status = self.solver_stats["status"]
+        return self.status
+
+    def solution(self):
+        return analyze_solution(self.working_timetable, self.arrival_vars, self.departure_vars)
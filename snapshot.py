@@ -0,0 +1,399 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pulp
+
+from constraints import (
+    add_single_track_conflict_constraints,
+    add_platform_capacity_constraints,
+    add_running_time_constraints,
+    add_dwell_time_constraints,
+    add_headway_constraints,
+    RUNNING_TIME,
+)
+from instrumentation import instrumented, timed
+from model import create_model
+from objective import set_objective
+from scenario_cache import scenario_fingerprint
+from solver_config import SolverConfig
+from timetable import Timetable
+from timetable_index import build_blockage_index, build_timetable_index
+
+logger = logging.getLogger(__name__)
+
+# Snapshot files: the base model's MPS up to its BOUNDS section, the column map and the manifest
+MODEL_FILE = "base.mps"
+COLUMNS_FILE = "columns.npz"
+MANIFEST_FILE = "snapshot.json"
+
+# CBC solution file status word -> PuLP status name
+_CBC_STATUS = {
+    "Optimal": "Optimal",
+    "Infeasible": "Infeasible",
+    "Integer": "Infeasible",
+    "Unbounded": "Unbounded",
+    "Stopped": "Not Solved",
+}
+
+
+@instrumented("snapshot.compile")
+def compile_snapshot(working_timetable, valid_segments, platform_capacity, directory, pair_window=None, platform_formulation="big_m",
+                     objective_mode="symmetric", weights=None):
+    """
+    Compiles the scenario-independent model of a timetable into an on-disk snapshot.
+
+    The base model has every constraint of build_scenario_model except the blocking and delay
+    constraints, which solve_snapshot adds per scenario.
+    It is written as MPS without its BOUNDS section, next to a column map: the MPS column of every
+    arrival and departure, the base bounds and integrality of every column, and a fingerprint of the
+    timetable, network and objective (objective_mode and weights, see set_objective) the snapshot
+    belongs to.
+
+    Returns:
+        The loaded snapshot, see load_snapshot.
+    """
+    if not isinstance(working_timetable, Timetable):
+        working_timetable = Timetable.from_records(working_timetable)
+    index = build_timetable_index(working_timetable)
+
+    solver, arrival_vars, departure_vars = create_model(working_timetable)
+    solver = add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars, valid_segments,
+                                                   window=pair_window, index=index)
+    solver = add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity,
+                                               window=pair_window, index=index, formulation=platform_formulation)
+    solver = add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+    solver = add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
+    solver = add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars, window=pair_window, index=index)
+    solver = set_objective(solver, working_timetable, arrival_vars, departure_vars, mode=objective_mode, **(weights or {}))
+
+    os.makedirs(directory, exist_ok=True)
+    model_path = os.path.join(directory, MODEL_FILE)
+    with timed("snapshot.write"):
+        variables, names, _, _ = solver.writeMPS(model_path + ".tmp", rename=True)
+        _strip_bounds(model_path + ".tmp", model_path)
+
+    column_of = {id(variable): k for k, variable in enumerate(variables)}
+    arrival_column = np.full(len(working_timetable), -1, dtype=np.int64)
+    departure_column = np.full(len(working_timetable), -1, dtype=np.int64)
+    for row, entry in enumerate(working_timetable):
+        key = (entry["train"], entry["station"])
+        if key in arrival_vars:
+            arrival_column[row] = column_of[id(arrival_vars[key])]
+        if key in departure_vars:
+            departure_column[row] = column_of[id(departure_vars[key])]
+
+    np.savez(
+        os.path.join(directory, COLUMNS_FILE),
+        names=np.array([names[variable.name] for variable in variables]),
+        lower=np.array([-np.inf if variable.lowBound is None else variable.lowBound for variable in variables], dtype=np.float64),
+        upper=np.array([np.inf if variable.upBound is None else variable.upBound for variable in variables], dtype=np.float64),
+        integer=np.array([variable.cat == pulp.LpInteger for variable in variables]),
+        arrival_column=arrival_column,
+        departure_column=departure_column,
+    )
+
+    manifest = {
+        "fingerprint": scenario_fingerprint(working_timetable, valid_segments=valid_segments, platform_capacity=platform_capacity,
+                                            pair_window=pair_window, platform_formulation=platform_formulation,
+                                            objective_mode=objective_mode, weights=weights),
+        "trains": working_timetable.trains,
+        "stations": working_timetable.stations,
+        "train_ids": working_timetable.train_ids.tolist(),
+        "station_ids": working_timetable.station_ids.tolist(),
+        "arrival": _json_times(working_timetable.arrival),
+        "departure": _json_times(working_timetable.departure),
+        "columns": len(variables),
+        "rows": solver.numConstraints(),
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    logger.info("Compiled snapshot of %d columns and %d rows into %s", len(variables), solver.numConstraints(), directory)
+    return load_snapshot(directory)
+
+
+@instrumented("snapshot.load")
+def load_snapshot(directory, working_timetable=None, valid_segments=None, platform_capacity=None, pair_window=None,
+                  platform_formulation="big_m", objective_mode="symmetric", weights=None):
+    """
+    Loads a snapshot written by compile_snapshot.
+
+    When the timetable and network are given, a snapshot compiled for a different version of them
+    or for another objective raises ValueError instead of silently solving the wrong model.
+
+    Returns:
+        A dict with the snapshot "directory", its "timetable" and the column map arrays.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if working_timetable is not None:
+        fingerprint = scenario_fingerprint(working_timetable, valid_segments=valid_segments, platform_capacity=platform_capacity,
+                                           pair_window=pair_window, platform_formulation=platform_formulation,
+                                           objective_mode=objective_mode, weights=weights)
+        if fingerprint != manifest["fingerprint"]:
+            raise ValueError(f"Snapshot in {directory} was compiled for a different timetable, network or objective")
+
+    timetable = Timetable(manifest["trains"], manifest["stations"],
+                          np.array(manifest["train_ids"], dtype=np.int32), np.array(manifest["station_ids"], dtype=np.int32),
+                          np.array(manifest["arrival"], dtype=np.float64), np.array(manifest["departure"], dtype=np.float64))
+    with np.load(os.path.join(directory, COLUMNS_FILE)) as columns:
+        snapshot = {name: columns[name] for name in columns.files}
+    snapshot["directory"] = directory
+    snapshot["timetable"] = timetable
+    return snapshot
+
+
+def open_snapshot(directory, working_timetable, valid_segments, platform_capacity, pair_window=None, platform_formulation="big_m",
+                  objective_mode="symmetric", weights=None):
+    """
+    Loads the snapshot in directory, compiling it first when it is missing or was compiled for a
+    different version of the timetable, network or objective.
+    """
+    try:
+        return load_snapshot(directory, working_timetable, valid_segments, platform_capacity, pair_window=pair_window,
+                             platform_formulation=platform_formulation, objective_mode=objective_mode, weights=weights)
+    except FileNotFoundError:
+        logger.info("No snapshot in %s yet", directory)
+    except ValueError as error:
+        logger.info("%s, recompiling", error)
+    return compile_snapshot(working_timetable, valid_segments, platform_capacity, directory, pair_window=pair_window,
+                            platform_formulation=platform_formulation, objective_mode=objective_mode, weights=weights)
+
+
+def solve_snapshot(snapshot, blocked_section, blockage_start, blockage_end, delays=(), solver_config=None, blockages=(),
+                   big_m=1000):
+    """
+    Solves one scenario on a snapshot with CBC, without building a PuLP model.
+
+    The blockage raises the lower bound of the departures it holds back and every delay fixes its
+    departure, exactly as add_blocking_constraints (with big_m) and add_delays constrain the unbounded
+    base model. A train planned to clear a segment before a window gets the binary choice and the two
+    rows of add_blocking_constraints between clearing it first and waiting for the window to end,
+    spliced into the model as it is copied from the snapshot; the BOUNDS section is written per scenario.
+    blocked_section may be None for a scenario without a blockage, and blockages lists further
+    (blocked_section, blockage_start, blockage_end) blockages.
+
+    Returns:
+        A dict with the "status", "solution_status" and "objective" as in solve_with_stats, the solve
+        wall time and the solved "arrival_times" and "departure_times" ((train, station) -> time, usable
+        with analyze_solution). A solve stopped on its time limit keeps the times of its best solution.
+    """
+    solver_config = solver_config or SolverConfig()
+    if solver_config.backend != "cbc":
+        raise ValueError(f"Snapshots are solved with CBC, not {solver_config.backend}")
+
+    timetable = snapshot["timetable"]
+    lower, upper = snapshot["lower"].copy(), snapshot["upper"].copy()
+    arrival_column, departure_column = snapshot["arrival_column"], snapshot["departure_column"]
+
+    # Blocking: decided on the base bounds, as add_blocking_constraints decides on the unbounded variables
+    if blocked_section is not None:
+        blockages = [(blocked_section, blockage_start, blockage_end)] + list(blockages)
+    base_lower, base_upper = snapshot["lower"], snapshot["upper"]
+    by_train = np.argsort(timetable.train_ids, kind="stable")
+    same_train = timetable.train_ids[by_train[:-1]] == timetable.train_ids[by_train[1:]]
+    current, following = by_train[:-1][same_train], by_train[1:][same_train]
+    choices = []
+    for (from_station, to_station), (starts, ends) in build_blockage_index(blockages).items():
+        if from_station not in timetable.stations or to_station not in timetable.stations:
+            continue
+        on_segment = ((timetable.station_ids[current] == timetable.stations.index(from_station))
+                      & (timetable.station_ids[following] == timetable.stations.index(to_station))
+                      & (departure_column[current] >= 0))
+        entering, leaving = current[on_segment], following[on_segment]
+        departure = departure_column[entering]
+        planned = timetable.departure[entering]
+        arrives = arrival_column[leaving] >= 0
+        planned_clear = np.where(arrives, timetable.arrival[leaving], planned + RUNNING_TIME)
+        clear_column = np.where(arrives, arrival_column[leaving], departure)
+        clear_offset = np.where(arrives, 0, RUNNING_TIME)
+        earliest, latest = base_lower[departure], base_upper[departure]
+        latest_clear = base_upper[clear_column] + clear_offset
+        latest_clear = np.where(np.isinf(latest_clear), planned_clear + big_m, latest_clear)
+        search_from = np.where(np.isinf(earliest), planned - big_m, earliest)
+        search_to = np.where(np.isinf(latest), planned + big_m, latest)
+        for start, end in zip(starts, ends):
+            reached = (search_from <= end) & (search_to >= start) & (earliest < end) & (latest_clear > start)
+            held = reached & (planned_clear > start)
+            columns = departure[held]
+            lower[columns] = np.maximum(lower[columns], end)
+            # Trains planned to clear the segment first choose between doing so and waiting
+            for k in np.flatnonzero(reached & ~held).tolist():
+                depart_span = big_m if np.isinf(earliest[k]) else end - earliest[k]
+                choices.append((int(clear_column[k]), float(clear_offset[k]), float(latest_clear[k]), int(departure[k]),
+                                float(depart_span), start, end))
+    for train, station, delay in delays:
+        column = departure_column[_row_of(timetable, train, station)]
+        fixed = timetable.departure[_row_of(timetable, train, station)] + delay
+        lower[column], upper[column] = max(lower[column], fixed), min(upper[column], fixed)
+
+    with tempfile.TemporaryDirectory() as work_directory:
+        model_path = os.path.join(work_directory, "scenario.mps")
+        solution_path = os.path.join(work_directory, "scenario.sol")
+        with open(model_path, "w") as model_file:
+            with open(os.path.join(snapshot["directory"], MODEL_FILE)) as base_file:
+                if choices:
+                    model_file.writelines(_with_blocking_choices(base_file, snapshot["names"], choices))
+                else:
+                    shutil.copyfileobj(base_file, model_file)
+            model_file.writelines(_bound_lines(snapshot["names"], lower, upper, snapshot["integer"]))
+            model_file.write("ENDATA\n")
+
+        started = time.perf_counter()
+        with timed("solve"):
+            subprocess.run([pulp.PULP_CBC_CMD().path, model_path] + _cbc_options(solver_config) + ["-solve", "-solution", solution_path],
+                           stdout=None if solver_config.msg else subprocess.DEVNULL, stderr=subprocess.STDOUT, check=False)
+        wall_time = time.perf_counter() - started
+        status, solution_status, objective, values = _read_solution(solution_path, snapshot["names"])
+
+    arrival_times, departure_times = {}, {}
+    if values is not None:
+        keys = zip(np.asarray(timetable.trains, dtype=object)[timetable.train_ids].tolist(),
+                   np.asarray(timetable.stations, dtype=object)[timetable.station_ids].tolist())
+        for key, arrival, departure in zip(keys, snapshot["arrival_column"].tolist(), departure_column.tolist()):
+            if arrival >= 0:
+                arrival_times[key] = values[arrival]
+            if departure >= 0:
+                departure_times[key] = values[departure]
+
+    logger.info("Solved snapshot scenario in %.3fs: %s (objective %s)", wall_time, status, objective)
+    return {
+        "status": status,
+        "solution_status": solution_status,
+        "objective": objective,
+        "wall_time": wall_time,
+        "arrival_times": arrival_times,
+        "departure_times": departure_times,
+    }
+
+
+def _strip_bounds(source_path, target_path):
+    # Keeps everything up to and including the BOUNDS header line
+    with open(source_path) as source, open(target_path, "w") as target:
+        for line in source:
+            target.write(line)
+            if line == "BOUNDS\n":
+                break
+    os.remove(source_path)
+
+
+def _bound_lines(names, lower, upper, integer):
+    # The bounds of every column in the conventions of PuLP's MPS writer
+    for name, low, up, is_integer in zip(names.tolist(), lower.tolist(), upper.tolist(), integer.tolist()):
+        if low == up:
+            yield " FX BND       %-8s  % .12e\n" % (name, low)
+            continue
+        if low == 0 and up == 1 and is_integer:
+            yield " BV BND       %-8s\n" % name
+            continue
+        if low == -np.inf:
+            yield " MI BND       %-8s\n" % name if up != np.inf else " FR BND       %-8s\n" % name
+        elif low != 0 or (is_integer and up == np.inf):
+            yield " LO BND       %-8s  % .12e\n" % (name, low)
+        if up != np.inf:
+            yield " UP BND       %-8s  % .12e\n" % (name, up)
+
+
+def _with_blocking_choices(base_file, names, choices):
+    """
+    Copies the base model, adding the rows and binary columns of add_blocking_constraints for every
+    (clear_column, clear_offset, latest_clear, departure_column, depart_span, start, end) choice:
+    the segment is cleared before start unless the binary is set, and the departure waits for end if it is.
+    """
+    rows, entries, binaries = [], {}, []
+    for k, (clear, offset, latest_clear, departure, span, start, end) in enumerate(choices):
+        binary = "Y%07d" % k
+        clear_row, departure_row = "B%07d" % (2 * k), "B%07d" % (2 * k + 1)
+        rows += [(" L  %s\n" % clear_row, clear_row, start - offset), (" G  %s\n" % departure_row, departure_row, end - span)]
+        entries.setdefault(str(names[clear]), []).append((clear_row, 1.0))
+        entries.setdefault(str(names[departure]), []).append((departure_row, 1.0))
+        binaries.append((binary, [(clear_row, -(latest_clear - start)), (departure_row, -span)]))
+
+    section, column = None, None
+    for line in base_file:
+        fields = line.split()
+        if not line.startswith(" "):
+            if section == "ROWS":
+                yield from (row_line for row_line, _, _ in rows)
+            elif section == "COLUMNS":
+                if column is not None:
+                    yield from _column_lines(column, entries.pop(column, []))
+                for name, column_entries in entries.items():
+                    yield from _column_lines(name, column_entries)
+                yield "    MARK      'MARKER'                 'INTORG'\n"
+                for name, column_entries in binaries:
+                    yield from _column_lines(name, column_entries)
+                yield "    MARK      'MARKER'                 'INTEND'\n"
+            elif section == "RHS":
+                yield from ("    RHS       %-8s  % .12e\n" % (row, rhs) for _, row, rhs in rows)
+            section = fields[0] if fields else None
+        elif section == "COLUMNS" and fields[0] != column:
+            if column is not None:
+                yield from _column_lines(column, entries.pop(column, []))
+            column = None if fields[0] == "MARK" else fields[0]
+        yield line
+        if line == "BOUNDS\n":
+            yield from (" BV BND       %-8s\n" % name for name, _ in binaries)
+
+
+def _column_lines(name, column_entries):
+    return ["    %-8s  %-8s  % .12e\n" % (name, row, value) for row, value in column_entries]
+
+
+def _cbc_options(solver_config):
+    options = []
+    if solver_config.time_limit is not None:
+        options += ["-sec", str(solver_config.time_limit), "-timeMode", "elapsed"]
+    if solver_config.mip_gap is not None:
+        options += ["-ratio", str(solver_config.mip_gap)]
+    if solver_config.threads is not None:
+        options += ["-threads", str(solver_config.threads)]
+    return options
+
+
+def _read_solution(solution_path, names):
+    """
+    Parses a CBC solution file. Returns the status name, the solution status (both as in
+    solve_with_stats), the objective and the column values (None without a solution); columns CBC
+    leaves out are zero. A solve stopped on a limit with a solution is "Not Solved" with "Solution
+    Found", as PuLP reports it, not "Optimal".
+    """
+    if not os.path.exists(solution_path):
+        return "Not Solved", pulp.LpSolution[pulp.LpSolutionNoSolutionFound], None, None
+    with open(solution_path) as solution_file:
+        header = solution_file.readline().split()
+        status = _CBC_STATUS.get(header[0] if header else "", "Undefined")
+        if status == "Optimal":
+            solution_status = pulp.LpSolutionOptimal
+        elif status == "Not Solved" and len(header) >= 5 and header[4] == "objective":
+            solution_status = pulp.LpSolutionIntegerFeasible
+        else:
+            return status, pulp.LpSolution[pulp.LpSolutionNoSolutionFound], None, None
+
+        column = {name: k for k, name in enumerate(names.tolist())}
+        values = np.zeros(len(names))
+        for line in solution_file:
+            fields = line.split()
+            if fields and fields[0] == "**":
+                fields = fields[1:]
+            if len(fields) >= 3 and fields[1] in column:
+                values[column[fields[1]]] = float(fields[2])
+    return status, pulp.LpSolution[solution_status], float(header[-1]), values.tolist()
+
+
+def _row_of(timetable, train, station):
+    rows = np.flatnonzero((timetable.train_ids == timetable.trains.index(train)) & (timetable.station_ids == timetable.stations.index(station)))
+    if not len(rows):
+        raise KeyError((train, station))
+    return rows[0]
+
+
+def _json_times(column):
+    return [None if time != time else time for time in column.tolist()]
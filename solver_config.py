@@ -0,0 +1,165 @@
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+
+import pulp
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> PuLP solver class name, in order of preference
+BACKENDS = {
+    "cbc": "PULP_CBC_CMD",
+    "highs": "HiGHS",
+    "highs_cmd": "HiGHS_CMD",
+    "glpk": "GLPK_CMD",
+}
+
+
+@dataclass
+class SolverConfig:
+    """
+    Solver backend and limits for a solve.
+
+    Parameters:
+        backend: One of BACKENDS; see available_backends() for the ones installed here.
+        threads: Number of solver threads (None for the solver default).
+        time_limit: Wall time limit in seconds. The best solution found so far is returned when it is hit.
+        mip_gap: Relative MIP gap at which the solver may stop with a near-optimal solution.
+        warm_start: Start from the current variable values, for backends that support it.
+        msg: Show the solver's own console log.
+    """
+    backend: str = "cbc"
+    threads: int = None
+    time_limit: float = None
+    mip_gap: float = None
+    warm_start: bool = False
+    msg: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def available_backends():
+    """
+    Returns the configured backends whose solver is installed locally.
+    """
+    installed = set(pulp.listSolvers(onlyAvailable=True))
+    return [backend for backend, solver_name in BACKENDS.items() if solver_name in installed]
+
+
+def make_solver(config, log_path=None):
+    """
+    Creates the PuLP solver command for a SolverConfig. Raises ValueError for a backend that is
+    unknown or not installed here.
+    """
+    if config.backend not in BACKENDS:
+        raise ValueError(f"Unknown solver backend: {config.backend}")
+
+    if config.backend == "cbc":
+        solver = pulp.PULP_CBC_CMD(msg=config.msg, threads=config.threads, timeLimit=config.time_limit,
+                                   gapRel=config.mip_gap, warmStart=config.warm_start, logPath=log_path)
+    elif config.backend == "highs":
+        solver = pulp.HiGHS(msg=config.msg, threads=config.threads, timeLimit=config.time_limit, gapRel=config.mip_gap)
+    elif config.backend == "highs_cmd":
+        solver = pulp.HiGHS_CMD(msg=config.msg, threads=config.threads, timeLimit=config.time_limit,
+                                gapRel=config.mip_gap, warmStart=config.warm_start, logPath=log_path)
+    else:
+        options = []
+        if config.mip_gap is not None:
+            options += ["--mipgap", str(config.mip_gap)]
+        if config.threads is not None or config.warm_start:
+            logger.debug("GLPK ignores the thread count and warm start settings")
+        solver = pulp.GLPK_CMD(msg=config.msg, timeLimit=config.time_limit, options=options)
+
+    if not solver.available():
+        raise ValueError(f"Solver backend {config.backend} is not installed; available: {', '.join(available_backends())}")
+    return solver
+
+
+def solve_with_stats(solver, config=None):
+    """
+    Solves an LpProblem with the configured backend and captures solver statistics.
+
+    Returns:
+        A dict with the status, solution status, objective, best bound, relative gap,
+        node count and wall time. Statistics a backend does not report are None.
+    """
+    config = config or SolverConfig()
+    log_file, log_path = tempfile.mkstemp(suffix=".log")
+    os.close(log_file)
+
+    try:
+        started = time.perf_counter()
+        status = solver.solve(make_solver(config, log_path=log_path))
+        wall_time = time.perf_counter() - started
+
+        with open(log_path) as log:
+            log_text = log.read()
+    finally:
+        os.remove(log_path)
+
+    stats = {
+        "backend": config.backend,
+        "status": pulp.LpStatus[status],
+        "solution_status": pulp.LpSolution[solver.sol_status],
+        "objective": pulp.value(solver.objective) if solver.sol_status in _SOLUTION_FOUND else None,
+        "best_bound": None,
+        "gap": None,
+        "nodes": None,
+        "wall_time": wall_time,
+    }
+
+    if config.backend == "cbc":
+        stats.update(_parse_cbc_log(log_text))
+    elif config.backend == "highs":
+        stats.update(_highs_info(solver))
+
+    if stats["best_bound"] is None and stats["solution_status"] == "Optimal Solution Found":
+        stats["best_bound"] = stats["objective"]
+    if stats["gap"] is None and stats["objective"] is not None and stats["best_bound"] is not None:
+        stats["gap"] = abs(stats["objective"] - stats["best_bound"]) / max(abs(stats["objective"]), 1e-9)
+
+    logger.info("Solved with %s in %.3fs: %s (objective %s, gap %s, nodes %s)", config.backend, wall_time,
+                stats["solution_status"], stats["objective"], stats["gap"], stats["nodes"])
+    return stats
+
+
+_SOLUTION_FOUND = (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+
+
+def has_solution(solver_stats):
+    """
+    Returns whether a solve left a solution to use: an optimal one, or the best one found before a
+    time or gap limit stopped it (status "Not Solved" with solution status "Solution Found").
+    """
+    return solver_stats.get("solution_status") in [pulp.LpSolution[status] for status in _SOLUTION_FOUND]
+
+_CBC_PATTERNS = {
+    "best_bound": re.compile(r"^Lower bound:\s+(\S+)", re.MULTILINE),
+    "gap": re.compile(r"^Gap:\s+(\S+)", re.MULTILINE),
+    "nodes": re.compile(r"^Enumerated nodes:\s+(\d+)", re.MULTILINE),
+}
+
+
+def _parse_cbc_log(log_text):
+    stats = {}
+    for key, pattern in _CBC_PATTERNS.items():
+        match = pattern.search(log_text)
+        if match:
+            stats[key] = int(match.group(1)) if key == "nodes" else float(match.group(1))
+    return stats
+
+
+def _highs_info(solver):
+    model = getattr(solver, "solverModel", None)
+    if model is None:
+        return {}
+    info = model.getInfo()
+    return {
+        "best_bound": info.mip_dual_bound,
+        "gap": info.mip_gap,
+        "nodes": info.mip_node_count,
+    }
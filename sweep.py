@@ -0,0 +1,102 @@
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pulp
+
+from analysis import analyze_solution
+from scenario import build_scenario_model
+from solver_config import SolverConfig, has_solution, solve_with_stats
+
+logger = logging.getLogger(__name__)
+
+# Base network shared by every scenario of a batch, set once per worker process
+_base = {}
+
+
+def run_scenario_batch(scenarios, output_path, working_timetable, valid_segments, platform_capacity, max_workers=None):
+    """
+    Builds and solves a batch of what-if scenarios across a process pool.
+
+    Each scenario spec is a dict with a "name", "blocked_section" (None for no blockage),
+    "blockage_start", "blockage_end" and optional "delays" ([train, station, delay] triples),
+    "pair_window", "platform_formulation" and "solver" (SolverConfig fields).
+    The base timetable is sent to each worker once when it starts, so tasks only carry their spec.
+    One JSON line per scenario is appended to output_path as soon as that scenario finishes. A
+    scenario that fails gets a line with status "Error" and the "error", and the batch goes on.
+
+    Returns:
+        The list of per-scenario results, in completion order.
+    """
+    results = []
+    with open(output_path, "a") as output, ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(working_timetable, valid_segments, platform_capacity),
+    ) as executor:
+        futures = {executor.submit(_solve_scenario, scenario): scenario for scenario in scenarios}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                logger.warning("Scenario %s failed: %r", futures[future].get("name"), error)
+                result = {"name": futures[future].get("name"), "status": "Error", "error": f"{type(error).__name__}: {error}"}
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            results.append(result)
+    return results
+
+
+def _init_worker(working_timetable, valid_segments, platform_capacity):
+    _base["working_timetable"] = working_timetable
+    _base["valid_segments"] = valid_segments
+    _base["platform_capacity"] = platform_capacity
+
+
+def _solve_scenario(scenario):
+    working_timetable = _base["working_timetable"]
+    delays = [tuple(delay) for delay in scenario.get("delays", [])]
+
+    started = time.perf_counter()
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        working_timetable,
+        tuple(scenario["blocked_section"]) if scenario.get("blocked_section") is not None else None,
+        scenario.get("blockage_start"),
+        scenario.get("blockage_end"),
+        _base["valid_segments"],
+        _base["platform_capacity"],
+        delays=delays,
+        pair_window=scenario.get("pair_window"),
+        platform_formulation=scenario.get("platform_formulation", "big_m"),
+    )
+    build_time = time.perf_counter() - started
+
+    solver_stats = solve_with_stats(solver, SolverConfig(**scenario.get("solver", {})))
+    status = solver_stats["status"]
+
+    total_delay = None
+    if has_solution(solver_stats):
+        optimized_timetable = analyze_solution(working_timetable, arrival_vars, departure_vars)
+        total_delay = sum(entry["arrival_delay"] + entry["departure_delay"] for entry in optimized_timetable)
+
+    return {
+        "name": scenario.get("name"),
+        "status": status,
+        "objective": pulp.value(solver.objective),
+        "total_delay": total_delay,
+        "build_time": build_time,
+        "solve_time": solver_stats["wall_time"],
+        "solver_stats": solver_stats,
+    }
+
+
+if __name__ == "__main__":
+    from data import working_timetable, valid_segments, platform_capacity
+
+    # Usage: python sweep.py scenarios.jsonl results.jsonl [max_workers]
+    with open(sys.argv[1]) as scenario_file:
+        scenarios = [json.loads(line) for line in scenario_file if line.strip()]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    run_scenario_batch(scenarios, sys.argv[2], working_timetable, valid_segments, platform_capacity, max_workers=workers)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from analysis import analyze_solution, delay_statistics, extract_solution, platform_occupancy
+from timetable import Timetable
+
+
+RECORDS = [
+    {"train": "T1", "station": "A", "arrival": None, "departure": 0},
+    {"train": "T1", "station": "B", "arrival": 15, "departure": 19},
+    {"train": "T2", "station": "A", "arrival": None, "departure": 10},
+    {"train": "T2", "station": "B", "arrival": 25, "departure": 30},
+    {"train": "T3", "station": "B", "arrival": 17, "departure": 40},
+]
+
+
+def test_extract_keeps_planned_times_for_events_without_variables():
+    timetable = Timetable.from_records(RECORDS)
+
+    new_arrival, new_departure = extract_solution(timetable, {("T2", "B"): 27.0}, {("T1", "B"): 21.0, ("T2", "B"): 32.0})
+
+    assert np.isnan(new_arrival[0]) and new_arrival[1] == 15 and new_arrival[3] == 27
+    assert new_departure.tolist() == [0, 21, 10, 32, 40]
+
+
+def test_extract_maps_values_by_key_when_any_key_is_out_of_order():
+    timetable = Timetable.from_records({"train": f"T{k}", "station": "A", "arrival": None, "departure": k} for k in range(5000))
+    keys = [(f"T{k}", "A") for k in range(5000)]
+    keys[2501], keys[2502] = keys[2502], keys[2501]
+
+    _, new_departure = extract_solution(timetable, {}, {key: float(key[0][1:]) + 1 for key in keys})
+
+    assert new_departure.tolist() == [k + 1 for k in range(5000)]
+
+
+def test_analyze_solution_matches_delay_statistics():
+    timetable = Timetable.from_records(RECORDS)
+    arrival_vars = {("T1", "B"): 15.0, ("T2", "B"): 27.0, ("T3", "B"): 17.0}
+    departure_vars = {("T1", "A"): 0.0, ("T1", "B"): 21.0, ("T2", "A"): 8.0, ("T2", "B"): 32.0, ("T3", "B"): 40.0}
+
+    optimized_timetable = analyze_solution(timetable, arrival_vars, departure_vars)
+    statistics = delay_statistics(timetable, *extract_solution(timetable, arrival_vars, departure_vars))
+
+    assert optimized_timetable[3]["new_arrival"] == 27 and optimized_timetable[3]["arrival_delay"] == 2
+    assert optimized_timetable[2]["departure_delay"] == 0
+    assert statistics["total_delay"] == sum(entry["arrival_delay"] + entry["departure_delay"] for entry in optimized_timetable) == 6
+    assert statistics["by_train"] == {"T1": 2, "T2": 4, "T3": 0}
+    assert statistics["max_delay"] == 2 and statistics["delayed_events"] == 3
+
+
+def test_occupancy_sweep_finds_peak_and_overruns():
+    timetable = Timetable.from_records(RECORDS)
+
+    occupancy = platform_occupancy(timetable, timetable.arrival, timetable.departure, {"A": 2, "B": 1})
+
+    # B holds T1 [15, 19], T3 [17, 40] and T2 [25, 30]
+    assert occupancy["A"]["peak"] == 0
+    assert occupancy["B"]["peak"] == 2
+    assert occupancy["B"]["exceeded"] == [(17.0, 19.0), (25.0, 30.0)]
+    assert occupancy["B"]["occupied_time"] == 4 + 23 + 5
+    assert abs(occupancy["B"]["utilisation"] - 32 / 25) < 1e-9
@@ -0,0 +1,59 @@
+import pulp
+
+from analysis import analyze_solution
+from constraints import blocked_departures
+from data import working_timetable, valid_segments, platform_capacity
+from scenario import build_scenario_model
+from timetable_index import blockage_windows, build_blockage_index, build_timetable_index
+from verifier import is_feasible, verify_timetable
+
+
+def _corridor():
+    return [
+        {"train": "T1", "station": "S0", "arrival": None, "departure": 0},
+        {"train": "T1", "station": "S1", "arrival": 10, "departure": 12},
+        {"train": "T1", "station": "S2", "arrival": 22, "departure": None},
+    ]
+
+
+def test_blockage_index_merges_overlapping_windows_per_segment():
+    blockage_index = build_blockage_index([(("A", "B"), 10, 20), (("A", "B"), 15, 30), (("A", "B"), 50, 60), (("B", "C"), 0, 5)])
+
+    assert blockage_index[("A", "B")] == ([10, 50], [30, 60])
+    assert list(blockage_windows(blockage_index, ("A", "B"), 25, 55)) == [(10, 30), (50, 60)]
+    assert list(blockage_windows(blockage_index, ("A", "B"), 31, 49)) == []
+    assert list(blockage_windows(blockage_index, ("C", "D"), 0, 100)) == []
+
+
+def test_train_clears_a_blocked_segment_before_the_window():
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        _corridor(), None, None, None, [], {}, max_delay=120, blockages=[(("S1", "S2"), 25, 60), (("S0", "S1"), 30, 40)])
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+    assert pulp.LpStatus[solver.status] == "Optimal"
+    assert departure_vars[("T1", "S1")].varValue == 12
+    assert arrival_vars[("T1", "S2")].varValue == 22
+
+
+def test_delayed_train_waits_for_the_window_it_can_no_longer_clear():
+    solver, _, departure_vars = build_scenario_model(
+        _corridor(), None, None, None, [], {}, delays=[("T1", "S0", 5)], max_delay=120, blockages=[(("S1", "S2"), 25, 60)])
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+    assert pulp.LpStatus[solver.status] == "Optimal"
+    assert departure_vars[("T1", "S1")].varValue == 60
+
+
+def test_unbounded_departure_is_held_for_a_window_it_runs_into():
+    # T1 is planned to leave B at 19, before the window, but to arrive at C at 34, inside it
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        working_timetable, ("B", "C"), 25, 55, valid_segments, platform_capacity, delays=[("T3", "C", 50)])
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+    assert pulp.LpStatus[solver.status] == "Optimal"
+    assert departure_vars[("T1", "B")].varValue == 55
+    assert ("T1", "B") in set(blocked_departures(build_timetable_index(working_timetable), ("B", "C"), 25, 55))
+    violations = verify_timetable(analyze_solution(working_timetable, arrival_vars, departure_vars), valid_segments=valid_segments,
+                                  platform_capacity=platform_capacity, blocked_section=("B", "C"), blockage_start=25,
+                                  blockage_end=55)
+    assert is_feasible(violations)
@@ -0,0 +1,31 @@
+import pulp
+
+from decomposition import partition_network, solve_decomposed
+from scenario import build_scenario_model
+
+
+def test_partition_splits_the_lines_at_the_junction(scenario_args):
+    args, _ = scenario_args(0, num_stations=9, num_lines=3)
+    partition = partition_network(args[0])
+
+    assert partition["junctions"] == ["J"]
+    assert len(partition["stations"]) == 6
+    assert all("J" not in stations for stations in partition["stations"])
+
+
+def test_decomposed_times_are_feasible_and_match_the_full_model(scenario_args):
+    # Seed 1 needs sub-networks merged after they cannot meet the settled junction times
+    for seed in (0, 1):
+        args, delays = scenario_args(seed, num_stations=9, num_lines=3)
+        result = solve_decomposed(*args, delays=delays, platform_formulation="interval", max_workers=2)
+
+        solver, arrival_vars, departure_vars = build_scenario_model(*args, delays=delays, platform_formulation="interval")
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+        assert result["status"] == pulp.LpStatus[solver.status] == "Optimal"
+        assert abs(result["objective"] - pulp.value(solver.objective)) < 1e-6
+
+        for variables, times in ((arrival_vars, result["arrival_times"]), (departure_vars, result["departure_times"])):
+            for key, variable in variables.items():
+                variable.lowBound = variable.upBound = times[key]
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+        assert pulp.LpStatus[solver.status] == "Optimal"
@@ -0,0 +1,56 @@
+import pulp
+
+import dispatcher
+from dispatcher import dispatch_timetable, solve_with_fallback
+from scenario import build_scenario_model
+from solver_config import SolverConfig
+
+
+def test_dispatched_plan_satisfies_the_model(scenario_args):
+    for seed in range(2):
+        args, delays = scenario_args(seed)
+        plan = dispatch_timetable(*args, delays=delays)
+        assert plan["feasible"] and not plan["conflicts"]
+
+        solver, arrival_vars, departure_vars = build_scenario_model(*args, delays=delays, platform_formulation="interval")
+        optimum = solver.copy()
+        optimum.solve(pulp.PULP_CBC_CMD(msg=False))
+
+        for variables, times in ((arrival_vars, plan["arrival_times"]), (departure_vars, plan["departure_times"])):
+            for key, variable in variables.items():
+                variable.lowBound = variable.upBound = times[key]
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+        assert pulp.LpStatus[solver.status] == "Optimal"
+        assert abs(pulp.value(solver.objective) - plan["objective"]) < 1e-6
+        assert plan["objective"] >= pulp.value(optimum.objective) - 1e-6
+
+
+def test_departure_delayed_into_a_blockage_is_held():
+    corridor = [
+        {"train": "T1", "station": "S0", "arrival": None, "departure": 0},
+        {"train": "T1", "station": "S1", "arrival": 10, "departure": 12},
+        {"train": "T1", "station": "S2", "arrival": 22, "departure": None},
+    ]
+    plan = dispatch_timetable(corridor, ("S1", "S2"), 25, 60, [], {}, delays=[("T1", "S0", 5)])
+
+    assert plan["feasible"] and not plan["conflicts"]
+    assert plan["departure_times"][("T1", "S1")] == 60 and plan["arrival_times"][("T1", "S2")] == 70
+
+
+def test_fallback_keeps_the_callers_warm_start_setting(monkeypatch, scenario_args):
+    args, delays = scenario_args(0)
+    plan = dispatch_timetable(*args, delays=delays)
+    solver, arrival_vars, departure_vars = build_scenario_model(*args, delays=delays, platform_formulation="interval")
+    configs = []
+
+    def solve_with_stats(solver, config):
+        configs.append(config)
+        return {"status": "Optimal", "objective": 0}
+
+    monkeypatch.setattr(dispatcher, "solve_with_stats", solve_with_stats)
+
+    solve_with_fallback(solver, arrival_vars, departure_vars, plan, SolverConfig(warm_start=False))
+    solve_with_fallback(solver, arrival_vars, departure_vars, plan, SolverConfig(warm_start=True))
+
+    assert plan["feasible"] and [config.warm_start for config in configs] == [False, True]
@@ -0,0 +1,17 @@
+import pulp
+
+from lazy_constraints import solve_lazy
+from scenario import build_scenario_model
+
+
+def test_lazy_loop_reaches_the_full_model_optimum(scenario_args):
+    for seed in range(2):
+        args, delays = scenario_args(seed)
+        solver, _, _ = build_scenario_model(*args, delays=delays, platform_formulation="interval")
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+        result = solve_lazy(*args, delays=delays, platform_formulation="interval")
+
+        assert result["status"] == pulp.LpStatus[solver.status] == "Optimal"
+        assert result["constraints"] < solver.numConstraints()
+        assert abs(pulp.value(result["solver"].objective) - pulp.value(solver.objective)) < 1e-6
@@ -0,0 +1,20 @@
+import dispatcher
+import main
+from solver_config import SolverConfig
+
+
+def test_time_limited_incumbent_is_reported(monkeypatch):
+    solve_with_stats = dispatcher.solve_with_stats
+
+    def stopped_on_time_limit(solver, config):
+        # CBC stopped by --time-limit with an incumbent: "Not Solved", solution status IntegerFeasible
+        return dict(solve_with_stats(solver, config), status="Not Solved", solution_status="Solution Found")
+
+    monkeypatch.setattr(dispatcher, "solve_with_stats", stopped_on_time_limit)
+    monkeypatch.setattr(main, "plot_comparison", lambda *args, **kwargs: None)
+
+    result = main.main(solver_config=SolverConfig(time_limit=10))
+
+    assert result["status"] == "Not Solved" and result["optimized_timetable"] is not None
+    total_delay = sum(entry["arrival_delay"] + entry["departure_delay"] for entry in result["optimized_timetable"])
+    assert abs(total_delay - result["solver_stats"]["objective"]) < 1e-6
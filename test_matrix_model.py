@@ -0,0 +1,29 @@
+import pulp
+
+from matrix_model import build_matrix_model, solve_matrix_model
+from scenario import build_scenario_model, total_deviation
+
+
+def test_matrix_model_matches_pulp_objective(scenario_args):
+    for seed in range(3):
+        args, delays = scenario_args(seed, num_trains=20)
+        solver, _, _ = build_scenario_model(*args, delays=delays, platform_formulation="interval", max_early=0, max_delay=180)
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+        result = solve_matrix_model(build_matrix_model(*args, delays=delays, platform_formulation="interval",
+                                                       max_early=0, max_delay=180))
+
+        assert result["status"] == pulp.LpStatus[solver.status] == "Optimal"
+        assert abs(result["objective"] - pulp.value(solver.objective)) < 1e-6
+
+
+def test_solution_is_keyed_like_the_pulp_variables(scenario_args):
+    args, delays = scenario_args(0, num_trains=20)
+    working_timetable = args[0]
+
+    result = solve_matrix_model(build_matrix_model(*args, delays=delays, platform_formulation="interval",
+                                                   max_early=0, max_delay=180))
+
+    assert len(result["arrival_times"]) == sum(entry["arrival"] is not None for entry in working_timetable)
+    assert len(result["departure_times"]) == sum(entry["departure"] is not None for entry in working_timetable)
+    assert abs(total_deviation(working_timetable, result["arrival_times"], result["departure_times"]) - result["objective"]) < 1e-6
@@ -0,0 +1,38 @@
+import pulp
+
+from data import working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity
+from scenario import build_scenario_model
+
+
+def _solve(**options):
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity,
+        delays=[("T3", "C", 50)], **options)
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+    assert pulp.LpStatus[solver.status] == "Optimal"
+    return solver, arrival_vars, departure_vars
+
+
+def test_lateness_mode_matches_symmetric_with_a_smaller_model():
+    symmetric, _, _ = _solve()
+    lateness, _, _ = _solve(objective_mode="lateness")
+
+    assert abs(pulp.value(lateness.objective) - pulp.value(symmetric.objective)) < 1e-6
+    assert lateness.numConstraints() < symmetric.numConstraints()
+    assert lateness.numVariables() < symmetric.numVariables()
+
+
+def test_weights_scale_each_event_lateness():
+    weights = {"train_weights": {"T3": 3}, "station_weights": {"E": 2}, "departure_weight": 0.5}
+    solver, arrival_vars, departure_vars = _solve(objective_mode="lateness", weights=weights)
+
+    expected = 0
+    for entry in working_timetable:
+        key = (entry["train"], entry["station"])
+        scale = weights["train_weights"].get(entry["train"], 1) * weights["station_weights"].get(entry["station"], 1)
+        if entry["arrival"] is not None:
+            assert arrival_vars[key].varValue >= entry["arrival"] - 1e-6
+            expected += scale * (arrival_vars[key].varValue - entry["arrival"])
+        if entry["departure"] is not None:
+            expected += 0.5 * scale * (departure_vars[key].varValue - entry["departure"])
+    assert abs(pulp.value(solver.objective) - expected) < 1e-6
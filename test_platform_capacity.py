@@ -0,0 +1,30 @@
+import pulp
+
+from scenario import build_scenario_model
+
+# T2 is planned to arrive at B while T1 is still at its platform
+TIMETABLE = [
+    {"train": "T1", "station": "A", "arrival": None, "departure": 0},
+    {"train": "T1", "station": "B", "arrival": 10, "departure": 20},
+    {"train": "T2", "station": "A", "arrival": None, "departure": 5},
+    {"train": "T2", "station": "B", "arrival": 15, "departure": 25},
+]
+
+
+def _solve(capacity, platform_formulation):
+    solver, arrival_vars, departure_vars = build_scenario_model(
+        TIMETABLE, None, None, None, [], {"B": capacity}, platform_formulation=platform_formulation, max_early=0, max_delay=60)
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+    assert pulp.LpStatus[solver.status] == "Optimal"
+    return pulp.value(solver.objective), arrival_vars, departure_vars
+
+
+def test_interval_formulation_serializes_a_single_platform():
+    objective, arrival_vars, departure_vars = _solve(1, "interval")
+
+    assert arrival_vars[("T2", "B")].varValue >= departure_vars[("T1", "B")].varValue
+    assert objective == 5
+
+
+def test_interval_formulation_lets_trains_share_a_station_with_room():
+    assert _solve(2, "interval")[0] == 0
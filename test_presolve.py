@@ -0,0 +1,31 @@
+import pulp
+
+from presolve import build_presolved_model, presolve_disruption
+from scenario import build_scenario_model
+
+
+def test_unreached_trains_are_fixed_at_their_plan(scenario_args):
+    args, delays = scenario_args(0)
+    working_timetable = args[0]
+
+    presolved = presolve_disruption(*args, delays=delays)
+
+    affected = set(presolved["affected_trains"])
+    assert affected and len(affected) < len(working_timetable.trains)
+    for entry in working_timetable:
+        if entry["train"] not in affected and entry["departure"] is not None:
+            assert presolved["departure_bounds"][(entry["train"], entry["station"])] == (entry["departure"], entry["departure"])
+
+
+def test_presolved_model_keeps_the_optimum(scenario_args):
+    for seed in range(2):
+        args, delays = scenario_args(seed)
+        solver, _, _ = build_scenario_model(*args, delays=delays, platform_formulation="interval")
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+        reduced, _, _, _ = build_presolved_model(*args, delays=delays, platform_formulation="interval")
+        reduced.solve(pulp.PULP_CBC_CMD(msg=False))
+
+        assert pulp.LpStatus[reduced.status] == pulp.LpStatus[solver.status] == "Optimal"
+        assert reduced.numVariables() < solver.numVariables()
+        assert abs(pulp.value(reduced.objective) - pulp.value(solver.objective)) < 1e-6
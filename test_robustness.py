@@ -0,0 +1,36 @@
+import numpy as np
+
+from robustness import DelayDistribution, compare_robustness, evaluate_robustness
+
+working_timetable = [
+    {"train": "T1", "station": "A", "arrival": None, "departure": 0},
+    {"train": "T1", "station": "B", "arrival": 10, "departure": 12},
+    {"train": "T1", "station": "C", "arrival": 22, "departure": None},
+    {"train": "T2", "station": "A", "arrival": None, "departure": 5},
+    {"train": "T2", "station": "B", "arrival": 15, "departure": 17},
+    {"train": "T2", "station": "C", "arrival": 27, "departure": None},
+]
+
+
+def test_no_delays_keep_the_timetable_punctual():
+    result = evaluate_robustness(working_timetable, num_samples=50, distribution=DelayDistribution(probability=0),
+                                 batch_size=20)
+    assert len(result["total_delay"]) == 50
+    assert not result["total_delay"].any() and not result["knock_on_delay"].any()
+    assert result["summary"]["punctuality"]["mean"] == 1
+
+
+def test_samples_are_reproducible_and_knock_on_delay_is_counted():
+    options = dict(platform_capacity={"B": 1}, num_samples=400, batch_size=100,
+                   punctuality_station="C", seed=7, station_distributions={"A": DelayDistribution(probability=1, mean=5)})
+    serial = evaluate_robustness(working_timetable, **options)
+    parallel = evaluate_robustness(working_timetable, max_workers=2, **options)
+    for metric in ("total_delay", "knock_on_delay", "punctuality"):
+        assert np.array_equal(serial[metric], parallel[metric])
+
+    # Headway of 5 minutes with no slack: any delay of T1 leaving A reaches T2
+    assert (serial["knock_on_delay"] >= 0).all() and serial["summary"]["knock_on_delay"]["mean"] > 0
+
+    compared = compare_robustness(working_timetable, [entry["arrival"] for entry in working_timetable],
+                                  [entry["departure"] for entry in working_timetable], **options)
+    assert np.array_equal(compared["original"]["total_delay"], serial["total_delay"])
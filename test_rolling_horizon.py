@@ -0,0 +1,54 @@
+import pytest
+
+from analysis import analyze_solution
+from data import working_timetable, valid_segments, platform_capacity
+from rolling_horizon import compare_with_monolithic, release_time, solve_rolling_horizon
+from verifier import is_feasible, verify_timetable
+
+SCENARIO = (working_timetable, ("B", "C"), 10, 55, valid_segments, platform_capacity)
+
+
+def _is_feasible(result):
+    optimized = analyze_solution(working_timetable, result["arrival_times"], result["departure_times"])
+    return is_feasible(verify_timetable(optimized, valid_segments=valid_segments, platform_capacity=platform_capacity,
+                                        blocked_section=("B", "C"), blockage_start=10, blockage_end=55))
+
+
+def test_windows_start_at_the_disruption_and_advance_by_the_step():
+    result = solve_rolling_horizon(*SCENARIO, delays=[("T3", "C", 50)], window_length=60, overlap=15)
+    releases = sorted(release_time(entry) for entry in working_timetable)
+
+    assert [window["start"] for window in result["windows"]] == [10, 55, 100, 145, 190]
+    for window in result["windows"]:
+        assert window["end"] == window["start"] + 60
+        assert window["free_events"] == sum(window["start"] <= release < window["end"] for release in releases)
+        assert window["fixed_events"] == sum(window["start"] - 60 <= release < window["start"] for release in releases)
+
+    for entry in working_timetable:
+        if release_time(entry) < 10:
+            key = (entry["train"], entry["station"])
+            assert result["departure_times"].get(key) == entry["departure"]
+            assert result["arrival_times"].get(key) == entry["arrival"]
+
+
+def test_first_window_starts_at_an_earlier_delay():
+    # T2 departs B at the end of the first window; its run to C must still wait for T1
+    result = solve_rolling_horizon(*SCENARIO, delays=[("T1", "A", 5)])
+
+    assert result["windows"][0]["start"] == 0
+    assert result["status"] == "Optimal" and _is_feasible(result)
+
+
+def test_rolling_horizon_matches_the_monolithic_optimum_and_is_feasible():
+    comparison = compare_with_monolithic(*SCENARIO, delays=[("T3", "C", 50)])
+    result = solve_rolling_horizon(*SCENARIO, delays=[("T3", "C", 50)])
+
+    assert comparison["rolling_objective"] >= comparison["monolithic_objective"]
+    assert comparison["gap"] == 0
+    assert result["objective"] == 533
+    assert _is_feasible(result)
+
+
+def test_overlap_must_be_shorter_than_the_window():
+    with pytest.raises(ValueError):
+        solve_rolling_horizon(*SCENARIO, window_length=30, overlap=30)
@@ -0,0 +1,62 @@
+import os
+
+from data import original_timetable, working_timetable, valid_segments, platform_capacity
+from scenario_cache import ScenarioCache, scenario_fingerprint, solve_cached
+
+
+def test_fingerprint_covers_timetable_and_parameters():
+    base = scenario_fingerprint(working_timetable, blocked_section=("B", "C"), delays=[("T3", "C", 50)])
+
+    assert scenario_fingerprint(original_timetable, blocked_section=("B", "C"), delays=[("T3", "C", 50)]) == base
+    assert scenario_fingerprint(working_timetable, blocked_section=("B", "C"), delays=[("T3", "C", 51)]) != base
+    assert scenario_fingerprint(original_timetable[:-1], blocked_section=("B", "C"), delays=[("T3", "C", 50)]) != base
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ScenarioCache(max_entries=2)
+    cache.put("a", {"status": "Optimal"})
+    cache.put("b", {"status": "Optimal"})
+    cache.get("a")
+    cache.put("c", {"status": "Optimal"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_disk_tier_survives_restart_and_evicts_by_size(tmp_path):
+    cache = ScenarioCache(directory=str(tmp_path), max_disk_bytes=1500)
+    cache.put("old", {"payload": "x" * 1000})
+    os.utime(tmp_path / "old.pkl", (0, 0))
+    cache.put("new", {"payload": "y" * 1000})
+
+    restarted = ScenarioCache(directory=str(tmp_path))
+    assert restarted.get("old") is None
+    assert restarted.get("new") == {"payload": "y" * 1000}
+
+
+def test_hit_skips_the_solve_and_base_session_is_reused():
+    cache = ScenarioCache()
+    scenario = (working_timetable, ("B", "C"), 10, 55, valid_segments, platform_capacity)
+
+    first = solve_cached(cache, *scenario, delays=[("T3", "C", 50)])
+    other = solve_cached(cache, *scenario, delays=[("T3", "C", 20)])
+    again = solve_cached(cache, *scenario, delays=[("T3", "C", 50)])
+
+    assert not first["cached"] and not other["cached"] and again["cached"]
+    assert again["optimized_timetable"] == first["optimized_timetable"]
+    assert other["status"] == "Optimal"
+    assert len(cache._sessions) == 1
+    assert sum(entry["arrival_delay"] + entry["departure_delay"] for entry in first["optimized_timetable"]) == 533
+
+
+def test_objective_is_part_of_the_scenario():
+    cache = ScenarioCache()
+    scenario = (working_timetable, ("B", "C"), 10, 55, valid_segments, platform_capacity)
+    weighted = {"objective_mode": "lateness", "weights": {"train_weights": {"T3": 2}}}
+
+    symmetric = solve_cached(cache, *scenario, delays=[("T3", "C", 50)])
+    lateness = solve_cached(cache, *scenario, delays=[("T3", "C", 50)], **weighted)
+
+    assert not lateness["cached"] and solve_cached(cache, *scenario, delays=[("T3", "C", 50)], **weighted)["cached"]
+    assert symmetric["solver_stats"]["objective"] == 533 and lateness["solver_stats"]["objective"] > 533
+    assert len(cache._sessions) == 2
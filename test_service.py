@@ -0,0 +1,29 @@
+import asyncio
+
+from data import working_timetable, valid_segments, platform_capacity
+from service import ReschedulingService
+
+
+async def _burst():
+    service = ReschedulingService(working_timetable, valid_segments, platform_capacity)
+    await service.start()
+    try:
+        responses = await asyncio.gather(
+            service.handle({"type": "blockage", "name": "Blockage", "section": ["B", "C"], "start": 10, "end": 55}),
+            service.handle({"type": "delay", "train": "T3", "station": "C", "delay": 50}),
+            service.handle({"type": "delay", "train": "T9", "station": "C", "delay": 5}),
+        )
+        stats = await service.handle({"type": "stats"})
+    finally:
+        await service.stop()
+    return service, responses, stats
+
+
+def test_burst_is_coalesced_into_one_solve():
+    service, (blockage, delay, unknown), stats = asyncio.run(_burst())
+
+    assert service.solves == 1
+    assert blockage["ok"] and delay["ok"] and blockage["coalesced"] == delay["coalesced"] == 2
+    assert delay["status"] == "Optimal" and abs(delay["total_delay"] - 533) < 1e-6
+    assert not unknown["ok"] and "T9" in unknown["error"]
+    assert stats["latency"]["delay"]["count"] == 2
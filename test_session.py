@@ -0,0 +1,27 @@
+import pulp
+
+from data import working_timetable, valid_segments, platform_capacity
+from scenario import build_scenario_model
+from session import ReschedulingSession
+
+
+def _cold_objective(blocked_section, blockage_start, blockage_end, delays):
+    solver, _, _ = build_scenario_model(working_timetable, blocked_section, blockage_start, blockage_end, valid_segments,
+                                        platform_capacity, delays=delays)
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+    return pulp.value(solver.objective)
+
+
+def test_blockages_added_and_removed_match_a_cold_build():
+    session = ReschedulingSession(working_timetable, valid_segments, platform_capacity)
+    session.set_delay("T3", "C", 50)
+
+    for blockage in ((("B", "C"), 10, 55), (("B", "C"), 25, 55), (("C", "D"), 30, 70)):
+        session.set_blockage("Blockage", *blockage)
+        assert session.solve() == "Optimal"
+        assert abs(pulp.value(session.solver.objective) - _cold_objective(*blockage, [("T3", "C", 50)])) < 1e-6
+
+    session.remove("Blockage")
+    assert session.disruptions() == ["Delay_T3_C"]
+    assert session.solve() == "Optimal"
+    assert abs(pulp.value(session.solver.objective) - _cold_objective(None, None, None, [("T3", "C", 50)])) < 1e-6
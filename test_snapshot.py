@@ -0,0 +1,58 @@
+import numpy as np
+import pulp
+import pytest
+
+from analysis import analyze_solution
+from data import working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity
+from scenario import build_scenario_model
+from snapshot import _read_solution, compile_snapshot, load_snapshot, solve_snapshot
+
+
+def test_snapshot_solves_the_example_scenario(tmp_path):
+    snapshot = compile_snapshot(working_timetable, valid_segments, platform_capacity, str(tmp_path))
+
+    result = solve_snapshot(snapshot, blocked_section, blockage_start, blockage_end, delays=[("T3", "C", 50)])
+
+    assert result["status"] == "Optimal" and abs(result["objective"] - 533) < 1e-6
+    optimized_timetable = analyze_solution(working_timetable, result["arrival_times"], result["departure_times"])
+    assert abs(sum(entry["arrival_delay"] + entry["departure_delay"] for entry in optimized_timetable) - 533) < 1e-6
+    assert solve_snapshot(snapshot, blocked_section, blockage_start, blockage_end, delays=[("T2", "C", 10)])["status"] == "Infeasible"
+
+
+def test_delay_into_a_window_matches_the_cold_build(tmp_path):
+    # T1 is planned to clear S1-S2 before the window; the delay makes it wait for the window to end
+    corridor = [{"train": "T1", "station": "S0", "arrival": None, "departure": 0},
+                {"train": "T1", "station": "S1", "arrival": 10, "departure": 12},
+                {"train": "T1", "station": "S2", "arrival": 22, "departure": None}]
+    scenario = (("S1", "S2"), 25, 60)
+    snapshot = compile_snapshot(corridor, [], {}, str(tmp_path))
+
+    for delays in ([("T1", "S0", 5)], [("T1", "S0", 2)]):
+        solver, _, _ = build_scenario_model(corridor, *scenario, [], {}, delays=delays)
+        solver.solve(pulp.PULP_CBC_CMD(msg=False))
+        result = solve_snapshot(snapshot, *scenario, delays=delays)
+
+        assert result["status"] == pulp.LpStatus[solver.status] == "Optimal"
+        assert abs(result["objective"] - pulp.value(solver.objective)) < 1e-6
+
+
+def test_stale_snapshot_is_rejected(tmp_path):
+    compile_snapshot(working_timetable, valid_segments, platform_capacity, str(tmp_path))
+
+    load_snapshot(str(tmp_path), working_timetable, valid_segments, platform_capacity)
+    with pytest.raises(ValueError):
+        load_snapshot(str(tmp_path), working_timetable, valid_segments, dict(platform_capacity, B=1))
+
+
+def test_solution_stopped_on_a_limit_is_not_reported_optimal(tmp_path):
+    names = np.array(["C0000000", "C0000001"])
+    solution_path = tmp_path / "scenario.sol"
+
+    solution_path.write_text("Stopped on time - objective value 540.00000000\n      0 C0000000   12   0\n")
+    assert _read_solution(str(solution_path), names) == ("Not Solved", "Solution Found", 540.0, [12.0, 0.0])
+
+    solution_path.write_text("Optimal - objective value 533.00000000\n      1 C0000001   7   0\n")
+    assert _read_solution(str(solution_path), names) == ("Optimal", "Optimal Solution Found", 533.0, [0.0, 7.0])
+
+    solution_path.write_text("Infeasible - objective value 0.00000000\n")
+    assert _read_solution(str(solution_path), names)[:2] == ("Infeasible", "No Solution Found")
@@ -0,0 +1,44 @@
+import pulp
+import pytest
+
+from solver_config import SolverConfig, _parse_cbc_log, available_backends, has_solution, make_solver
+
+STOPPED_LOG = """
+Result - Stopped on time limit
+
+Objective value:                540.00000000
+Lower bound:                    512.500
+Gap:                            0.05
+Enumerated nodes:               1234
+Total iterations:               56789
+Time (CPU seconds):             10.01
+"""
+
+
+def test_cbc_log_statistics_are_parsed():
+    assert _parse_cbc_log(STOPPED_LOG) == {"best_bound": 512.5, "gap": 0.05, "nodes": 1234}
+    assert _parse_cbc_log("Result - Optimal solution found\nEnumerated nodes:               0\n") == {"nodes": 0}
+
+
+def test_incumbent_of_a_stopped_solve_is_a_solution():
+    assert has_solution({"status": "Not Solved", "solution_status": "Solution Found"})
+    assert has_solution({"status": "Optimal", "solution_status": "Optimal Solution Found"})
+    assert not has_solution({"status": "Not Solved", "solution_status": "No Solution Found"})
+
+
+def test_make_solver_passes_the_limits_to_cbc():
+    solver = make_solver(SolverConfig(threads=2, time_limit=30, mip_gap=0.01, warm_start=True), log_path="cbc.log")
+
+    assert isinstance(solver, pulp.PULP_CBC_CMD)
+    assert solver.timeLimit == 30
+    assert {key: solver.optionsDict[key] for key in ("threads", "gapRel", "warmStart")} == {"threads": 2, "gapRel": 0.01,
+                                                                                            "warmStart": True}
+    assert "cbc" in available_backends()
+
+
+def test_make_solver_rejects_unknown_and_missing_backends():
+    with pytest.raises(ValueError):
+        make_solver(SolverConfig(backend="gurobi"))
+    for backend in {"highs", "highs_cmd", "glpk"} - set(available_backends()):
+        with pytest.raises(ValueError, match="not installed"):
+            make_solver(SolverConfig(backend=backend))
@@ -0,0 +1,21 @@
+import json
+
+from data import working_timetable, valid_segments, platform_capacity
+from sweep import run_scenario_batch
+
+
+def test_failing_scenario_does_not_abort_the_batch(tmp_path):
+    scenarios = [
+        {"name": "example", "blocked_section": ["B", "C"], "blockage_start": 10, "blockage_end": 55, "delays": [["T3", "C", 50]]},
+        {"name": "unknown_train", "blocked_section": ["B", "C"], "blockage_start": 10, "blockage_end": 55, "delays": [["T9", "C", 5]]},
+        {"name": "no_blockage", "blocked_section": None},
+    ]
+    output_path = tmp_path / "results.jsonl"
+
+    results = run_scenario_batch(scenarios, str(output_path), working_timetable, valid_segments, platform_capacity, max_workers=2)
+
+    lines = {line["name"]: line for line in map(json.loads, output_path.read_text().splitlines())}
+    assert len(results) == len(lines) == 3
+    assert lines["example"]["status"] == "Optimal" and abs(lines["example"]["objective"] - 533) < 1e-6
+    assert lines["unknown_train"]["status"] == "Error" and "T9" in lines["unknown_train"]["error"]
+    assert lines["no_blockage"]["status"] == "Optimal" and lines["no_blockage"]["objective"] == 0
@@ -0,0 +1,37 @@
+import pickle
+
+from timetable import Timetable
+
+
+RECORDS = [
+    {"train": "T1", "station": "A", "arrival": None, "departure": 0},
+    {"train": "T1", "station": "B", "arrival": 15, "departure": 19},
+    {"train": "T2", "station": "A", "arrival": None, "departure": 25},
+    {"train": "T2", "station": "B", "arrival": None, "departure": None},
+]
+
+
+def test_round_trip_keeps_missing_times():
+    timetable = Timetable.from_records(RECORDS)
+
+    assert len(timetable) == 4
+    assert timetable.to_records() == RECORDS
+    assert timetable[3]["arrival"] is None
+    assert timetable.trains == ["T1", "T2"]
+    assert timetable.stations == ["A", "B"]
+
+
+def test_copy_shares_read_only_columns():
+    timetable = Timetable.from_records(RECORDS)
+    working = timetable.copy()
+
+    assert working.arrival is timetable.arrival
+    assert not working.arrival.flags.writeable
+
+
+def test_with_times_exposes_optimized_keys():
+    timetable = Timetable.from_records(RECORDS).with_times([None, 16, None, None], [0, 20, 26, None])
+
+    assert timetable[1].get("new_arrival") == 16
+    assert timetable[3]["new_departure"] is None
+    assert pickle.loads(pickle.dumps(timetable)).to_records() == timetable.to_records()
@@ -0,0 +1,92 @@
+import pulp
+
+from constraints import (
+    add_delay,
+    add_blocking_constraints,
+    add_delays,
+    add_dwell_time_constraints,
+    add_headway_constraints,
+    add_platform_capacity_constraints,
+    add_running_time_constraints,
+    add_single_track_conflict_constraints,
+    headway_pairs,
+    single_track_pairs,
+)
+from data import working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity
+from model import create_model
+from objective import set_objective
+from timetable_index import build_timetable_index
+
+
+def _pairwise_headway(entries):
+    # The original scan: every later-listed train at the same station
+    entries = list(entries)
+    pairs = set()
+    for i, current in enumerate(entries):
+        for next_entry in entries[i + 1:]:
+            if current["station"] == next_entry["station"] and current["train"] != next_entry["train"]:
+                for kind in ("departure", "arrival"):
+                    if current[kind] is not None and next_entry[kind] is not None:
+                        pairs.add((kind.capitalize(), current["station"], current["train"], next_entry["train"]))
+    return pairs
+
+
+def _pairwise_single_track(entries, arrival_vars, departure_vars):
+    # The original scan: a later-listed train enters a segment only after an earlier one has cleared it
+    entries = list(entries)
+    pairs = set()
+    for i, current in enumerate(entries):
+        for next_entry in entries[i + 1:]:
+            segment = (current["station"], next_entry["station"])
+            if (current["train"] != next_entry["train"] and segment in valid_segments
+                    and (next_entry["train"], segment[0]) in departure_vars and (current["train"], segment[1]) in arrival_vars):
+                pairs.add((current["train"], next_entry["train"], segment[0], segment[1]))
+    return pairs
+
+
+def _solve(pairwise):
+    solver, arrival_vars, departure_vars = create_model(working_timetable)
+    index = build_timetable_index(working_timetable)
+    if pairwise:
+        for kind, station, train, next_train in _pairwise_headway(working_timetable):
+            event_vars = departure_vars if kind == "Departure" else arrival_vars
+            solver += event_vars[(next_train, station)] - event_vars[(train, station)] >= 5
+        for current_train, next_train, current_station, next_station in _pairwise_single_track(working_timetable, arrival_vars,
+                                                                                              departure_vars):
+            solver += departure_vars[(next_train, current_station)] >= arrival_vars[(current_train, next_station)]
+    else:
+        solver = add_headway_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+        solver = add_single_track_conflict_constraints(solver, working_timetable, arrival_vars, departure_vars, valid_segments,
+                                                       index=index)
+    solver = add_blocking_constraints(solver, working_timetable, blocked_section, blockage_start, blockage_end, departure_vars,
+                                      index=index, arrival_vars=arrival_vars)
+    solver = add_platform_capacity_constraints(solver, working_timetable, arrival_vars, departure_vars, platform_capacity,
+                                               index=index, formulation="interval")
+    solver = add_running_time_constraints(solver, working_timetable, arrival_vars, departure_vars, index=index)
+    solver = add_dwell_time_constraints(solver, working_timetable, arrival_vars, departure_vars)
+    solver = add_delays(solver, working_timetable, departure_vars, [("T3", "C", 50)], index=index)
+    solver = set_objective(solver, working_timetable, arrival_vars, departure_vars)
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+    return pulp.LpStatus[solver.status], pulp.value(solver.objective)
+
+
+def test_unbounded_window_yields_every_pair_of_the_pairwise_scan():
+    index = build_timetable_index(working_timetable)
+    _, arrival_vars, departure_vars = create_model(working_timetable)
+
+    assert set(headway_pairs(index, window=float("inf"))) == _pairwise_headway(working_timetable)
+    assert (set(single_track_pairs(index, valid_segments, arrival_vars, departure_vars, window=float("inf")))
+            == _pairwise_single_track(working_timetable, arrival_vars, departure_vars))
+
+
+def test_neighbour_pairs_keep_the_pairwise_optimum():
+    assert _solve(pairwise=False) == _solve(pairwise=True) == ("Optimal", 533)
+
+
+def test_add_delay_matches_add_delays():
+    solver, _, departure_vars = create_model(working_timetable)
+    solver = add_delays(solver, working_timetable, departure_vars, [("T3", "C", 50)])
+    other, _, other_departure_vars = create_model(working_timetable)
+    other = add_delay(other, working_timetable, other_departure_vars, "T3", "C", 50)
+
+    assert str(solver.constraints["Delay_T3_C"]) == str(other.constraints["Delay_T3_C"])
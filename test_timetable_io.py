@@ -0,0 +1,47 @@
+import pytest
+
+from timetable import Timetable
+from timetable_io import iter_timetable_rows, read_timetable, write_timetable
+
+
+RECORDS = [
+    {"train": "T1", "station": "A", "arrival": None, "departure": 0},
+    {"train": "T1", "station": "B", "arrival": 15, "departure": 19.5},
+    {"train": "T2", "station": "B", "arrival": None, "departure": None},
+]
+
+
+@pytest.mark.parametrize("filename", ["timetable.txt", "timetable.csv"])
+def test_write_and_read_back(tmp_path, filename):
+    path = str(tmp_path / filename)
+
+    write_timetable(path, Timetable.from_records(RECORDS))
+    timetable = read_timetable(path)
+
+    assert timetable.to_records() == RECORDS
+    assert timetable.trains == ["T1", "T2"]
+
+
+def test_reads_the_report_layout():
+    rows = list(iter_timetable_rows("original_timetable.txt"))
+
+    assert rows[0] == ("Train 1", "A", None, 0.0)
+    assert all(len(row) == 4 for row in rows)
+
+
+def test_writes_optimized_times(tmp_path):
+    path = str(tmp_path / "optimized.txt")
+    optimized_timetable = [{"train": "T1", "station": "B", "original_arrival": 15, "original_departure": 19,
+                            "new_arrival": 20, "new_departure": None}]
+
+    write_timetable(path, optimized_timetable)
+
+    assert list(iter_timetable_rows(path)) == [("T1", "B", 20.0, None)]
+
+
+def test_rejects_invalid_rows(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("train,station,arrival,departure\nT1,A,,0\nT1,B,15,soon\n")
+
+    with pytest.raises(ValueError, match="bad.csv:3: invalid time 'soon'"):
+        read_timetable(str(path))
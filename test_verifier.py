@@ -0,0 +1,49 @@
+import pulp
+
+from analysis import analyze_solution
+from scenario import build_scenario_model
+from verifier import RULE_FAMILIES, is_feasible, verify_timetable
+
+
+def _violated(violations):
+    return {family: sorted(zip(violations[family]["trains"], violations[family]["stations"]))
+            for family in RULE_FAMILIES if len(violations[family]["rows"])}
+
+
+def test_solved_scenario_passes_every_rule(scenario_args):
+    args, delays = scenario_args(1, num_stations=9, num_lines=3)
+    working_timetable, blocked_section, blockage_start, blockage_end, valid_segments, platform_capacity = args
+    solver, arrival_vars, departure_vars = build_scenario_model(*args, delays=delays, platform_formulation="interval")
+    solver.solve(pulp.PULP_CBC_CMD(msg=False))
+
+    violations = verify_timetable(analyze_solution(working_timetable, arrival_vars, departure_vars),
+                                  valid_segments=valid_segments, platform_capacity=platform_capacity,
+                                  blocked_section=blocked_section, blockage_start=blockage_start, blockage_end=blockage_end)
+    assert is_feasible(violations)
+
+
+def test_hand_edited_timetable_reports_the_offending_events():
+    working_timetable = [
+        {"train": "T1", "station": "A", "arrival": None, "departure": 0},
+        {"train": "T1", "station": "B", "arrival": 8, "departure": 15},
+        {"train": "T1", "station": "C", "arrival": 30, "departure": None},
+        {"train": "T2", "station": "A", "arrival": None, "departure": 3},
+        {"train": "T2", "station": "B", "arrival": 14, "departure": 20},
+        {"train": "T2", "station": "C", "arrival": 40, "departure": None},
+        {"train": "T3", "station": "A", "arrival": None, "departure": 50},
+        {"train": "T3", "station": "B", "arrival": 60, "departure": 61},
+        {"train": "T3", "station": "C", "arrival": 75, "departure": None},
+    ]
+    violations = verify_timetable(working_timetable, valid_segments=[("B", "C")], platform_capacity={"B": 1},
+                                  blocked_section=("B", "C"), blockage_start=60, blockage_end=70)
+
+    assert _violated(violations) == {
+        "running_time": [("T1", "B")],
+        "dwell_time": [("T3", "B")],
+        "headway": [("T2", "A")],
+        "single_track": [("T2", "B")],
+        "blocking": [("T3", "B")],
+        "platform_capacity": [("T2", "B")],
+    }
+    assert violations["headway"]["shortfall"].tolist() == [2]
+    assert working_timetable[violations["single_track"]["other_rows"][0]]["train"] == "T1"
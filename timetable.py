@@ -0,0 +1,186 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class Timetable:
+    """
+    Columnar timetable store.
+
+    Train and station names are interned into small integer ids, and planned (and optionally
+    optimized) times are kept in float64 columns with NaN for a missing arrival or departure.
+    Iterating yields dict-compatible entries, so code written against lists of
+    {"train", "station", "arrival", "departure"} dicts keeps working unchanged.
+    """
+
+    __slots__ = ("trains", "stations", "train_ids", "station_ids", "arrival", "departure", "new_arrival", "new_departure")
+
+    def __init__(self, trains, stations, train_ids, station_ids, arrival, departure, new_arrival=None, new_departure=None):
+        self.trains = trains
+        self.stations = stations
+        self.train_ids = _frozen(np.asarray(train_ids, dtype=np.int32))
+        self.station_ids = _frozen(np.asarray(station_ids, dtype=np.int32))
+        self.arrival = _frozen(np.asarray(arrival, dtype=np.float64))
+        self.departure = _frozen(np.asarray(departure, dtype=np.float64))
+        self.new_arrival = None if new_arrival is None else _frozen(np.asarray(new_arrival, dtype=np.float64))
+        self.new_departure = None if new_departure is None else _frozen(np.asarray(new_departure, dtype=np.float64))
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds a timetable from an iterable of per-stop dicts.
+        """
+        trains, stations = [], []
+        train_lookup, station_lookup = {}, {}
+        train_ids, station_ids, arrival, departure = [], [], [], []
+
+        for entry in records:
+            train, station = entry["train"], entry["station"]
+            if train not in train_lookup:
+                train_lookup[train] = len(trains)
+                trains.append(train)
+            if station not in station_lookup:
+                station_lookup[station] = len(stations)
+                stations.append(station)
+            train_ids.append(train_lookup[train])
+            station_ids.append(station_lookup[station])
+            arrival.append(np.nan if entry["arrival"] is None else entry["arrival"])
+            departure.append(np.nan if entry["departure"] is None else entry["departure"])
+
+        return cls(trains, stations, train_ids, station_ids, arrival, departure)
+
+    @classmethod
+    def from_optimized_records(cls, records):
+        """
+        Builds a timetable from analyze_solution rows: the original_* times as the plan and the new_*
+        times as the optimized columns.
+        """
+        records = list(records)
+        planned = cls.from_records(
+            {"train": record["train"], "station": record["station"], "arrival": record["original_arrival"],
+             "departure": record["original_departure"]}
+            for record in records)
+        new_arrival = [np.nan if record["new_arrival"] is None else record["new_arrival"] for record in records]
+        new_departure = [np.nan if record["new_departure"] is None else record["new_departure"] for record in records]
+        return planned.with_times(new_arrival, new_departure)
+
+    def to_records(self):
+        """
+        Returns the timetable as a list of plain dicts.
+        """
+        return [dict(entry) for entry in self]
+
+    def copy(self):
+        """
+        Returns a working copy. Columns are read-only, so they are shared rather than duplicated.
+        """
+        return Timetable(self.trains, self.stations, self.train_ids, self.station_ids, self.arrival, self.departure,
+                         self.new_arrival, self.new_departure)
+
+    def with_times(self, new_arrival, new_departure):
+        """
+        Returns a copy carrying optimized arrival and departure columns alongside the planned ones.
+        """
+        return Timetable(self.trains, self.stations, self.train_ids, self.station_ids, self.arrival, self.departure,
+                         new_arrival, new_departure)
+
+    def take(self, rows):
+        """
+        Returns the timetable restricted to the given rows, keeping the interned names.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        return Timetable(self.trains, self.stations, self.train_ids[rows], self.station_ids[rows], self.arrival[rows],
+                         self.departure[rows],
+                         None if self.new_arrival is None else self.new_arrival[rows],
+                         None if self.new_departure is None else self.new_departure[rows])
+
+    def train_of(self, row):
+        return self.trains[self.train_ids[row]]
+
+    def station_of(self, row):
+        return self.stations[self.station_ids[row]]
+
+    def rows_of_train(self, train):
+        return np.flatnonzero(self.train_ids == self.trains.index(train))
+
+    def rows_at_station(self, station):
+        return np.flatnonzero(self.station_ids == self.stations.index(station))
+
+    def nbytes(self):
+        columns = [self.train_ids, self.station_ids, self.arrival, self.departure, self.new_arrival, self.new_departure]
+        return sum(column.nbytes for column in columns if column is not None)
+
+    def __len__(self):
+        return len(self.train_ids)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("timetable index out of range")
+        return TimetableEntry(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield TimetableEntry(self, row)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        for name in ("train_ids", "station_ids", "arrival", "departure", "new_arrival", "new_departure"):
+            if getattr(self, name) is not None:
+                _frozen(getattr(self, name))
+
+
+class TimetableEntry(Mapping):
+    """
+    Read-only dict view of one timetable row.
+    """
+
+    __slots__ = ("_timetable", "_row")
+
+    def __init__(self, timetable, row):
+        self._timetable = timetable
+        self._row = row
+
+    def _keys(self):
+        if self._timetable.new_arrival is None:
+            return _PLANNED_KEYS
+        return _OPTIMIZED_KEYS
+
+    def __getitem__(self, key):
+        timetable, row = self._timetable, self._row
+        if key == "train":
+            return timetable.trains[timetable.train_ids[row]]
+        if key == "station":
+            return timetable.stations[timetable.station_ids[row]]
+        if key not in self._keys():
+            raise KeyError(key)
+        return _time_or_none(getattr(timetable, key)[row])
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+_PLANNED_KEYS = ("train", "station", "arrival", "departure")
+_OPTIMIZED_KEYS = _PLANNED_KEYS + ("new_arrival", "new_departure")
+
+
+def _time_or_none(value):
+    if np.isnan(value):
+        return None
+    return float(value)
+
+
+def _frozen(column):
+    column.flags.writeable = False
+    return column
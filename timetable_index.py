@@ -0,0 +1,118 @@
+import bisect
+import math
+
+
+def planned_time(entry):
+    """
+    Returns the planned time used to order a stop event: its arrival, or its departure at an origin.
+    """
+    if entry["arrival"] is not None:
+        return entry["arrival"]
+    if entry["departure"] is not None:
+        return entry["departure"]
+    return math.inf
+
+
+def build_timetable_index(working_timetable):
+    """
+    Groups timetable events by station, by train and by segment so constraint builders never scan the whole timetable.
+
+    Returns a dict with:
+        by_station: station -> stop events at that station, sorted by planned time.
+        by_train: train -> stop events of that train, in route order.
+        by_segment: (from_station, to_station) -> (from_event, to_event) movements, sorted by planned entry time.
+    """
+    by_station = {}
+    by_train = {}
+    position = {}
+
+    for i, entry in enumerate(working_timetable):
+        position[id(entry)] = i
+        by_station.setdefault(entry["station"], []).append(entry)
+        by_train.setdefault(entry["train"], []).append(entry)
+
+    for station_stops in by_station.values():
+        station_stops.sort(key=lambda entry: (planned_time(entry), position[id(entry)]))
+
+    by_segment = {}
+    for train_stops in by_train.values():
+        for current, next_entry in zip(train_stops, train_stops[1:]):
+            by_segment.setdefault((current["station"], next_entry["station"]), []).append((current, next_entry))
+
+    for movements in by_segment.values():
+        movements.sort(key=lambda movement: (segment_entry_time(movement), position[id(movement[0])]))
+
+    return {"by_station": by_station, "by_train": by_train, "by_segment": by_segment}
+
+
+def segment_entry_time(movement):
+    """
+    Returns the planned time a movement enters its segment: the departure from its first stop.
+    """
+    current, next_entry = movement
+    if current["departure"] is not None:
+        return current["departure"]
+    if next_entry["arrival"] is not None:
+        return next_entry["arrival"]
+    return math.inf
+
+
+def neighbour_pairs(events, time_of, window=None):
+    """
+    Yields (earlier, later) pairs from events sorted by time_of.
+
+    Every event is paired with its immediate successor. When a window is given, it is also paired
+    with every later event whose time lies within window minutes of its own.
+    """
+    for i in range(len(events) - 1):
+        yield events[i], events[i + 1]
+        if window is None:
+            continue
+        start = time_of(events[i])
+        for j in range(i + 2, len(events)):
+            if time_of(events[j]) - start > window:
+                break
+            yield events[i], events[j]
+
+
+def build_blockage_index(blockages):
+    """
+    Groups blockages into a per-segment interval index.
+
+    Overlapping or touching windows on a segment are merged, since a train can neither pass
+    between them nor clear the segment inside them.
+
+    Parameters:
+        blockages: Iterable of ((from_station, to_station), start, end) possession windows.
+
+    Returns:
+        A dict (from_station, to_station) -> (starts, ends) of the disjoint windows on that segment,
+        sorted by time.
+    """
+    by_segment = {}
+    for section, start, end in blockages:
+        by_segment.setdefault(tuple(section), []).append((start, end))
+
+    blockage_index = {}
+    for section, windows in by_segment.items():
+        merged = []
+        for start, end in sorted(windows):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        blockage_index[section] = ([start for start, _ in merged], [end for _, end in merged])
+    return blockage_index
+
+
+def blockage_windows(blockage_index, section, earliest, latest):
+    """
+    Yields the (start, end) windows on a segment that overlap [earliest, latest], by binary search.
+    """
+    if section not in blockage_index:
+        return
+    starts, ends = blockage_index[section]
+    for k in range(bisect.bisect_left(ends, earliest), len(starts)):
+        if starts[k] > latest:
+            break
+        yield starts[k], ends[k]
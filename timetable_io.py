@@ -0,0 +1,149 @@
+import csv
+import os
+from array import array
+
+import numpy as np
+
+from timetable import Timetable
+
+# File layouts: the tab-separated report layout of original_timetable.txt, and a plain CSV schema
+FORMATS = {
+    "tsv": {"delimiter": "\t", "header": ("Train", "Station", "Arrival", "Departure"), "missing": "-"},
+    "csv": {"delimiter": ",", "header": ("train", "station", "arrival", "departure"), "missing": ""},
+}
+
+
+def iter_timetable_rows(path, format=None):
+    """
+    Streams (train, station, arrival, departure) rows from a timetable file, validating each one.
+
+    Missing times are None, blank lines are skipped and an invalid row raises ValueError with its line
+    number. format is "tsv" or "csv" and defaults to the one matching the file extension (.csv for
+    CSV, anything else for the TSV layout).
+    """
+    layout = FORMATS[format or _format_of(path)]
+    with open(path, newline="") as timetable_file:
+        reader = csv.reader(timetable_file, delimiter=layout["delimiter"])
+        header = next(reader, None)
+        if header is None:
+            return
+        if tuple(field.strip().lower() for field in header) != tuple(name.lower() for name in layout["header"]):
+            raise ValueError(f"{path}:1: expected header {layout['delimiter'].join(layout['header'])!r}, got {header!r}")
+
+        missing = layout["missing"]
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != 4:
+                raise ValueError(f"{path}:{reader.line_num}: expected 4 fields, got {len(row)}")
+
+            train, station, arrival, departure = row
+            try:
+                arrival = None if arrival == missing else float(arrival)
+                departure = None if departure == missing else float(departure)
+            except ValueError:
+                arrival, departure = (_parse_time(field, missing, path, reader.line_num) for field in row[2:])
+            if not train or not station:
+                raise ValueError(f"{path}:{reader.line_num}: missing train or station")
+            if arrival is not None and departure is not None and departure < arrival:
+                raise ValueError(f"{path}:{reader.line_num}: departure {departure} before arrival {arrival}")
+
+            yield train, station, arrival, departure
+
+
+def read_timetable(path, format=None):
+    """
+    Loads a timetable file into a Timetable in a single pass.
+
+    Names are interned as they are read and times go straight into compact columns, so memory is
+    proportional to the parsed timetable rather than to the file text.
+    """
+    trains, stations = [], []
+    train_lookup, station_lookup = {}, {}
+    train_ids, station_ids = array("i"), array("i")
+    arrival, departure = array("d"), array("d")
+
+    for train, station, arrival_time, departure_time in iter_timetable_rows(path, format):
+        train_id = train_lookup.get(train)
+        if train_id is None:
+            train_id = train_lookup[train] = len(trains)
+            trains.append(train)
+        station_id = station_lookup.get(station)
+        if station_id is None:
+            station_id = station_lookup[station] = len(stations)
+            stations.append(station)
+
+        train_ids.append(train_id)
+        station_ids.append(station_id)
+        arrival.append(np.nan if arrival_time is None else arrival_time)
+        departure.append(np.nan if departure_time is None else departure_time)
+
+    return Timetable(trains, stations,
+                     np.frombuffer(train_ids, dtype=np.int32), np.frombuffer(station_ids, dtype=np.int32),
+                     np.frombuffer(arrival, dtype=np.float64), np.frombuffer(departure, dtype=np.float64))
+
+
+def write_timetable(path, timetable, format=None, optimized=None):
+    """
+    Writes a timetable in one of FORMATS, one row at a time.
+
+    timetable may be a Timetable, a list of stop dicts or the optimized timetable returned by
+    analyze_solution. optimized selects the new_arrival/new_departure times instead of the planned
+    ones and defaults to whether the entries carry them.
+    """
+    layout = FORMATS[format or _format_of(path)]
+    with open(path, "w", newline="") as timetable_file:
+        writer = csv.writer(timetable_file, delimiter=layout["delimiter"], lineterminator="\r\n")
+        writer.writerow(layout["header"])
+        if isinstance(timetable, Timetable):
+            rows = _column_rows(timetable, optimized)
+        else:
+            rows = _entry_rows(timetable, optimized)
+        missing = layout["missing"]
+        writer.writerows((train, station, _format_time(arrival, missing), _format_time(departure, missing))
+                         for train, station, arrival, departure in rows)
+
+
+def _column_rows(timetable, optimized):
+    # Reads the columns directly instead of going through a TimetableEntry per row
+    if optimized is None:
+        optimized = timetable.new_arrival is not None
+    arrival = timetable.new_arrival if optimized else timetable.arrival
+    departure = timetable.new_departure if optimized else timetable.departure
+    trains, stations = timetable.trains, timetable.stations
+    for train_id, station_id, arrival_time, departure_time in zip(timetable.train_ids.tolist(), timetable.station_ids.tolist(),
+                                                                   arrival.tolist(), departure.tolist()):
+        yield (trains[train_id], stations[station_id],
+               None if arrival_time != arrival_time else arrival_time,
+               None if departure_time != departure_time else departure_time)
+
+
+def _entry_rows(entries, optimized):
+    for entry in entries:
+        if optimized is None:
+            optimized = "new_arrival" in entry
+        if optimized:
+            yield entry["train"], entry["station"], entry["new_arrival"], entry["new_departure"]
+        else:
+            yield (entry["train"], entry["station"], entry.get("arrival", entry.get("original_arrival")),
+                   entry.get("departure", entry.get("original_departure")))
+
+
+def _format_of(path):
+    return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "tsv"
+
+
+def _parse_time(field, missing, path, line):
+    field = field.strip()
+    if field == missing or not field:
+        return None
+    try:
+        return float(field)
+    except ValueError:
+        raise ValueError(f"{path}:{line}: invalid time {field!r}") from None
+
+
+def _format_time(value, missing):
+    if value is None:
+        return missing
+    return f"{value:.2f}"
@@ -0,0 +1,211 @@
+import logging
+
+import numpy as np
+
+from constraints import HEADWAY_TIME, MAX_DWELL_TIME, MIN_DWELL_TIME, RUNNING_TIME
+from instrumentation import instrumented
+from timetable import Timetable
+from timetable_index import build_blockage_index
+
+logger = logging.getLogger(__name__)
+
+# Rule families checked by verify_timetable, in report order
+RULE_FAMILIES = ("running_time", "dwell_time", "headway", "single_track", "blocking", "platform_capacity")
+
+
+@instrumented("verify")
+def verify_timetable(working_timetable, new_arrival=None, new_departure=None, valid_segments=(), platform_capacity=None,
+                     blocked_section=None, blockage_start=None, blockage_end=None, blockages=(), running_time=RUNNING_TIME,
+                     min_dwell=MIN_DWELL_TIME, max_dwell=MAX_DWELL_TIME, headway_time=HEADWAY_TIME, tolerance=1e-6):
+    """
+    Checks a timetable against the operating rules of constraints.py, every rule family in bulk.
+
+    The times checked are new_arrival and new_departure (see extract_solution) when given, else the
+    optimized columns of a Timetable that carries them, else the planned times. The
+    analyze_solution output is accepted as well. Events are sorted and grouped once per family and
+    checked with NumPy, so a million events take a fraction of a second.
+
+    The rules are checked on the actual times rather than in planned order: consecutive departures
+    (and arrivals) at a station at least headway_time apart, a train entering a single-track segment
+    only once every train that entered before it has arrived at the far end, no departure into a
+    blocked segment that has not cleared it (arrived, or running_time after departing) before a
+    window starts and departs before it ends, and at every arrival no more trains present than
+    platform_capacity allows (a train departing as another arrives has left).
+
+    Returns:
+        A dict per rule family of RULE_FAMILIES with the offending event "rows", the "trains" and
+        "stations" of those rows, the "other_rows" they conflict with (-1 for rules on one event) and
+        the "shortfall" in minutes (for platform capacity, the number of trains too many).
+    """
+    tt = _as_timetable(working_timetable)
+    if new_arrival is None:
+        new_arrival = tt.arrival if tt.new_arrival is None else tt.new_arrival
+        new_departure = tt.departure if tt.new_departure is None else tt.new_departure
+    arrival, departure = np.asarray(new_arrival, dtype=np.float64), np.asarray(new_departure, dtype=np.float64)
+    has_arrival, has_departure = ~np.isnan(arrival), ~np.isnan(departure)
+
+    # Consecutive stops of each train, in route order
+    by_train = np.argsort(tt.train_ids, kind="stable")
+    same_train = tt.train_ids[by_train[:-1]] == tt.train_ids[by_train[1:]]
+    current, following = by_train[:-1][same_train], by_train[1:][same_train]
+
+    violations = {}
+
+    running = current[has_departure[current] & has_arrival[following]]
+    running_next = following[has_departure[current] & has_arrival[following]]
+    shortfall = running_time - (arrival[running_next] - departure[running])
+    late = shortfall > tolerance
+    violations["running_time"] = _report(tt, running_next[late], running[late], shortfall[late])
+
+    dwelling = np.flatnonzero(has_arrival & has_departure)
+    dwell = departure[dwelling] - arrival[dwelling]
+    shortfall = np.maximum(min_dwell - dwell, dwell - max_dwell)
+    wrong = shortfall > tolerance
+    violations["dwell_time"] = _report(tt, dwelling[wrong], np.full(int(wrong.sum()), -1), shortfall[wrong])
+
+    # Every arrival and departure sorted by time once, departures a tolerance early so that at equal
+    # times a departing train has left before the next one arrives
+    event_rows = np.r_[np.flatnonzero(has_arrival), np.flatnonzero(has_departure)]
+    event_kind = np.r_[np.ones(int(has_arrival.sum()), dtype=np.int8), np.zeros(int(has_departure.sum()), dtype=np.int8)]
+    event_time = np.r_[arrival[has_arrival], departure[has_departure] - tolerance]
+    by_time = np.argsort(event_time)
+
+    # Headways: consecutive arrivals, and consecutive departures, at each station
+    events = _by_group(by_time, tt.station_ids[event_rows].astype(np.int64) * 2 + event_kind)
+    rows, kind, time = event_rows[events], event_kind[events], event_time[events]
+    stations, trains = tt.station_ids[rows], tt.train_ids[rows]
+    shortfall = headway_time - (time[1:] - time[:-1])
+    close = np.flatnonzero((stations[1:] == stations[:-1]) & (kind[1:] == kind[:-1]) & (trains[1:] != trains[:-1])
+                           & (shortfall > tolerance))
+    violations["headway"] = _report(tt, rows[close + 1], rows[close], shortfall[close])
+
+    violations["single_track"] = _single_track_violations(tt, current, following, arrival, departure, valid_segments, tolerance)
+
+    if blocked_section is not None:
+        blockages = [(blocked_section, blockage_start, blockage_end)] + list(blockages)
+    violations["blocking"] = _blocking_violations(tt, current, following, arrival, departure, build_blockage_index(blockages),
+                                                  running_time, tolerance)
+
+    violations["platform_capacity"] = _platform_violations(tt, has_arrival & has_departure, event_rows, event_kind, by_time,
+                                                           platform_capacity or {})
+
+    counts = {family: len(violations[family]["rows"]) for family in RULE_FAMILIES}
+    logger.debug("Verified %d events: %s", len(tt), counts)
+    return violations
+
+
+def is_feasible(violations):
+    """
+    Returns whether a verify_timetable result has no violations at all.
+    """
+    return not any(len(violation["rows"]) for violation in violations.values())
+
+
+def _single_track_violations(tt, current, following, arrival, departure, valid_segments, tolerance):
+    # Movements on each segment in order of entry; each entry must not precede the latest far-end
+    # arrival of the movements that entered before it
+    codes = tt.station_ids[current].astype(np.int64) * len(tt.stations) + tt.station_ids[following]
+    lookup = {station: k for k, station in enumerate(tt.stations)}
+    valid_codes = np.array([lookup[a] * len(tt.stations) + lookup[b] for a, b in valid_segments if a in lookup and b in lookup],
+                           dtype=np.int64)
+    on_valid = np.flatnonzero(np.isin(codes, valid_codes))
+    entering, leaving = current[on_valid], following[on_valid]
+    entry = np.where(np.isnan(departure[entering]), arrival[leaving], departure[entering])
+    keep = ~np.isnan(entry)
+    entering, leaving, entry, codes = entering[keep], leaving[keep], entry[keep], codes[on_valid][keep]
+
+    order = _by_group(np.argsort(entry), codes)
+    entering, leaving, entry, codes = entering[order], leaving[order], entry[order], codes[order]
+    cleared = np.where(np.isnan(arrival[leaving]), -np.inf, arrival[leaving])
+
+    latest_cleared = np.full(len(entering), -np.inf)
+    latest_row = np.full(len(entering), -1, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.zeros(0, dtype=np.intp)
+    for first, last in zip(starts, np.r_[starts[1:], len(codes)]):
+        if last - first < 2:
+            continue
+        running_max = np.maximum.accumulate(cleared[first:last])
+        positions = np.arange(first, last)
+        # Position of the movement holding the running maximum, for reporting
+        holder = np.maximum.accumulate(np.where(cleared[first:last] >= running_max, positions, first))
+        latest_cleared[first + 1:last] = running_max[:-1]
+        latest_row[first + 1:last] = leaving[holder[:-1]]
+
+    shortfall = latest_cleared - departure[entering]
+    blocked = ~np.isnan(departure[entering]) & (shortfall > tolerance)
+    return _report(tt, entering[blocked], latest_row[blocked], shortfall[blocked])
+
+
+def _blocking_violations(tt, current, following, arrival, departure, blockage_index, running_time, tolerance):
+    # Only the first window ending after a departure can be met: later windows start later still
+    rows, shortfalls = [], []
+    lookup = {station: k for k, station in enumerate(tt.stations)}
+    for (from_station, to_station), (starts, ends) in blockage_index.items():
+        if from_station not in lookup or to_station not in lookup:
+            continue
+        on_segment = ((tt.station_ids[current] == lookup[from_station]) & (tt.station_ids[following] == lookup[to_station])
+                      & ~np.isnan(departure[current]))
+        entering, leaving = current[on_segment], following[on_segment]
+        cleared = np.where(np.isnan(arrival[leaving]), departure[entering] + running_time, arrival[leaving])
+
+        k = np.searchsorted(np.asarray(ends, dtype=np.float64), departure[entering] + tolerance, side="right")
+        met = k < len(starts)
+        window_start = np.asarray(starts, dtype=np.float64)[np.minimum(k, len(starts) - 1)]
+        window_end = np.asarray(ends, dtype=np.float64)[np.minimum(k, len(ends) - 1)]
+        shortfall = np.minimum(cleared - window_start, window_end - departure[entering])
+        inside = met & (shortfall > tolerance)
+        rows.append(entering[inside])
+        shortfalls.append(shortfall[inside])
+
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.intp)
+    shortfalls = np.concatenate(shortfalls) if shortfalls else np.zeros(0)
+    return _report(tt, rows, np.full(len(rows), -1), shortfalls)
+
+
+def _platform_violations(tt, dwelling, event_rows, event_kind, by_time, platform_capacity):
+    # Sweep +1 per arrival and -1 per departure of the stops that occupy a platform through every station
+    capacity = np.full(len(tt.stations), np.iinfo(np.int64).max, dtype=np.int64)
+    for station, platforms in platform_capacity.items():
+        if station in tt.stations:
+            capacity[tt.stations.index(station)] = platforms
+    counted = dwelling & (capacity[tt.station_ids] < np.iinfo(np.int64).max)
+    events = by_time[counted[event_rows[by_time]]]
+    events = _by_group(events, tt.station_ids[event_rows])
+
+    # Every station's events sum to zero, so the running total restarts at each station
+    arriving = event_kind[events] == 1
+    present = np.cumsum(np.where(arriving, 1, -1))
+    over = present - capacity[tt.station_ids[event_rows[events]]]
+    crowded = arriving & (over > 0)
+    rows = event_rows[events[crowded]]
+    return _report(tt, rows, np.full(len(rows), -1), over[crowded].astype(np.float64))
+
+
+def _by_group(order, groups):
+    # Stable-sorts an order (by time) by group, so each group's events stay in time order. Two sorts
+    # are several times faster than np.lexsort, and the stable sort is a radix sort for 16-bit groups
+    groups = groups[order]
+    if len(groups) and 0 <= groups.min() and groups.max() < np.iinfo(np.int16).max:
+        groups = groups.astype(np.int16)
+    return order[np.argsort(groups, kind="stable")]
+
+
+def _report(tt, rows, other_rows, shortfall):
+    rows = np.asarray(rows, dtype=np.intp)
+    return {
+        "rows": rows,
+        "trains": np.array([tt.trains[train] for train in tt.train_ids[rows].tolist()], dtype=object),
+        "stations": np.array([tt.stations[station] for station in tt.station_ids[rows].tolist()], dtype=object),
+        "other_rows": np.asarray(other_rows, dtype=np.intp),
+        "shortfall": np.asarray(shortfall, dtype=np.float64),
+    }
+
+
+def _as_timetable(working_timetable):
+    # analyze_solution rows carry the plan as original_* and the solved times as new_*
+    if isinstance(working_timetable, Timetable):
+        return working_timetable
+    records = list(working_timetable)
+    if records and "new_arrival" in records[0]:
+        return Timetable.from_optimized_records(records)
+    return Timetable.from_records(records)
@@ -1,57 +1,166 @@
-import matplotlib.pyplot as plt
-
-def plot_timetable(timetable, title, station_order, filename, blocked_section=None, blockage_start=None, blockage_end=None):
-    """
-    Plots the train timetable with optional blocked section visualization.
-
-    Parameters:
-        timetable: List of train schedules (arrival, departure times).
-        title: Title of the graph.
-        station_order: List of stations in their physical order.
-        filename: Filename to save the graph.
-        blocked_section: Tuple of blocked section (start_station, end_station).
-        blockage_start: Start time of the blockage (minutes).
-        blockage_end: End time of the blockage (minutes).
-    """
-    print(f"\nPlotting timetable: {title}")
-
-    plt.figure(figsize=(12, 8))
-    colors = ['blue', 'green', 'red', 'orange', 'purple', 'cyan', 'magenta']
-    station_positions = {station: i for i, station in enumerate(station_order)}
-    trains = sorted(set(entry['train'] for entry in timetable))
-
-    # Plot train schedules
-    for idx, train in enumerate(trains):
-        train_schedule = [entry for entry in timetable if entry['train'] == train]
-        times, station_y, annotations = [], [], []
-
-        for entry in train_schedule:
-            station = entry['station']
-            for time_type in ['arrival', 'departure', 'new_arrival', 'new_departure']:
-                if entry.get(time_type) is not None:
-                    times.append(entry[time_type])
-                    station_y.append(station_positions[station])
-                    annotations.append((time_type, entry[time_type]))
-
-        plt.plot(times, station_y, marker='o', color=colors[idx % len(colors)], label=train)
-
-        for (time_type, time), y in zip(annotations, station_y):
-            offset = 10 if 'arrival' in time_type else -10
-            plt.annotate(f"{int(time)}", (time, y), textcoords="offset points",
-                         xytext=(0, offset), ha='center', fontsize=8)
-
-    # Debug print statements before the condition
-    print(f"Blocked section: {blocked_section}")
-    print(f"Blockage start: {blockage_start}")
-    print(f"Blockage end: {blockage_end}")
-
-
-    plt.title(title)
-    plt.legend(loc='center left', bbox_to_anchor=(1, 0.5))
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.xlabel("Time (minutes from midnight)")
-    plt.ylabel("Stations")
-    plt.yticks(range(len(station_order)), station_order)
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, bbox_inches='tight')
-    plt.show()
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+# Beyond these counts the legend and stop markers are left out and annotations are thinned
+MAX_LEGEND_TRAINS = 20
+MAX_MARKERS = 2000
+MAX_ANNOTATIONS = 60
+
+@instrumented("plotting")
+def plot_timetable(timetable, title, station_order, filename, blocked_section=None, blockage_start=None, blockage_end=None,
+                   annotate=True, dpi=100, show=False):
+    """
+    Plots the train timetable with optional blocked section visualization.
+
+    Parameters:
+        timetable: List of train schedules (arrival, departure times), a Timetable, or the optimized
+            timetable from analyze_solution (its new times are plotted).
+        title: Title of the graph.
+        station_order: List of stations in their physical order.
+        filename: Filename to save the graph.
+        blocked_section: Tuple of blocked section (start_station, end_station).
+        blockage_start: Start time of the blockage (minutes).
+        blockage_end: End time of the blockage (minutes).
+        annotate: Label the event times, thinned to at most MAX_ANNOTATIONS labels.
+        dpi: Resolution of the saved image.
+        show: Also open the figure in an interactive window (blocks until it is closed).
+    """
+    logger.debug("Plotting timetable: %s", title)
+
+    figure, axes = _new_figure(show)
+    station_positions = {station: i for i, station in enumerate(station_order)}
+    trains, paths = _train_paths(timetable, station_positions)
+
+    _draw_paths(axes, trains, paths, annotate=annotate)
+    _draw_blockage(axes, station_positions, blocked_section, blockage_start, blockage_end)
+    _finish(axes, title, station_order, legend=len(trains) <= MAX_LEGEND_TRAINS)
+    _save(figure, filename, dpi, show)
+
+@instrumented("plotting")
+def plot_comparison(original_timetable, optimized_timetable, station_order, filename, title="Original vs Optimized Timetable",
+                    blocked_section=None, blockage_start=None, blockage_end=None, annotate=False, dpi=100, show=False):
+    """
+    Plots the original timetable (dashed grey) and the optimized one (coloured) in one figure,
+    together with the blocked section.
+    """
+    logger.debug("Plotting comparison: %s", title)
+
+    figure, axes = _new_figure(show)
+    station_positions = {station: i for i, station in enumerate(station_order)}
+
+    _, original_paths = _train_paths(original_timetable, station_positions)
+    axes.add_collection(LineCollection([path[:, :2] for path in original_paths], colors="0.6", linestyles="--", linewidths=1, label="Original"))
+
+    trains, paths = _train_paths(optimized_timetable, station_positions)
+    _draw_paths(axes, trains, paths, annotate=annotate)
+    _draw_blockage(axes, station_positions, blocked_section, blockage_start, blockage_end)
+    _finish(axes, title, station_order, legend=len(trains) <= MAX_LEGEND_TRAINS)
+    _save(figure, filename, dpi, show)
+
+def render_batch(jobs, max_workers=None):
+    """
+    Renders many plot_comparison figures in parallel worker processes.
+
+    Each job is a dict of plot_comparison keyword arguments. Returns the filenames in job order.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_render_job, jobs))
+
+def _render_job(job):
+    plot_comparison(**job)
+    return job["filename"]
+
+def _new_figure(show=False):
+    # A bare Figure on the Agg canvas never touches pyplot's interactive backend
+    if show:
+        import matplotlib.pyplot as plt
+
+        figure = plt.figure(figsize=(12, 8))
+    else:
+        figure = Figure(figsize=(12, 8))
+        FigureCanvasAgg(figure)
+    return figure, figure.add_subplot()
+
+def _train_paths(timetable, station_positions):
+    """
+    Returns the trains in order of appearance and one (time, station position, is_arrival) array per train.
+
+    Entries carrying new_arrival/new_departure (analyze_solution output) are plotted at their new times.
+    """
+    points = {}
+    for entry in timetable:
+        y = station_positions.get(entry["station"])
+        if y is None:
+            continue
+        keys = ("new_arrival", "new_departure") if "new_arrival" in entry else ("arrival", "departure")
+        train_points = points.setdefault(entry["train"], [])
+        for is_arrival, key in zip((1, 0), keys):
+            time = entry[key]
+            if time is not None:
+                train_points.append((time, y, is_arrival))
+
+    trains = [train for train, train_points in points.items() if train_points]
+    return trains, [np.array(points[train], dtype=np.float64) for train in trains]
+
+def _draw_paths(axes, trains, paths, annotate=True):
+    # All trains as one LineCollection and all stops as one scatter instead of a plot call per train
+    colormap = colormaps["tab20"]
+    colors = [colormap(k % colormap.N) for k in range(len(trains))]
+    axes.add_collection(LineCollection([path[:, :2] for path in paths], colors=colors, linewidths=1.5))
+
+    if not paths:
+        return
+    stops = np.concatenate(paths)
+    if len(stops) <= MAX_MARKERS:
+        axes.scatter(stops[:, 0], stops[:, 1], s=12, c=np.repeat(np.arange(len(paths)) % colormap.N, [len(path) for path in paths]),
+                     cmap=colormap, vmin=0, vmax=colormap.N - 1, zorder=3)
+
+    if len(trains) <= MAX_LEGEND_TRAINS:
+        for train, color in zip(trains, colors):
+            axes.plot([], [], marker="o", color=color, label=train)
+
+    if annotate:
+        step = max(1, -(-len(stops) // MAX_ANNOTATIONS))
+        for time, y, is_arrival in stops[::step].tolist():
+            offset = 10 if is_arrival else -10
+            axes.annotate(f"{int(time)}", (time, y), textcoords="offset points", xytext=(0, offset), ha="center", fontsize=8)
+
+def _draw_blockage(axes, station_positions, blocked_section, blockage_start, blockage_end):
+    logger.debug("Blocked section: %s, blockage: %s-%s", blocked_section, blockage_start, blockage_end)
+    if blocked_section is None or blockage_start is None or blockage_end is None:
+        return
+    if blocked_section[0] not in station_positions or blocked_section[1] not in station_positions:
+        return
+    low, high = sorted(station_positions[station] for station in blocked_section)
+    axes.add_patch(Rectangle((blockage_start, low), blockage_end - blockage_start, high - low,
+                             facecolor="red", alpha=0.2, edgecolor="red", label="Blockage"))
+
+def _finish(axes, title, station_order, legend=True):
+    axes.autoscale_view()
+    axes.set_title(title)
+    if legend:
+        axes.legend(loc="center left", bbox_to_anchor=(1, 0.5))
+    axes.grid(True, linestyle="--", alpha=0.7)
+    axes.set_xlabel("Time (minutes from midnight)")
+    axes.set_ylabel("Stations")
+    axes.set_yticks(range(len(station_order)), station_order)
+
+def _save(figure, filename, dpi, show):
+    # tight_layout already makes room for the legend; bbox_inches="tight" would render the figure twice
+    figure.tight_layout()
+    figure.savefig(filename, dpi=dpi, pil_kwargs={"compress_level": 1})
+    if show:
+        import matplotlib.pyplot as plt
+
+        plt.show()